@@ -0,0 +1,275 @@
+"""
+Housekeeping for a results (or postprocess) tree in one pass.
+
+The tree is scanned once into a manifest (result dir -> files, status, model
+actually used), every rule is planned against that manifest as one batch of
+renames / moves / quarantines / deletions, conflicts are caught before
+anything is touched, and the batch runs in a thread pool. Without --apply
+only the plan is reported. Results recorded in a results store (`_results/`)
+are re-recorded under their new name (and the old name tombstoned) when
+renamed, moved, quarantined or deleted.
+
+    # gpt-4o 결과 중 실제로 다른 모델이 응답한 것: 이름을 실제 모델로 바꿔 DEST로 이동
+    python scripts/maintain_results.py ../dataset/postprocess/modification_gen/without_oracle/task-3 \\
+        --fix_model gpt-4o --rename gpt-4.1-2025-04-14=gpt-4.1 --dest ../dataset/final_results/modification_gen/without_oracle/task-3
+
+    # postprocess 단계에서 실패로 기록된 결과 삭제 (retry_step_minus_1.txt 등)
+    python scripts/maintain_results.py ../dataset/results/modification_gen \\
+        --drop_listed ../dataset/postprocess/modification_gen/without_oracle --apply
+
+    # step count -1 / 산출물 없는 결과를 .quarantine/ 으로 격리
+    python scripts/maintain_results.py <root> --drop_status retry,missing --quarantine --apply
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+from pathlib import Path
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from experiments.results_index import ResultsIndex, is_result_dir
+from experiments.results_store import ResultsStore, STORE_DIR
+
+# postprocess_runner가 남기는 실패 목록
+ERROR_FILE_NAMES = [
+    "retry_step_minus_1.txt",
+    "node_only_no_assets.txt",
+    "missing_both_json_and_assets.txt",
+]
+QUARANTINE_DIR = ".quarantine"
+
+
+# === MANIFEST ===
+def scan(root: Path) -> list:
+    """Every result directory under `root` with its file names and whether its model dir's store records it (one walk)."""
+    manifest, stored = [], {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        if STORE_DIR in dirnames:
+            stored[dirpath] = set(ResultsStore(Path(dirpath)).latest())
+        dirnames[:] = sorted(d for d in dirnames if d not in (STORE_DIR, "assets") and not d.startswith("."))
+        name = os.path.basename(dirpath)
+        if dirpath == str(root) or not is_result_dir(name, filenames):
+            continue
+        dirnames[:] = []
+        parent = os.path.dirname(dirpath)
+        manifest.append({
+            "path": Path(dirpath).relative_to(root).as_posix(),
+            "name": name,
+            "model": os.path.basename(parent),
+            "files": sorted(filenames),
+            "has_store": parent in stored,          # model dir has _results/
+            "stored": name in stored.get(parent, ()),
+        })
+    return manifest
+
+
+def annotate(root: Path, manifest: list) -> list:
+    """Add status and used_model from the results index (only changed results are re-read)."""
+    index = ResultsIndex.for_root(root)
+    index.update(root)
+    rows = {r["path"]: r for r in index.query(columns=["path", "source", "status", "used_model"])}
+    index.close()
+    for entry in manifest:
+        row = rows.get(entry["path"], {})
+        entry["source"] = row.get("source")
+        entry["status"] = row.get("status")
+        entry["used_model"] = row.get("used_model")
+    return manifest
+
+
+def listed_failures(postprocess_root: Path) -> set:
+    """Result paths (relative) named in postprocess failure lists; `<dir>/x.txt` lists results of `<root>/<dir>/`."""
+    postprocess_root = Path(postprocess_root)
+    paths = set()
+    for file_name in ERROR_FILE_NAMES:
+        for txt in postprocess_root.rglob(file_name):
+            rel_dir = txt.parent.relative_to(postprocess_root)
+            with open(txt) as f:
+                paths.update((rel_dir / line.strip()).as_posix() for line in f if line.strip())
+    return paths
+
+
+# === PLAN ===
+def plan(
+    root: Path,
+    manifest: list,
+    renames: list = (),
+    fix_model: str = None,
+    dest: Path = None,
+    drop_status: set = (),
+    drop_paths: set = (),
+    quarantine: bool = False,
+) -> list:
+    """One action per result to change: rename | move | delete | quarantine (conflict and refused are never executed)."""
+    root = Path(root)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    actions, claimed = [], set()
+
+    for entry in manifest:
+        src = root / entry["path"]
+        store = {"name": entry["name"]} if entry.get("stored") else None
+        if entry["path"] in drop_paths or entry.get("status") in drop_status:
+            reason = "listed" if entry["path"] in drop_paths else f"status={entry['status']}"
+            if entry["path"] not in drop_paths and entry.get("has_store") and entry.get("source") != "store":
+                # 저장소가 있는 모델 폴더인데 저장소에 없는 결과: 파일만 보고 매긴 status라 믿을 수 없음
+                actions.append({"op": "refused", "src": str(src), "reason": f"{reason} from per-file fallback, {src.parent / STORE_DIR} exists"})
+            elif quarantine:
+                dst = root / QUARANTINE_DIR / stamp / entry["path"]
+                actions.append({"op": "quarantine", "src": str(src), "dst": str(dst), "reason": reason,
+                                "store": store and {**store, "new_name": entry["name"], "model": entry["model"]}})
+            else:
+                actions.append({"op": "delete", "src": str(src), "reason": reason, "store": store})
+            continue
+
+        name, model, reasons = entry["name"], entry["model"], []
+        moved = False
+        used = entry.get("used_model")
+        if fix_model and entry["model"] == fix_model and used and not used.startswith(fix_model):
+            name = name.replace(f"-{fix_model}-", f"-{used}-", 1)
+            model = used
+            reasons.append(f"used_model={used}")
+            moved = dest is not None
+        for old, new in renames:
+            if old in name:
+                name = name.replace(old, new)
+                model = model.replace(old, new)
+                reasons.append(f"{old}->{new}")
+        if name == entry["name"] and not moved:
+            continue
+
+        dst = (Path(dest) if moved else src.parent) / name
+        action = {
+            "op": "move" if moved else "rename",
+            "src": str(src),
+            "dst": str(dst),
+            "store": store and {**store, "new_name": name, "model": model},
+            # 결과 이름으로 시작하는 파일도 함께 변경 (<name>.json, <name>-step-count.json, ...)
+            "files": [[f, name + f[len(entry["name"]):]] for f in entry["files"] if f.startswith(entry["name"])],
+            "reason": ", ".join(reasons),
+        }
+        if str(dst) in claimed or (dst.exists() and dst != src):
+            action = {**action, "op": "conflict", "reason": f"{action['reason']}; {dst} already exists"}
+        claimed.add(str(dst))
+        actions.append(action)
+    return actions
+
+
+# === EXECUTE ===
+def execute(action: dict) -> dict:
+    src = Path(action["src"])
+    try:
+        if action["op"] == "delete":
+            shutil.rmtree(src)
+        elif action["op"] in ("rename", "move", "quarantine"):
+            for old, new in action.get("files", []):
+                if old != new:
+                    os.rename(src / old, src / new)
+            dst = Path(action["dst"])
+            if dst != src:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.move(str(src), str(dst))
+        else:
+            return {**action, "done": False}
+        return {**action, "done": True}
+    except Exception as e:
+        return {**action, "done": False, "error": str(e)}
+
+
+def update_stores(actions: list):
+    """
+    Follow finished actions in the results stores: re-append the record (and
+    response) under the new name next to the destination, tombstone the old
+    one. Runs serially after the file operations, since every thread of this
+    process would append to the same store segment.
+    """
+    by_model_dir = {}
+    for a in actions:
+        if a.get("done") and a.get("store"):
+            by_model_dir.setdefault(Path(a["src"]).parent, []).append(a)
+    for model_dir, group in by_model_dir.items():
+        store = ResultsStore(model_dir)
+        latest = store.latest()
+        moving = [a["store"]["name"] for a in group if a.get("dst")]
+        responses = dict(store.responses(names=moving)) if moving else {}
+        for a in group:
+            meta = latest.get(a["store"]["name"])
+            if meta is None:
+                continue
+            if a.get("dst"):
+                renamed = {k: v for k, v in meta.items() if k not in ("written_at", "has_response")}
+                renamed.update(result_name=a["store"]["new_name"], model=a["store"]["model"], renamed_from=meta["result_name"])
+                store.append(renamed, responses.get(meta["result_name"]), model_dir=Path(a["dst"]).parent)
+            store.tombstone(meta, model_dir=model_dir)
+
+
+def run(actions: list, workers: int = 8) -> list:
+    todo = [a for a in actions if a["op"] not in ("conflict", "refused")]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        done = list(pool.map(execute, todo))
+    update_stores(done)
+    return done + [a for a in actions if a["op"] in ("conflict", "refused")]
+
+
+def report(actions: list, show: int = 20, applied: bool = False):
+    counts = Counter(a["op"] for a in actions)
+    print(f"[{'APPLIED' if applied else 'DRY-RUN'}] {dict(counts) or 'nothing to do'}")
+    shown = Counter()
+    for a in actions:
+        if shown[a["op"]] >= show:
+            continue
+        shown[a["op"]] += 1
+        target = f" → {a['dst']}" if a.get("dst") else ""
+        status = "" if not applied or a["op"] in ("conflict", "refused") else (" OK" if a.get("done") else f" FAILED {a.get('error', '')}")
+        print(f"  [{a['op'].upper()}] {a['src']}{target} ({a['reason']}){status}")
+    hidden = sum(counts.values()) - sum(shown.values())
+    if hidden:
+        print(f"  ... {hidden} more (see --report)")
+    if applied:
+        failed = sum(1 for a in actions if a["op"] not in ("conflict", "refused") and not a.get("done"))
+        print(f"[DONE] {sum(1 for a in actions if a.get('done'))} done, {failed} failed, "
+              f"{counts['conflict']} conflicts and {counts['refused']} refused skipped")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan and apply batch maintenance on a results tree")
+    parser.add_argument("root", help="results or postprocess directory (scanned recursively)")
+    parser.add_argument("--rename", action="append", default=[], metavar="OLD=NEW", help="replace OLD in result names (repeatable)")
+    parser.add_argument("--fix_model", help="results under this model dir answered by another model get that model's name")
+    parser.add_argument("--dest", help="move --fix_model results here instead of renaming in place")
+    parser.add_argument("--drop_status", help="comma-separated: retry, missing, node_only")
+    parser.add_argument("--drop_listed", help="postprocess root whose failure lists name results to drop")
+    parser.add_argument("--quarantine", action="store_true", help=f"move dropped results to <root>/{QUARANTINE_DIR}/ instead of deleting")
+    parser.add_argument("--apply", action="store_true", help="execute the plan (default: dry run)")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--report", help="write every planned/applied action as JSON lines")
+    parser.add_argument("--show", type=int, default=20, help="actions printed per kind")
+    args = parser.parse_args(argv)
+
+    root = Path(args.root).expanduser()
+    manifest = scan(root)
+    if args.fix_model or args.drop_status:
+        annotate(root, manifest)
+    print(f"[MANIFEST] {len(manifest)} results under {root}")
+
+    renames = [tuple(r.split("=", 1)) for r in args.rename]
+    drop_status = set(args.drop_status.split(",")) if args.drop_status else set()
+    drop_paths = listed_failures(Path(args.drop_listed).expanduser()) if args.drop_listed else set()
+    actions = plan(root, manifest, renames, args.fix_model, Path(args.dest).expanduser() if args.dest else None,
+                   drop_status, drop_paths, args.quarantine)
+
+    if args.apply:
+        actions = run(actions, args.workers)
+    report(actions, args.show, args.apply)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            for a in actions:
+                f.write(json.dumps(a, ensure_ascii=False) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
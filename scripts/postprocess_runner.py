@@ -1,9 +1,20 @@
+import os
+import sys
 import json
+import hashlib
+import argparse
 import requests
 from pathlib import Path
-from PIL import Image, ImageDraw
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from tqdm import tqdm
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+from experiments.asset_store import AssetStore
+from experiments.results_store import ResultsStore, STORE_DIR
+from fastapi_server.compositor import composite
+from fastapi_server.figma_stream import load_file_json
+from fastapi_server.geometry import collect_elements
+
 # === CONFIG ===
 # TASK_IDS = ["task-1", "task-3"]
 # MODEL_DIRS = ["gpt-4o", "gpt-4.1", "claude-3.5-sonnet", "gemini"]
@@ -14,13 +25,9 @@ from tqdm import tqdm
 TASK_IDS = ["task-3"]
 MODEL_DIRS = ["gpt-4o"]
 
+# Same store the runners export into; decoded assets are shared across results
+ASSET_STORE = AssetStore(os.getenv("ASSET_STORE_DIR"))
 
-# === TRACKING ===
-RETRY_LIST = []
-NODE_ONLY_LIST = []
-MISSING_ALL_LIST = []
-RENDERED_OUTPUTS = []
-THUMBNAIL_EXIST_LIST = []
 
 # === UTILS ===
 def get_step_count(path: Path) -> int:
@@ -30,114 +37,180 @@ def get_step_count(path: Path) -> int:
     except:
         return -1
 
-def render_canvas_with_assets(node_json_path: Path, asset_dir: Path, output_img_path: Path):
-    """Figma node hierarchy 기반으로 assets를 붙여 정확히 캔버스 복원"""
-    with open(node_json_path) as f:
-        node_data = json.load(f)
-
-    elements = []
+def render_canvas_with_assets(node_json_path: Path, asset_dir: Path, output_img_path: Path, scale: float = 1.0):
+    """Figma node hierarchy 기반으로 assets를 붙여 정확히 캔버스 복원 (scale < 1: 미리보기용 축소 렌더링)"""
+    node_data = load_file_json(node_json_path)
 
-    def collect_elements(node):
-        if isinstance(node, dict):
-            bounds = node.get("absoluteRenderBounds")
-            node_id = node.get("id")
-            if bounds and node_id:
-                elements.append({
-                    "id": node_id,
-                    "bbox": bounds
-                })
-            for child in node.get("children", []):
-                collect_elements(child)
-
-    collect_elements(node_data.get("document", {}))
+    # absoluteRenderBounds가 있는 노드를 paint 순서대로 수집 (재귀 대신 스택 순회)
+    elements = collect_elements(node_data.get("document", {}))
 
     if not elements:
         print(f"[WARNING] No renderable elements in {node_json_path}")
         return
 
-    # 캔버스 영역 계산
-    min_x = min(e["bbox"]["x"] for e in elements)
-    min_y = min(e["bbox"]["y"] for e in elements)
-    max_x = max(e["bbox"]["x"] + e["bbox"]["width"] for e in elements)
-    max_y = max(e["bbox"]["y"] + e["bbox"]["height"] for e in elements)
-    canvas_width = int(max_x - min_x)
-    canvas_height = int(max_y - min_y)
-
-    # 투명 배경 위에 PNG layer 붙이기
-    canvas = Image.new("RGBA", (canvas_width, canvas_height), (255, 255, 255, 0))
-
-    for el in elements:
-        node_id = el["id"]
-        img_path = asset_dir / f"{node_id}.png"
-        if img_path.exists():
-            try:
-                img = Image.open(img_path).convert("RGBA")
-                x = int(el["bbox"]["x"] - min_x)
-                y = int(el["bbox"]["y"] - min_y)
-                canvas.paste(img, (x, y), mask=img)
-            except Exception as e:
-                print(f"[ERROR] Cannot paste {img_path}: {e}")
-        else:
+    def load(node_id):
+        # 다른 노드에 완전히 가려진 노드는 compositor가 합성 단계에서 건너뜀 (이미지 크기로 판정)
+        try:
+            img = ASSET_STORE.load_image(asset_dir, node_id)
+        except Exception as e:
+            print(f"[ERROR] Cannot load asset {node_id} in {asset_dir}: {e}")
+            return None
+        if img is None:
             print(f"[MISSING] No asset image for node {node_id}")
+        return img
 
     # 흰 배경으로 최종 저장
-    final = Image.new("RGB", canvas.size, (255, 255, 255))
-    final.paste(canvas, mask=canvas.split()[3])
-    final.save(output_img_path)
+    composite(elements, load, scale=scale, background=(255, 255, 255)).save(output_img_path)
+
+
+def node_json_path(expr_dir: Path) -> Path:
+    # Runners with `file_json_gzip: true` save the file JSON as <name>.json.gz
+    path = expr_dir / f"{expr_dir.name}.json"
+    gz_path = expr_dir / f"{expr_dir.name}.json.gz"
+    return gz_path if not path.exists() and gz_path.exists() else path
+
+
+# === MANIFEST ===
+# expr_name -> {"inputs": fingerprint, "status": ...}; bump the version when rendering changes
+MANIFEST_NAME = ".postprocess_manifest.json"
+MANIFEST_VERSION = 3
+OUTPUT_STATUSES = {"rendered", "thumbnail"}
+
+def input_fingerprint(expr_dir: Path, step_count: int = None) -> str:
+    """Size/mtime of every input a result's output depends on (plus its step count from the results store)."""
+    name = expr_dir.name
+    h = hashlib.sha1(f"v{MANIFEST_VERSION}\n{step_count}\n".encode())
+    paths = [expr_dir / f"{name}-step-count.json", node_json_path(expr_dir), expr_dir / f"{name}-json-response.json"]
+    asset_dir = expr_dir / "assets"
+    if asset_dir.is_dir():
+        h.update(b"assets\n")
+        paths += sorted(asset_dir.iterdir())
+    for path in paths:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            h.update(f"{path.relative_to(expr_dir)}:-\n".encode())
+            continue
+        h.update(f"{path.relative_to(expr_dir)}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+def load_manifest(postprocess_dir: Path) -> dict:
+    try:
+        with open(postprocess_dir / MANIFEST_NAME) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def save_manifest(postprocess_dir: Path, manifest: dict):
+    tmp = postprocess_dir / f"{MANIFEST_NAME}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, postprocess_dir / MANIFEST_NAME)
+
+def is_up_to_date(expr_dir: Path, entry: dict, fingerprint: str) -> bool:
+    if not entry or entry.get("inputs") != fingerprint:
+        return False
+    if entry.get("status") in OUTPUT_STATUSES:
+        return (expr_dir / f"{expr_dir.name}.png").exists()
+    return entry.get("status") != "node_only"  # thumbnail not fetched yet: try again
 
 
 # === MAIN PROCESSING ===
-def process_postprocess_dir(task_id, model_dir):
-    POSTPROCESS_DIR = Path(f"/home/seooyxx/kixlab/samsung-cxi-mcp-server/dataset/postprocess/modification_gen/without_oracle/{task_id}/without_oracle/{model_dir}").expanduser()
-    RETRY_LIST = []
-    NODE_ONLY_LIST = []
-    MISSING_ALL_LIST = []
-    RENDERED_OUTPUTS = []
+def process_expr_dir(expr_dir: Path, step_count: int = None) -> str:
+    """Render (or fetch the thumbnail of) one result; returns its status."""
+    expr_name = expr_dir.name
+    if step_count is None:
+        step_count = get_step_count(expr_dir / f"{expr_name}-step-count.json")
+
+    if step_count == -1:
+        return "retry"
+
+    node_json = node_json_path(expr_dir)
+    asset_dir = expr_dir / "assets"
+    output_img_path = expr_dir / f"{expr_name}.png"
+
+    if node_json.exists() and asset_dir.exists():
+        render_canvas_with_assets(node_json, asset_dir, output_img_path)
+        return "rendered"
+
+    elif node_json.exists():
+        data = load_file_json(node_json)
+        url = data.get("thumbnailUrl")
+        if url:
+            try:
+                response = requests.get(url)
+                with open(output_img_path, "wb") as out:
+                    out.write(response.content)
+                return "thumbnail"
+            except Exception as e:
+                print(f"[ERROR] Thumbnail download failed for {expr_name}: {e}")
+        else:
+            print(f"[WARNING] No thumbnailUrl for {expr_name}")
+        return "node_only"
 
-    expr_dirs = [d for d in POSTPROCESS_DIR.iterdir() if d.is_dir()]
-    total = len(expr_dirs)
+    else:
+        resp_path = expr_dir / f"{expr_name}-json-response.json"
+        if resp_path.exists():
+            print(f"[INFO] {expr_name} json-response exists")
+        else:
+            print(f"[MISSING] No response.json for {expr_name}")
+        return "missing"
 
-    for expr_dir in tqdm(expr_dirs, desc=f"Processing Experiments [{task_id}/{model_dir}]"):
-        expr_name = expr_dir.name
-        step_path = expr_dir / f"{expr_name}-step-count.json"
-        step_count = get_step_count(step_path)
+def _process(expr_dir: Path, step_count: int = None):
+    try:
+        return expr_dir.name, process_expr_dir(expr_dir, step_count)
+    except Exception as e:
+        print(f"[ERROR] {expr_dir.name}: {e}")
+        return expr_dir.name, "error"
 
-        if step_count == -1:
-            RETRY_LIST.append(expr_name)
-            continue
+def process_postprocess_dir(task_id, model_dir, workers: int = None, force: bool = False):
+    POSTPROCESS_DIR = Path(f"/home/seooyxx/kixlab/samsung-cxi-mcp-server/dataset/postprocess/modification_gen/without_oracle/{task_id}/without_oracle/{model_dir}").expanduser()
+
+    # 결과 저장소(_results/)에 기록된 결과는 step count 등을 파일 대신 저장소에서 읽음
+    records = ResultsStore(POSTPROCESS_DIR).latest()
+    names = {d.name for d in POSTPROCESS_DIR.iterdir() if d.is_dir() and d.name != STORE_DIR} | set(records)
+    expr_dirs = [POSTPROCESS_DIR / name for name in sorted(names)]
+    step_counts = {name: r.get("step_count", -1) for name, r in records.items()}
+    total = len(expr_dirs)
 
-        node_json = expr_dir / f"{expr_name}.json"
-        asset_dir = expr_dir / "assets"
-        output_img_path = expr_dir / f"{expr_name}.png"
-
-        if node_json.exists() and asset_dir.exists():
-            render_canvas_with_assets(node_json, asset_dir, output_img_path)
-            RENDERED_OUTPUTS.append(expr_name)
-
-        elif node_json.exists():
-            NODE_ONLY_LIST.append(expr_name)
-            with open(node_json) as f:
-                data = json.load(f)
-            url = data.get("thumbnailUrl")
-            if url:
-                try:
-                    response = requests.get(url)
-                    with open(output_img_path, "wb") as out:
-                        out.write(response.content)
-                    THUMBNAIL_EXIST_LIST.append(expr_name)
-                except Exception as e:
-                    print(f"[ERROR] Thumbnail download failed for {expr_name}: {e}")
-            else:
-                print(f"[WARNING] No thumbnailUrl for {expr_name}")
+    # 입력이 바뀌지 않은 결과는 건너뛰고 나머지만 process pool에서 처리
+    old_manifest = {} if force else load_manifest(POSTPROCESS_DIR)
+    manifest, statuses, stale = {}, {}, []
+    for expr_dir in expr_dirs:
+        fingerprint = input_fingerprint(expr_dir, step_counts.get(expr_dir.name))
+        entry = old_manifest.get(expr_dir.name)
+        if is_up_to_date(expr_dir, entry, fingerprint):
+            manifest[expr_dir.name] = entry
+            statuses[expr_dir.name] = entry["status"]
+        else:
+            manifest[expr_dir.name] = {"inputs": fingerprint, "status": None}
+            stale.append(expr_dir)
+    print(f"[MANIFEST] {total - len(stale)} up to date, {len(stale)} to process")
 
+    try:
+        desc = f"Processing Experiments [{task_id}/{model_dir}]"
+        if workers == 1 or len(stale) <= 1:
+            for expr_dir in tqdm(stale, desc=desc):
+                name, status = _process(expr_dir, step_counts.get(expr_dir.name))
+                statuses[name] = manifest[name]["status"] = status
         else:
-            MISSING_ALL_LIST.append(expr_name)
-            resp_path = expr_dir / f"{expr_name}-json-response.json"
-            if resp_path.exists():
-                with open(resp_path) as f:
-                    print(f"[INFO] {expr_name} json-response exists")
-            else:
-                print(f"[MISSING] No response.json for {expr_name}")
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(_process, expr_dir, step_counts.get(expr_dir.name)) for expr_dir in stale]
+                for future in tqdm(as_completed(futures), total=len(futures), desc=desc):
+                    name, status = future.result()
+                    statuses[name] = manifest[name]["status"] = status
+    finally:
+        # error는 기록하지 않음: 다음 실행에서 다시 처리
+        save_manifest(POSTPROCESS_DIR, {name: e for name, e in manifest.items() if e["status"] not in (None, "error")})
+
+    RETRY_LIST = [n for n, s in statuses.items() if s == "retry"]
+    NODE_ONLY_LIST = [n for n, s in statuses.items() if s in ("node_only", "thumbnail")]
+    THUMBNAIL_EXIST_LIST = [n for n, s in statuses.items() if s == "thumbnail"]
+    MISSING_ALL_LIST = [n for n, s in statuses.items() if s == "missing"]
+    RENDERED_OUTPUTS = [n for n, s in statuses.items() if s == "rendered"]
+    NO_THUMBNAIL_LIST = [n for n, s in statuses.items() if s == "node_only"]
+    ERROR_LIST = [n for n, s in statuses.items() if s == "error"]
+    counted = len(RETRY_LIST) + len(THUMBNAIL_EXIST_LIST) + len(NO_THUMBNAIL_LIST) + len(MISSING_ALL_LIST) + len(RENDERED_OUTPUTS) + len(ERROR_LIST)
 
     print(f"\n=== SUMMARY for {task_id}/{model_dir} ===")
     print(f"Total experiments: {total}")
@@ -145,10 +218,10 @@ def process_postprocess_dir(task_id, model_dir):
     # print(f"- Node JSON only (no assets): {len(NODE_ONLY_LIST)}")
     print(f"- Missing both node json & assets: {len(MISSING_ALL_LIST)}")
     print(f"- Thumbnail export list: {len(THUMBNAIL_EXIST_LIST)}")
+    print(f"- Node JSON without thumbnail: {len(NO_THUMBNAIL_LIST)}")
     print(f"- Rendered: {len(RENDERED_OUTPUTS)}")
-    print(f"- Sum: {len(RETRY_LIST) + len(THUMBNAIL_EXIST_LIST) + len(MISSING_ALL_LIST) + len(RENDERED_OUTPUTS)}")
-
-    assert total == (len(RETRY_LIST) + len(THUMBNAIL_EXIST_LIST) + len(MISSING_ALL_LIST) + len(RENDERED_OUTPUTS)), "Mismatch in total count!"
+    print(f"- Errors: {len(ERROR_LIST)}")
+    print(f"- Sum: {counted}")
 
     with open(POSTPROCESS_DIR / "retry_step_minus_1.txt", "w") as f:
         for name in RETRY_LIST:
@@ -159,9 +232,20 @@ def process_postprocess_dir(task_id, model_dir):
     with open(POSTPROCESS_DIR /"missing_both_json_and_assets.txt", "w") as f:
         for name in MISSING_ALL_LIST:
             f.write(name + "\n")
+    with open(POSTPROCESS_DIR / "postprocess_error.txt", "w") as f:
+        for name in ERROR_LIST:
+            f.write(name + "\n")
+
+    # 목록을 모두 쓴 뒤에 확인
+    assert total == counted, "Mismatch in total count!"
 
 # === ENTRY POINT ===
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Processes to render with (1: in-process)")
+    parser.add_argument("--force", action="store_true", help="Ignore the manifest and re-render everything")
+    args = parser.parse_args()
+
     for task_id in TASK_IDS:
         for model_dir in MODEL_DIRS:
-            process_postprocess_dir(task_id, model_dir)
\ No newline at end of file
+            process_postprocess_dir(task_id, model_dir, workers=args.workers, force=args.force)
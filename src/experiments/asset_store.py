@@ -0,0 +1,135 @@
+import os
+import json
+import shutil
+import hashlib
+from io import BytesIO
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional
+
+from PIL import Image
+
+INDEX_NAME = "index.json"
+
+
+class AssetStore:
+    """
+    Content-addressed store for exported node images.
+
+    Objects live once under `root/objects/<aa>/<sha256>.<ext>`; a result's
+    `assets/{node_id}.png` is a hardlink to its object (a copy where the
+    filesystem cannot link) and `assets/index.json` maps node ids to digests.
+    Decoded images are cached by digest so identical assets across results
+    are decoded once per process.
+
+    `root=None` gives a read-only store that only resolves result dirs.
+    """
+
+    def __init__(self, root: Optional[Path] = None, cache_size: int = 512):
+        self.root = Path(root) if root else None
+        self.cache_size = cache_size
+        self._images = OrderedDict()
+        self.stats = {"stored": 0, "deduped": 0, "decoded": 0, "cache_hits": 0}
+
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    def object_path(self, digest: str, ext: str = "png") -> Path:
+        if self.root is None:
+            raise ValueError("AssetStore has no root; cannot store objects")
+        return self.root / "objects" / digest[:2] / f"{digest}.{ext}"
+
+    # ---------- write ----------
+    def put(self, data: bytes, ext: str = "png") -> str:
+        digest = self.digest(data)
+        path = self.object_path(digest, ext)
+        if path.exists():
+            self.stats["deduped"] += 1
+            return digest
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        self.stats["stored"] += 1
+        return digest
+
+    def link(self, digest: str, dest: Path, ext: str = "png"):
+        src = self.object_path(digest, ext)
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if dest.exists():
+            dest.unlink()
+        try:
+            os.link(src, dest)
+        except OSError:
+            shutil.copyfile(src, dest)
+
+    def put_asset(self, data: bytes, asset_dir: Path, node_id: str, ext: str = "png") -> Path:
+        """Store `data` and expose it as `asset_dir/{node_id}.{ext}`, recording it in the index."""
+        digest = self.put(data, ext)
+        dest = Path(asset_dir) / f"{node_id}.{ext}"
+        self.link(digest, dest, ext)
+        return dest
+
+    @staticmethod
+    def write_index(asset_dir: Path, digests: dict):
+        index_path = Path(asset_dir) / INDEX_NAME
+        index = read_index(asset_dir)
+        index.update(digests)
+        index_path.parent.mkdir(parents=True, exist_ok=True)
+        index_path.write_text(json.dumps(index, indent=2), encoding="utf-8")
+
+    def export_assets(self, asset_dir: Path, images: dict, ext: str = "png") -> list:
+        """Store {node_id: bytes} for one result and return the written asset paths."""
+        paths, digests = [], {}
+        for node_id, data in images.items():
+            paths.append(str(self.put_asset(data, asset_dir, node_id, ext)))
+            digests[node_id] = self.digest(data)
+        self.write_index(asset_dir, digests)
+        return paths
+
+    # ---------- lookup ----------
+    def lookup(self, asset_dir: Path, node_id: str, ext: str = "png"):
+        """(digest, path) of a result's asset, or (None, None) if it has none."""
+        asset_dir = Path(asset_dir)
+        path = asset_dir / f"{node_id}.{ext}"
+        digest = read_index(asset_dir).get(node_id)
+        if digest and not path.exists() and self.root is not None:
+            path = self.object_path(digest, ext)
+        if not path.exists():
+            return None, None
+        return digest, path
+
+    def load_image(self, asset_dir: Path, node_id: str, ext: str = "png") -> Optional[Image.Image]:
+        """Decoded RGBA image of a result's asset, shared with every result holding the same bytes."""
+        digest, path = self.lookup(asset_dir, node_id, ext)
+        if path is None:
+            return None
+        data = None
+        if digest is None:
+            # Result exported before the store existed: hash the file itself
+            data = path.read_bytes()
+            digest = self.digest(data)
+
+        if digest in self._images:
+            self._images.move_to_end(digest)
+            self.stats["cache_hits"] += 1
+            return self._images[digest]
+
+        img = Image.open(BytesIO(data if data is not None else path.read_bytes())).convert("RGBA")
+        self.stats["decoded"] += 1
+        self._images[digest] = img
+        if len(self._images) > self.cache_size:
+            self._images.popitem(last=False)
+        return img
+
+
+def read_index(asset_dir: Path) -> dict:
+    index_path = Path(asset_dir) / INDEX_NAME
+    if not index_path.exists():
+        return {}
+    try:
+        return json.loads(index_path.read_text(encoding="utf-8"))
+    except ValueError:
+        return {}
@@ -0,0 +1,338 @@
+"""
+Visual similarity of rendered results against the benchmark ground truth.
+
+Every indexed result with a `<result>.png` (see scripts/postprocess_runner.py)
+is scored against `<benchmark_dir>/<base_id>.png`:
+
+    mse     mean squared error of RGB in [0, 1] (lower is better)
+    ssim    structural similarity of luma, 7x7 uniform window (1 = identical)
+    phash   Hamming distance of 64-bit perceptual hashes (0 = same)
+
+Images are resized to a common evaluation size and scored in batches of
+stacked arrays across a process pool. Ground-truth images are decoded once
+into `<benchmark_dir>/.eval_cache/<W>x<H>/<base_id>.npz` and reused by later
+runs until the PNG changes.
+
+With `--structure`, results also get node-level precision / recall / F1:
+absoluteBoundingBox boxes of `<result>.json` are matched one-to-one by IoU
+against those of `<benchmark_dir>/<base_id>.json` (see fastapi_server/geometry.py).
+
+    python -m experiments.evaluate ../dataset/results/generation_gen/2025-05-01-12-00-00 \\
+        --config_name=multi-generation
+    python -m experiments.evaluate <root> --benchmark_dir ../dataset/benchmarks/modification_gt/task-1 --model gpt-4o
+
+Scores go to `<out_dir>/<model>/<variant>.jsonl` (default out_dir: `<root>/evaluation`)
+with means per model/variant in `<out_dir>/summary.json`.
+"""
+import os
+import sys
+import json
+import argparse
+from pathlib import Path
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from experiments.results_index import ResultsIndex
+from fastapi_server.figma_stream import load_file_json
+from fastapi_server.geometry import Boxes, BOUNDING_BOX, structural_scores
+
+EVAL_SIZE = (256, 256)
+CACHE_DIR = ".eval_cache"
+SSIM_WINDOW = 7
+SSIM_C1 = (0.01 * 255) ** 2
+SSIM_C2 = (0.03 * 255) ** 2
+HASH_SIZE = 8
+HASH_THUMB = 32
+LUMA = np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+# ---------- preprocessing ----------
+def preprocess(path: Path, size: tuple = EVAL_SIZE) -> dict:
+    """RGB at the evaluation size (transparency flattened onto white) and the grayscale hash thumbnail."""
+    with Image.open(path) as img:
+        original = img.size
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            flat = Image.new("RGB", img.size, (255, 255, 255))
+            flat.paste(img, mask=img.getchannel("A"))
+            img = flat
+        else:
+            img = img.convert("RGB")
+        rgb = np.asarray(img.resize(size, Image.BILINEAR), dtype=np.uint8)
+        thumb = np.asarray(img.convert("L").resize((HASH_THUMB, HASH_THUMB), Image.LANCZOS), dtype=np.float32)
+    return {"rgb": rgb, "thumb": thumb, "original": np.array(original)}
+
+
+def cache_path(cache_dir: Path, base_id: str) -> Path:
+    return Path(cache_dir) / f"{base_id}.npz"
+
+
+def is_cached(gt_path: Path, cached: Path) -> bool:
+    try:
+        return cached.stat().st_mtime_ns >= gt_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def cache_ground_truth(items: list, cache_dir: Path, size: tuple) -> int:
+    """Decode [(base_id, gt_path)] into the cache; returns how many were written."""
+    written = 0
+    for base_id, gt_path in items:
+        data = preprocess(gt_path, size)
+        target = cache_path(cache_dir, base_id)
+        tmp = target.with_name(f".{target.name}.{os.getpid()}.tmp.npz")
+        np.savez(tmp, rgb=data["rgb"], hash=phash_bits(data["thumb"][None])[0], original=data["original"])
+        os.replace(tmp, target)
+        written += 1
+    return written
+
+
+@lru_cache(maxsize=512)
+def load_ground_truth(cached: str) -> dict:
+    with np.load(cached) as data:
+        return {k: data[k] for k in data.files}
+
+
+@lru_cache(maxsize=512)
+def load_boxes(path: str) -> Boxes:
+    return Boxes.from_file_json(load_file_json(path), BOUNDING_BOX)
+
+
+def file_json_of(directory: Path, stem: str):
+    for suffix in (".json", ".json.gz"):
+        path = directory / f"{stem}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+# ---------- batched metrics ----------
+def mse(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Per-image MSE of (B, H, W, 3) uint8 batches, in [0, 1] units."""
+    diff = a.astype(np.float32) / 255 - b.astype(np.float32) / 255
+    return np.mean(diff * diff, axis=(1, 2, 3))
+
+
+def _box_mean(x: np.ndarray, k: int) -> np.ndarray:
+    """k x k moving average over the last two axes ('valid' region) via an integral image."""
+    s = np.zeros((x.shape[0], x.shape[1] + 1, x.shape[2] + 1), dtype=np.float64)
+    np.cumsum(np.cumsum(x, axis=1), axis=2, out=s[:, 1:, 1:])
+    return (s[:, k:, k:] - s[:, :-k, k:] - s[:, k:, :-k] + s[:, :-k, :-k]) / (k * k)
+
+
+def ssim(a: np.ndarray, b: np.ndarray, window: int = SSIM_WINDOW) -> np.ndarray:
+    """Per-image mean SSIM of (B, H, W) grayscale batches in [0, 255] (uniform window, sample covariance)."""
+    a = a.astype(np.float64)
+    b = b.astype(np.float64)
+    cov_norm = window * window / (window * window - 1)
+    mu_a, mu_b = _box_mean(a, window), _box_mean(b, window)
+    var_a = cov_norm * (_box_mean(a * a, window) - mu_a * mu_a)
+    var_b = cov_norm * (_box_mean(b * b, window) - mu_b * mu_b)
+    cov = cov_norm * (_box_mean(a * b, window) - mu_a * mu_b)
+    num = (2 * mu_a * mu_b + SSIM_C1) * (2 * cov + SSIM_C2)
+    den = (mu_a * mu_a + mu_b * mu_b + SSIM_C1) * (var_a + var_b + SSIM_C2)
+    return np.mean(num / den, axis=(1, 2))
+
+
+@lru_cache(maxsize=1)
+def _dct_matrix(n: int = HASH_THUMB) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    m = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    m[0] /= np.sqrt(2)
+    return m
+
+
+def phash_bits(thumbs: np.ndarray) -> np.ndarray:
+    """(B, 64) bool perceptual hashes of (B, 32, 32) grayscale thumbnails: low-frequency DCT above its median."""
+    d = _dct_matrix()
+    coeffs = d @ thumbs.astype(np.float64) @ d.T
+    low = coeffs[:, :HASH_SIZE, :HASH_SIZE].reshape(len(thumbs), -1)
+    return low > np.median(low, axis=1, keepdims=True)
+
+
+def gray(rgb: np.ndarray) -> np.ndarray:
+    return rgb.astype(np.float32) @ LUMA
+
+
+# ---------- scoring ----------
+def score_batch(items: list, cache_dir: Path, size: tuple = EVAL_SIZE) -> list:
+    """Score [{path, png, base_id, ...}] whose ground truth is cached; one row per item."""
+    rows, gen, gts = [], [], []
+    for item in items:
+        row = {k: item[k] for k in ("path", "result_name", "model", "variant", "base_id")}
+        try:
+            gt = load_ground_truth(str(cache_path(cache_dir, item["base_id"])))
+            data = preprocess(item["png"], size)
+        except Exception as e:
+            rows.append({**row, "error": str(e)})
+            continue
+        row["size"] = data["original"].tolist()
+        row["gt_size"] = gt["original"].tolist()
+        if item.get("file_json") and item.get("gt_json"):
+            try:
+                row["structure"] = structural_scores(load_boxes(str(item["gt_json"])), load_boxes(str(item["file_json"])))
+            except Exception as e:
+                row["structure"] = {"error": str(e)}
+        rows.append(row)
+        gen.append(data)
+        gts.append(gt)
+    if not gen:
+        return rows
+
+    gen_rgb = np.stack([g["rgb"] for g in gen])
+    gt_rgb = np.stack([g["rgb"] for g in gts])
+    scores = zip(
+        mse(gen_rgb, gt_rgb),
+        ssim(gray(gen_rgb), gray(gt_rgb)),
+        np.count_nonzero(phash_bits(np.stack([g["thumb"] for g in gen])) != np.stack([g["hash"] for g in gts]), axis=1),
+    )
+    for row in (r for r in rows if "error" not in r):
+        m, s, p = next(scores)
+        row.update(mse=round(float(m), 6), ssim=round(float(s), 6), phash=int(p))
+    return rows
+
+
+def _chunks(items: list, n: int) -> list:
+    return [items[i:i + n] for i in range(0, len(items), n)]
+
+
+def _mean(values: list):
+    return round(sum(values) / len(values), 6) if values else None
+
+
+def summarize(rows: list) -> list:
+    grouped = {}
+    for row in rows:
+        grouped.setdefault((row["model"], row["variant"]), []).append(row)
+    summary = []
+    for (model, variant), group in sorted(grouped.items(), key=lambda kv: tuple(str(x) for x in kv[0])):
+        scored = [r for r in group if "error" not in r]
+        summary.append({
+            "model": model,
+            "variant": variant,
+            "results": len(group),
+            "scored": len(scored),
+            "mse": _mean([r["mse"] for r in scored]),
+            "ssim": _mean([r["ssim"] for r in scored]),
+            "phash": _mean([r["phash"] for r in scored]),
+        })
+        structure = [r["structure"] for r in scored if "f1" in r.get("structure", {})]
+        if structure:
+            summary[-1].update({f"structure_{k}": _mean([x[k] for x in structure]) for k in ("precision", "recall", "f1")})
+    return summary
+
+
+def evaluate(
+    root: Path,
+    benchmark_dir: Path,
+    out_dir: Path = None,
+    size: tuple = EVAL_SIZE,
+    workers: int = None,
+    batch_size: int = 32,
+    where: str = None,
+    params: list = (),
+    structure: bool = False,
+) -> list:
+    """Score every rendered result under `root`; writes per model/variant rows and returns the summary."""
+    root, benchmark_dir = Path(root), Path(benchmark_dir)
+    out_dir = Path(out_dir) if out_dir else root / "evaluation"
+    cache_dir = benchmark_dir / CACHE_DIR / f"{size[0]}x{size[1]}"
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    index = ResultsIndex.for_root(root)
+    index.update(root)
+    condition = "has_png = 1" + (f" AND ({where})" if where else "")
+    results = index.query(condition, params, ["path", "result_name", "model", "variant", "base_id"])
+    index.close()
+
+    items, skipped = [], []
+    for r in results:
+        gt_path = benchmark_dir / f"{r['base_id']}.png"
+        if r["base_id"] is None or not gt_path.exists():
+            skipped.append({**r, "error": f"no ground truth {gt_path.name}"})
+            continue
+        item = {**r, "png": root / r["path"] / f"{r['result_name']}.png", "gt": gt_path}
+        if structure:
+            item["file_json"] = file_json_of(root / r["path"], r["result_name"])
+            item["gt_json"] = file_json_of(benchmark_dir, r["base_id"])
+        items.append(item)
+
+    ground_truth = sorted({(i["base_id"], i["gt"]) for i in items})
+    stale = [(b, p) for b, p in ground_truth if not is_cached(p, cache_path(cache_dir, b))]
+    # Results of one base_id go to the same batch so each worker decodes its ground truth once
+    batches = _chunks(sorted(items, key=lambda i: (i["base_id"], i["path"])), batch_size)
+    print(f"[EVAL] {len(items)} results, {len(ground_truth)} ground truths ({len(stale)} to cache), {len(skipped)} skipped")
+
+    rows = list(skipped)
+    if workers == 1 or len(batches) <= 1:
+        cache_ground_truth(stale, cache_dir, size)
+        for batch in batches:
+            rows += score_batch(batch, cache_dir, size)
+    else:
+        n = workers or os.cpu_count()
+        with ProcessPoolExecutor(max_workers=n) as pool:
+            list(pool.map(cache_ground_truth, _chunks(stale, max(1, -(-len(stale) // n))),
+                          [cache_dir] * n, [size] * n))
+            for batch_rows in pool.map(score_batch, batches, [cache_dir] * len(batches), [size] * len(batches)):
+                rows += batch_rows
+
+    by_partition = {}
+    for row in rows:
+        by_partition.setdefault((row["model"] or "_unknown", row["variant"] or "_unknown"), []).append(row)
+    for (model, variant), group in by_partition.items():
+        path = out_dir / model / f"{variant}.jsonl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for row in sorted(group, key=lambda r: r["path"]):
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    summary = summarize(rows)
+    with open(out_dir / "summary.json", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score rendered results against the benchmark ground truth")
+    parser.add_argument("root", help="results (or postprocess) directory")
+    parser.add_argument("--benchmark_dir", help="directory with <base_id>.png")
+    parser.add_argument("--config_name", help="take benchmark_dir from this expr config instead")
+    parser.add_argument("--out_dir", help="default: <root>/evaluation")
+    parser.add_argument("--model", help="comma-separated")
+    parser.add_argument("--variant", help="comma-separated")
+    parser.add_argument("--size", default=f"{EVAL_SIZE[0]}x{EVAL_SIZE[1]}", help="evaluation size WxH")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes to score with (1: in-process)")
+    parser.add_argument("--batch_size", type=int, default=32)
+    parser.add_argument("--structure", action="store_true", help="also match node boxes against <benchmark_dir>/<base_id>.json")
+    args = parser.parse_args(argv)
+
+    benchmark_dir = args.benchmark_dir
+    if benchmark_dir is None:
+        if not args.config_name:
+            parser.error("--benchmark_dir or --config_name is required")
+        from config import load_experiment_config
+        benchmark_dir = load_experiment_config(args.config_name)["benchmark_dir"]
+
+    clauses, params = [], []
+    for column in ("model", "variant"):
+        value = getattr(args, column)
+        if value:
+            values = value.split(",")
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params += values
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+
+    summary = evaluate(args.root, benchmark_dir, args.out_dir, size, args.workers, args.batch_size,
+                       " AND ".join(clauses) or None, params, args.structure)
+    for row in summary:
+        print(f"{row['model']:<24} {row['variant']:<24} scored={row['scored']}/{row['results']:<6} "
+              f"mse={row['mse']} ssim={row['ssim']} phash={row['phash']}"
+              + (f" f1={row['structure_f1']}" if "structure_f1" in row else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import asyncio
+from typing import Awaitable, Callable
+
+
+class ExportStage:
+    """
+    Background stage for the part of a job that no longer needs the canvas:
+    asset downloads and result writes.
+
+    A channel hands its finished job over with `submit` and moves straight on
+    to the next reset and agent run. At most `max_pending` jobs are in flight;
+    `submit` waits for a free slot so a slow download backs the runner off
+    instead of piling up snapshots in memory. It returns the save's task,
+    which resolves to whether the save succeeded.
+    """
+
+    def __init__(self, max_pending: int = 4, log: Callable[[str], None] = print):
+        self.max_pending = max_pending
+        self.log = log
+        self.slots = asyncio.Semaphore(max_pending)
+        self.tasks = set()
+        self.results = {}
+
+    async def submit(self, name: str, save: Awaitable[bool]) -> asyncio.Task:
+        await self.slots.acquire()
+        task = asyncio.create_task(self._run(name, save))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def _run(self, name: str, save: Awaitable[bool]) -> bool:
+        try:
+            self.results[name] = bool(await save)
+        except Exception as e:
+            self.log(f"[EXPORT-FAIL] {name}: {e}")
+            self.results[name] = False
+        finally:
+            self.slots.release()
+        return self.results[name]
+
+    async def drain(self) -> dict:
+        """Wait for every submitted job and return a summary."""
+        while self.tasks:
+            await asyncio.gather(*list(self.tasks))
+        return {
+            "saved": sum(self.results.values()),
+            "failed": sorted(name for name, ok in self.results.items() if not ok),
+        }
@@ -0,0 +1,131 @@
+import time
+import sqlite3
+from pathlib import Path
+from typing import Callable, Iterable
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    result_name TEXT PRIMARY KEY,
+    base_id TEXT NOT NULL,
+    variant TEXT NOT NULL,
+    model_name TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',   -- pending | running | done | failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    channel TEXT,
+    started_at REAL,
+    finished_at REAL,
+    elapsed REAL,
+    error TEXT
+);
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    result_name TEXT NOT NULL,
+    state TEXT NOT NULL,
+    channel TEXT,
+    at REAL NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs(model_name, state);
+"""
+
+
+class JobLedger:
+    """
+    SQLite record of every experiment job: current state, attempts, timings
+    and last error, plus an append-only log of state transitions.
+
+    Every transition is its own transaction, so a crash loses at most the job
+    that was running; `recover()` puts such jobs back to pending on restart.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def _event(self, result_name: str, state: str, channel: str = None, error: str = None):
+        self.conn.execute(
+            "INSERT INTO events (result_name, state, channel, at, error) VALUES (?, ?, ?, ?, ?)",
+            (result_name, state, channel, time.time(), error),
+        )
+
+    def register(self, jobs: Iterable, is_done: Callable = None) -> int:
+        """
+        Add jobs the ledger has not seen yet. `is_done(job)` is asked once per
+        new job so results produced before the ledger existed are not re-run.
+        """
+        known = {row[0] for row in self.conn.execute("SELECT result_name FROM jobs")}
+        added = 0
+        with self.conn:
+            self.conn.execute("BEGIN")
+            for job in jobs:
+                if job.result_name in known:
+                    continue
+                state = "done" if is_done and is_done(job) else "pending"
+                self.conn.execute(
+                    "INSERT INTO jobs (result_name, base_id, variant, model_name, state) VALUES (?, ?, ?, ?, ?)",
+                    (job.result_name, job.base_id, job.variant, job.model_name, state),
+                )
+                self._event(job.result_name, state)
+                added += 1
+        return added
+
+    def recover(self) -> list:
+        """Return jobs left `running` by a crashed run to pending."""
+        rows = [r[0] for r in self.conn.execute("SELECT result_name FROM jobs WHERE state = 'running'")]
+        with self.conn:
+            self.conn.execute("BEGIN")
+            for name in rows:
+                self.conn.execute("UPDATE jobs SET state = 'pending', error = 'interrupted' WHERE result_name = ?", (name,))
+                self._event(name, "pending", error="interrupted")
+        return rows
+
+    def pending(self, model_name: str, variants: list = None) -> set:
+        """Result names that still need a run, in one query."""
+        query = "SELECT result_name FROM jobs WHERE model_name = ? AND state != 'done'"
+        params = [model_name]
+        if variants:
+            query += f" AND variant IN ({','.join('?' * len(variants))})"
+            params += list(variants)
+        return {row[0] for row in self.conn.execute(query, params)}
+
+    def start(self, result_name: str, channel: str = None):
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, channel = ?, started_at = ?, "
+                "finished_at = NULL, elapsed = NULL, error = NULL WHERE result_name = ?",
+                (channel, time.time(), result_name),
+            )
+            self._event(result_name, "running", channel)
+
+    def finish(self, result_name: str, ok: bool, error: str = None):
+        state = "done" if ok else "failed"
+        now = time.time()
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.execute(
+                "UPDATE jobs SET state = ?, finished_at = ?, elapsed = ? - started_at, error = ? WHERE result_name = ?",
+                (state, now, now, error, result_name),
+            )
+            channel = self.conn.execute("SELECT channel FROM jobs WHERE result_name = ?", (result_name,)).fetchone()
+            self._event(result_name, state, channel[0] if channel else None, error)
+
+    def get(self, result_name: str) -> dict:
+        cur = self.conn.execute("SELECT * FROM jobs WHERE result_name = ?", (result_name,))
+        row = cur.fetchone()
+        return dict(zip([c[0] for c in cur.description], row)) if row else None
+
+    def summary(self, model_name: str = None) -> dict:
+        query = "SELECT state, COUNT(*) FROM jobs"
+        params = []
+        if model_name:
+            query += " WHERE model_name = ?"
+            params.append(model_name)
+        return dict(self.conn.execute(query + " GROUP BY state", params).fetchall())
@@ -0,0 +1,339 @@
+"""
+SQLite index of per-result metadata, so questions about a sweep are queries
+instead of a full `rglob` + parse of every `-json-response.json`.
+
+One row per result directory: the model that actually answered, step count,
+status, token usage, tool-call counts and which artifacts exist. `update`
+only re-parses results whose files (or results store line) changed since the
+last run, and drops rows whose result is gone.
+
+    python -m experiments.results_index update ../dataset/results/modification_gen
+    python -m experiments.results_index query ../dataset/results/modification_gen \\
+        --model gpt-4o --where "used_model NOT LIKE 'gpt-4o%'" --columns path,used_model
+    python -m experiments.results_index query ../dataset/postprocess/... --status retry,missing --format names
+
+status is what postprocess_runner would make of the result: `retry` (step count -1),
+`ok` (file JSON and assets), `node_only` (file JSON only) or `missing`.
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+from pathlib import Path
+from collections import Counter
+
+from experiments.results_store import ResultsStore, STORE_DIR
+
+INDEX_NAME = "results_index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    path TEXT PRIMARY KEY,           -- result directory, relative to the indexed root
+    result_name TEXT NOT NULL,
+    model TEXT,                      -- model directory / configured model
+    variant TEXT,
+    base_id TEXT,
+    source TEXT NOT NULL,            -- store | files
+    signature TEXT NOT NULL,
+    status TEXT NOT NULL,            -- ok | node_only | retry | missing
+    step_count INTEGER,
+    used_model TEXT,                 -- model_name reported in the agent's response
+    input_tokens INTEGER,
+    output_tokens INTEGER,
+    total_tokens INTEGER,
+    tool_calls INTEGER,
+    tool_counts TEXT,                -- JSON {tool_name: calls}
+    has_response INTEGER,
+    has_file_json INTEGER,
+    asset_count INTEGER,
+    has_png INTEGER,
+    indexed_at REAL
+);
+CREATE INDEX IF NOT EXISTS results_model ON results(model, variant);
+CREATE INDEX IF NOT EXISTS results_status ON results(status);
+"""
+COLUMNS = [
+    "path", "result_name", "model", "variant", "base_id", "source", "signature", "status", "step_count",
+    "used_model", "input_tokens", "output_tokens", "total_tokens", "tool_calls", "tool_counts",
+    "has_response", "has_file_json", "asset_count", "has_png", "indexed_at",
+]
+
+
+# ---------- extraction ----------
+def response_stats(json_response) -> dict:
+    """Model name, token usage and tool calls from a jsonify_agent_response payload."""
+    stats = {"used_model": None, "input_tokens": 0, "output_tokens": 0, "total_tokens": 0, "tool_calls": 0}
+    tools = Counter()
+    messages = json_response.get("messages") if isinstance(json_response, dict) else None
+    for msg in messages or []:
+        content = msg.get("content") if isinstance(msg, dict) else None
+        if not isinstance(content, dict) or content.get("type") != "ai":
+            continue
+        data = content.get("data") or {}
+        meta = data.get("response_metadata") or {}
+        if stats["used_model"] is None:
+            stats["used_model"] = meta.get("model_name") or meta.get("model") or meta.get("model_id")
+        usage = data.get("usage_metadata") or {}
+        token_usage = meta.get("token_usage") or {}
+        stats["input_tokens"] += usage.get("input_tokens") or token_usage.get("prompt_tokens") or 0
+        stats["output_tokens"] += usage.get("output_tokens") or token_usage.get("completion_tokens") or 0
+        stats["total_tokens"] += usage.get("total_tokens") or token_usage.get("total_tokens") or 0
+        for call in data.get("tool_calls") or []:
+            tools[call.get("name")] += 1
+    stats["tool_calls"] = sum(tools.values())
+    stats["tool_counts"] = json.dumps(dict(tools), sort_keys=True)
+    return stats
+
+
+def _stat_sig(path: Path) -> str:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return "-"
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def artifacts(result_dir: Path) -> dict:
+    name = result_dir.name
+    file_json = result_dir / f"{name}.json"
+    if not file_json.exists():
+        file_json = result_dir / f"{name}.json.gz"
+    asset_dir = result_dir / "assets"
+    asset_count = 0
+    if asset_dir.is_dir():
+        asset_count = sum(1 for e in os.scandir(asset_dir) if e.is_file() and not e.name.endswith(".json"))
+    return {
+        "has_file_json": int(file_json.exists()),
+        "asset_count": asset_count if asset_dir.is_dir() else None,
+        "has_png": int((result_dir / f"{name}.png").exists()),
+    }
+
+
+def artifact_signature(result_dir: Path) -> str:
+    name = result_dir.name
+    parts = [_stat_sig(result_dir / f) for f in (
+        f"{name}-step-count.json", f"{name}-json-response.json", f"{name}.json", f"{name}.json.gz", f"{name}.png",
+    )]
+    parts.append(_stat_sig(result_dir / "assets"))
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def status_of(step_count, has_file_json, asset_count) -> str:
+    if step_count is None or step_count == -1:
+        return "retry"
+    if has_file_json:
+        return "ok" if asset_count is not None else "node_only"
+    return "missing"
+
+
+def split_name(name: str, model: str):
+    marker = f"-{model}-"
+    if model and marker in name:
+        base_id, variant = name.rsplit(marker, 1)
+        return base_id, variant
+    return None, None
+
+
+def _read_json(path: Path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def is_result_dir(name: str, files: list) -> bool:
+    prefix = (f"{name}-step-count.json", f"{name}-json-response.json", f"{name}.json")
+    return any(f.startswith(prefix) for f in files)
+
+
+# ---------- index ----------
+class ResultsIndex:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    @classmethod
+    def for_root(cls, root: Path, db: Path = None) -> "ResultsIndex":
+        return cls(db or Path(root) / INDEX_NAME)
+
+    def close(self):
+        self.conn.close()
+
+    def _signatures(self) -> dict:
+        return dict(self.conn.execute("SELECT path, signature FROM results"))
+
+    def update(self, root: Path) -> Counter:
+        """Bring the index in line with `root`; only changed results are parsed again."""
+        root = Path(root)
+        known = self._signatures()
+        seen, rows, counts = set(), [], Counter()
+
+        # 1) one walk: model dirs holding a results store (`<model_dir>/_results`, at any depth) and result dirs
+        model_dirs, result_dirs = [], []
+        for dirpath, dirnames, filenames in os.walk(root):
+            if STORE_DIR in dirnames:
+                model_dirs.append(Path(dirpath))
+            dirnames[:] = [d for d in dirnames if d not in (STORE_DIR, "assets") and not d.startswith(".")]
+            if dirpath != str(root) and is_result_dir(os.path.basename(dirpath), filenames):
+                dirnames[:] = []
+                result_dirs.append(Path(dirpath))
+
+        # 2) store-backed results (meta lines are small; responses are read only for changed results)
+        stored = {}
+        for model_dir in model_dirs:
+            for name, meta in ResultsStore(model_dir).latest().items():
+                stored[(model_dir / name).relative_to(root).as_posix()] = (model_dir, meta)
+
+        changed_store = {}
+        for rel, (model_dir, meta) in stored.items():
+            result_dir = root / rel
+            signature = f"store:{meta.get('written_at')}:{artifact_signature(result_dir)}"
+            seen.add(rel)
+            if known.get(rel) == signature:
+                counts["unchanged"] += 1
+                continue
+            changed_store.setdefault(model_dir, {})[meta["result_name"]] = (rel, meta, signature)
+
+        for model_dir, metas in changed_store.items():
+            responses = dict(ResultsStore(model_dir).responses(names=list(metas)))
+            for name, (rel, meta, signature) in metas.items():
+                rows.append(self._row(root / rel, rel, signature, "store", meta.get("model"), meta.get("variant"),
+                                      meta.get("base_id"), meta.get("step_count"), responses.get(name)))
+                counts["indexed"] += 1
+
+        # 3) per-file results (legacy layout, postprocess copies): only dirs their parent's store does not know
+        for result_dir in result_dirs:
+            name = result_dir.name
+            rel = result_dir.relative_to(root).as_posix()
+            if rel in stored:
+                continue
+            seen.add(rel)
+            signature = f"files:{artifact_signature(result_dir)}"
+            if known.get(rel) == signature:
+                counts["unchanged"] += 1
+                continue
+            model = result_dir.parent.name
+            base_id, variant = split_name(name, model)
+            step = _read_json(result_dir / f"{name}-step-count.json")
+            step_count = step.get("step_count", -1) if isinstance(step, dict) else -1
+            rows.append(self._row(result_dir, rel, signature, "files", model, variant, base_id, step_count,
+                                  _read_json(result_dir / f"{name}-json-response.json")))
+            counts["indexed"] += 1
+
+        gone = [p for p in known if p not in seen]
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                f"INSERT OR REPLACE INTO results ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                [[row[c] for c in COLUMNS] for row in rows],
+            )
+            self.conn.executemany("DELETE FROM results WHERE path = ?", [(p,) for p in gone])
+        counts["removed"] = len(gone)
+        return counts
+
+    @staticmethod
+    def _row(result_dir: Path, rel: str, signature: str, source: str, model, variant, base_id, step_count, json_response) -> dict:
+        found = artifacts(result_dir)
+        return {
+            "path": rel,
+            "result_name": result_dir.name,
+            "model": model,
+            "variant": variant,
+            "base_id": base_id,
+            "source": source,
+            "signature": signature,
+            "status": status_of(step_count, found["has_file_json"], found["asset_count"]),
+            "step_count": step_count,
+            **response_stats(json_response),
+            "has_response": int(json_response is not None),
+            **found,
+            "indexed_at": time.time(),
+        }
+
+    def query(self, where: str = None, params: list = (), columns: list = None, order_by: str = "path") -> list:
+        """Rows as dicts. `where` is an SQL condition over the results columns."""
+        cols = ", ".join(columns) if columns else "*"
+        sql = f"SELECT {cols} FROM results"
+        if where:
+            sql += f" WHERE {where}"
+        cur = self.conn.execute(f"{sql} ORDER BY {order_by}", list(params))
+        names = [c[0] for c in cur.description]
+        return [dict(zip(names, row)) for row in cur.fetchall()]
+
+
+def build_where(args) -> tuple:
+    clauses, params = [], []
+    for column in ("model", "variant", "status", "source"):
+        value = getattr(args, column, None)
+        if value:
+            values = value.split(",")
+            clauses.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params += values
+    if args.used_model:
+        clauses.append("used_model GLOB ?")
+        params.append(args.used_model)
+    if args.min_steps is not None:
+        clauses.append("step_count >= ?")
+        params.append(args.min_steps)
+    if args.max_steps is not None:
+        clauses.append("step_count <= ?")
+        params.append(args.max_steps)
+    if args.where:
+        clauses.append(f"({args.where})")
+    return " AND ".join(clauses) or None, params
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index and query experiment results")
+    sub = parser.add_subparsers(dest="command", required=True)
+    upd = sub.add_parser("update", help="(re)index results under a root")
+    upd.add_argument("root")
+    upd.add_argument("--db", help=f"index path (default: <root>/{INDEX_NAME})")
+    q = sub.add_parser("query", help="filter indexed results")
+    q.add_argument("root")
+    q.add_argument("--db")
+    q.add_argument("--no_update", action="store_true", help="query the index as is")
+    q.add_argument("--model", help="comma-separated")
+    q.add_argument("--variant", help="comma-separated")
+    q.add_argument("--status", help="comma-separated: ok, node_only, retry, missing")
+    q.add_argument("--source", help="store or files")
+    q.add_argument("--used_model", help="glob on the model named in the response, e.g. 'gpt-4.1*'")
+    q.add_argument("--min_steps", type=int)
+    q.add_argument("--max_steps", type=int)
+    q.add_argument("--where", help="extra SQL condition")
+    q.add_argument("--columns", default="path,model,variant,status,step_count,used_model,total_tokens,tool_calls")
+    q.add_argument("--format", choices=["tsv", "json", "names", "count"], default="tsv")
+    args = parser.parse_args(argv)
+
+    index = ResultsIndex.for_root(args.root, args.db)
+    if args.command == "update" or not args.no_update:
+        counts = index.update(args.root)
+        print(f"[INDEX] {dict(counts)}", file=sys.stderr)
+    if args.command == "query":
+        where, params = build_where(args)
+        columns = ["path"] if args.format == "names" else args.columns.split(",")
+        rows = index.query(where, params, None if args.format == "json" else columns)
+        if args.format == "count":
+            print(len(rows))
+        elif args.format == "names":
+            print("\n".join(r["path"] for r in rows))
+        elif args.format == "json":
+            for r in rows:
+                print(json.dumps(r, ensure_ascii=False))
+        else:
+            print("\t".join(columns))
+            for r in rows:
+                print("\t".join("" if r[c] is None else str(r[c]) for c in columns))
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+"""
+Compact store for experiment results.
+
+Instead of a pretty-printed `-json-response.json` and `-step-count.json` per
+job, each job appends one JSON line to gzip-compressed JSONL partitions of
+its model directory:
+
+    <model_dir>/_results/<variant>/meta-<writer>.jsonl.gz      result_name, base_id, model, variant,
+                                                              ok, step_count, error, targets, ...
+    <model_dir>/_results/<variant>/response-<writer>.jsonl.gz  result_name, json_response
+
+Metadata and agent responses are split so listing and analysing a sweep
+never parses the (large) responses. Every process appends to its own
+`<writer>` segment, so runners on several channels never share a file; a
+re-run of a job appends a newer line and the latest one wins. A result that
+is renamed, moved or deleted gets a `deleted` tombstone line under its old
+name (see scripts/maintain_results.py).
+
+    store = ResultsStore("../dataset/results/generation_gen")
+    for meta in store.records(model="gemini", variant="image_only"):
+        ...
+    response = store.response("gid1-gemini-image_only")
+
+    python -m experiments.results_store ls ../dataset/results/generation_gen
+    python -m experiments.results_store import ../dataset/results/generation_gen/gemini
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import zlib
+import socket
+import argparse
+from pathlib import Path
+from collections import Counter
+
+STORE_DIR = "_results"
+META = "meta"
+RESPONSE = "response"
+
+
+def writer_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def read_jsonl_gz(path: Path):
+    """Lines of a gzip JSONL segment; stops quietly at a tail cut short by a crash."""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+    except (EOFError, OSError, zlib.error):
+        return
+
+
+class ResultsStore:
+    """
+    Results of one model directory (`root/_results`) or of every model
+    directory directly under `root` (`root/*/_results`).
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.writer = writer_id()
+
+    # ---------- layout ----------
+    def partition_dirs(self, model: str = None, variant: str = None) -> list:
+        if (self.root / STORE_DIR).is_dir():
+            bases = [self.root / STORE_DIR]
+        else:
+            bases = sorted(self.root.glob(f"{model or '*'}/{STORE_DIR}"))
+        dirs = []
+        for base in bases:
+            dirs += sorted(d for d in base.glob(variant or "*") if d.is_dir())
+        return dirs
+
+    def partitions(self) -> list:
+        """(model, variant) of every partition with results."""
+        found = set()
+        for d in self.partition_dirs():
+            for meta in self._read(d, META):
+                found.add((meta.get("model"), meta.get("variant")))
+                break
+        return sorted(found)
+
+    def _read(self, partition: Path, kind: str):
+        for segment in sorted(partition.glob(f"{kind}-*.jsonl.gz")):
+            yield from read_jsonl_gz(segment)
+
+    def _model_dir(self, model: str) -> Path:
+        return self.root if (self.root / STORE_DIR).is_dir() or self.root.name == model else self.root / model
+
+    # ---------- write ----------
+    def append(self, meta: dict, json_response=None, model_dir: Path = None):
+        """Add one job result; `meta` needs result_name, model and variant. `model_dir` overrides where it goes."""
+        meta = {**meta, "written_at": time.time()}
+        partition = Path(model_dir or self._model_dir(meta["model"])) / STORE_DIR / meta["variant"]
+        partition.mkdir(parents=True, exist_ok=True)
+        if json_response is not None:
+            self._append_line(partition / f"{RESPONSE}-{self.writer}.jsonl.gz",
+                              {"result_name": meta["result_name"], "written_at": meta["written_at"], "json_response": json_response})
+            meta["has_response"] = True
+        self._append_line(partition / f"{META}-{self.writer}.jsonl.gz", meta)
+
+    def tombstone(self, meta: dict, model_dir: Path = None):
+        """Hide a result from `records` (its older lines stay in the segments)."""
+        self.append({k: meta[k] for k in ("result_name", "model", "variant")} | {"deleted": True}, model_dir=model_dir)
+
+    @staticmethod
+    def _append_line(path: Path, record: dict):
+        # One gzip member per line: a crash can only lose the line being written
+        with gzip.open(path, "ab", compresslevel=6) as f:
+            f.write((json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8"))
+
+    # ---------- read ----------
+    def records(self, model: str = None, variant: str = None, ok: bool = None) -> list:
+        """Latest metadata record per result, optionally filtered."""
+        latest = {}
+        for d in self.partition_dirs(model, variant):
+            for meta in self._read(d, META):
+                name = meta.get("result_name")
+                if name and "model" in meta and "variant" in meta and (name not in latest or meta.get("written_at", 0) >= latest[name].get("written_at", 0)):
+                    latest[name] = meta
+        rows = [m for m in latest.values() if not m.get("deleted") and (model is None or m.get("model") == model) and (variant is None or m.get("variant") == variant)]
+        if ok is not None:
+            rows = [m for m in rows if bool(m.get("ok")) == ok]
+        return sorted(rows, key=lambda m: m["result_name"])
+
+    def latest(self, model: str = None, variant: str = None) -> dict:
+        return {m["result_name"]: m for m in self.records(model, variant)}
+
+    def responses(self, model: str = None, variant: str = None, names=None):
+        """Yield (result_name, json_response), the latest per result, reading only the response segments."""
+        wanted = set(names) if names is not None else None
+        for d in self.partition_dirs(model, variant):
+            found = {}
+            for row in self._read(d, RESPONSE):
+                name = row.get("result_name")
+                if (wanted is None or name in wanted) and (name not in found or row.get("written_at", 0) >= found[name].get("written_at", 0)):
+                    found[name] = row
+            for name, row in found.items():
+                yield name, row.get("json_response")
+
+    def response(self, result_name: str, model: str = None, variant: str = None):
+        for name, json_response in self.responses(model, variant, names=[result_name]):
+            return json_response
+        return None
+
+    def summary(self) -> list:
+        rows = []
+        for (model, variant), records in self._by_partition().items():
+            steps = [r["step_count"] for r in records if r.get("ok") and isinstance(r.get("step_count"), int)]
+            rows.append({
+                "model": model,
+                "variant": variant,
+                "results": len(records),
+                "ok": sum(bool(r.get("ok")) for r in records),
+                "mean_steps": round(sum(steps) / len(steps), 2) if steps else None,
+            })
+        return rows
+
+    def _by_partition(self) -> dict:
+        grouped = {}
+        for r in self.records():
+            grouped.setdefault((r.get("model"), r.get("variant")), []).append(r)
+        return dict(sorted(grouped.items(), key=lambda kv: tuple(str(x) for x in kv[0])))
+
+
+def import_legacy(model_dir: Path, model: str = None, variants: list = None) -> Counter:
+    """
+    Load per-file results (`<name>/<name>-json-response.json` and
+    `-step-count.json`) of one model directory into its store. Result names
+    are `<base_id>-<model>-<variant>`; pass `variants` when a variant name
+    contains dashes.
+    """
+    model_dir = Path(model_dir)
+    model = model or model_dir.name
+    store = ResultsStore(model_dir)
+    known = set(store.latest())
+    counts = Counter()
+    for result_dir in sorted(d for d in model_dir.iterdir() if d.is_dir() and d.name != STORE_DIR):
+        name = result_dir.name
+        if name in known:
+            counts["skipped"] += 1
+            continue
+        marker = f"-{model}-"
+        if marker not in name:
+            counts["unparsed"] += 1
+            continue
+        base_id, variant = name.rsplit(marker, 1)
+        if variants and variant not in variants:
+            counts["unparsed"] += 1
+            continue
+
+        step_count = -1
+        step_path = result_dir / f"{name}-step-count.json"
+        if step_path.exists():
+            try:
+                step_count = json.loads(step_path.read_text(encoding="utf-8")).get("step_count", -1)
+            except ValueError:
+                pass
+        json_response = None
+        response_path = result_dir / f"{name}-json-response.json"
+        if response_path.exists():
+            try:
+                json_response = json.loads(response_path.read_text(encoding="utf-8"))
+            except ValueError:
+                pass
+        has_file_json = (result_dir / f"{name}.json").exists() or (result_dir / f"{name}.json.gz").exists()
+        store.append({
+            "result_name": name,
+            "base_id": base_id,
+            "model": model,
+            "variant": variant,
+            "ok": step_count != -1 and has_file_json,
+            "step_count": step_count,
+            "imported": True,
+        }, json_response)
+        counts["imported"] += 1
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compact experiment results store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ls = sub.add_parser("ls", help="results per model/variant")
+    ls.add_argument("root")
+    dump = sub.add_parser("dump", help="print metadata records as JSON lines")
+    dump.add_argument("root")
+    dump.add_argument("--model")
+    dump.add_argument("--variant")
+    imp = sub.add_parser("import", help="load per-file results of a model directory into the store")
+    imp.add_argument("model_dirs", nargs="+")
+    imp.add_argument("--variants", help="comma-separated variant names")
+    args = parser.parse_args(argv)
+
+    if args.command == "ls":
+        for row in ResultsStore(args.root).summary():
+            print(f"{row['model']:<24} {row['variant']:<24} results={row['results']:<6} ok={row['ok']:<6} mean_steps={row['mean_steps']}")
+    elif args.command == "dump":
+        for meta in ResultsStore(args.root).records(args.model, args.variant):
+            print(json.dumps(meta, ensure_ascii=False))
+    else:
+        variants = args.variants.split(",") if args.variants else None
+        for model_dir in args.model_dirs:
+            print(f"[IMPORT] {model_dir}: {dict(import_legacy(Path(model_dir), variants=variants))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
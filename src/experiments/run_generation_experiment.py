@@ -1,17 +1,20 @@
 import os
 import re
 import json
-import base64
 import asyncio
 import aiohttp
-import requests
-import io
 from pathlib import Path
 from dotenv import load_dotenv
 from config import load_experiment_config
+from experiments.scheduler import ChannelScheduler, Job
+from fastapi_server.figma_client import FigmaClient, MAX_IDS_PER_CHUNK
+from fastapi_server.figma_stream import FileSnapshot
+from experiments.asset_store import AssetStore
+from experiments.job_ledger import JobLedger
+from experiments.results_store import ResultsStore
+from experiments.timings import JobTimer
+from experiments.export_stage import ExportStage
 from datetime import datetime
-from PIL import Image
-import time
 import argparse
 import yaml
 
@@ -19,12 +22,18 @@ def parse_args():
     parser = argparse.ArgumentParser()
     parser.add_argument("--model", type=str, required=True, help="Worker Model name (e.g. gemini, gpt-4o)")
     parser.add_argument("--variants", type=str, required=True, help="Comma-separated variants (e.g. image_only,text_level_1)")
-    parser.add_argument("--channel", type=str, required=True, help="Channel name from config.yaml (e.g. channel_1)")
+    parser.add_argument("--channel", type=str, help="Channel name from config.yaml (e.g. channel_1)")
+    parser.add_argument("--scheduler", action="store_true", help="Dispatch jobs over every channel in the config (or --channels)")
+    parser.add_argument("--channels", type=str, help="Optional: comma-separated channels for --scheduler (default: all with a figma_file_key)")
+    parser.add_argument("--max_attempts", type=int, default=2, help="Tries per job in --scheduler mode, each on a different channel if possible")
+    parser.add_argument("--pipeline", action="store_true", help="Download assets and write results in the background while the channel runs the next job")
+    parser.add_argument("--pipeline_depth", type=int, default=4, help="Max jobs waiting on their downloads in --pipeline mode")
     parser.add_argument("--config_name", type=str, default="base", help="Path to config.yaml (optional)")
     parser.add_argument("--batch_name", type=str, help="Optional: batch name to run (e.g., batch_1)")
     parser.add_argument("--batches_config_path", type=str, help="Optional: path to batches.yaml")
     parser.add_argument("--multi_agent", action="store_true", help="Use multi-agent (supervisor-worker) mode")
     parser.add_argument("--guidance", type=str, help="Guidance variants.")
+    parser.add_argument("--results_dir", type=str, help="Optional: reuse this run directory (e.g. a previous <results_dir>/<timestamp>) so its jobs.sqlite resumes unfinished jobs")
     return parser.parse_args()
 
 def set_langsmith_metadata(config_name, model_name, channel, machine=None, input_condition=None, guidance=None):
@@ -47,8 +56,8 @@ args = parse_args()
 
 set_langsmith_metadata(
     config_name=args.config_name,
-    model_name=args.model_name,
-    channel=args.channel,
+    model_name=args.model,
+    channel=args.channel or args.channels,
     machine=os.getenv("MACHINE_ID", "0"),
     input_condition=args.variants,
     guidance=os.getenv("GUIDANCE", "None")
@@ -57,13 +66,28 @@ set_langsmith_metadata(
 load_dotenv()
 CONFIG = load_experiment_config(args.config_name)
 
-channel_cfg = CONFIG["channels"].get(args.channel)
-if channel_cfg is None:
-    raise ValueError(f"[ERROR] Channel '{args.channel}' not found in config.yaml")
+if args.scheduler:
+    channel_names = args.channels.split(",") if args.channels else [
+        name for name, cfg in CONFIG["channels"].items() if cfg.get("figma_file_key")
+    ]
+elif args.channel:
+    channel_names = [args.channel]
+else:
+    raise ValueError("[ERROR] --channel is required unless --scheduler is set")
+
+CHANNELS = {}
+for name in channel_names:
+    if CONFIG["channels"].get(name) is None:
+        raise ValueError(f"[ERROR] Channel '{name}' not found in config.yaml")
+    CHANNELS[name] = CONFIG["channels"][name]
+channel_cfg = CHANNELS[channel_names[0]]
 
 BENCHMARK_DIR = Path(CONFIG["benchmark_dir"])
-RESULTS_DIR = Path(CONFIG["results_dir"]) / Path(f"{datetime.now().strftime("%Y-%m-%d-%H-%M-%S")}")
-# RESULTS_DIR = Path(CONFIG["results_dir"])
+# 새 실행은 타임스탬프 폴더, --results_dir로 이전 실행 폴더를 주면 ledger 기준으로 이어서 실행
+if args.results_dir:
+    RESULTS_DIR = Path(args.results_dir).expanduser()
+else:
+    RESULTS_DIR = Path(CONFIG["results_dir"]) / Path(f"{datetime.now().strftime("%Y-%m-%d-%H-%M-%S")}")
 
 RESULTS_DIR.mkdir(parents=True, exist_ok=True)
 MODELS = [args.model]
@@ -71,16 +95,22 @@ VARIANTS = args.variants.split(",")
 API_BASE_URL = channel_cfg["api_base_url"]
 FIGMA_FILE_KEY = channel_cfg["figma_file_key"]
 FIGMA_API_TOKEN = os.getenv("FIGMA_API_TOKEN")
+# Exported assets are stored once by content hash and hardlinked into each result dir
+ASSET_STORE = AssetStore(CONFIG.get("asset_store_dir") or Path(CONFIG["results_dir"]).parent / "asset_store")
+RESULTS = ResultsStore(RESULTS_DIR)
 
-HEADERS = {"X-Figma-Token": FIGMA_API_TOKEN}
-EXPORT_BASE_URL = "https://api.figma.com/v1"
 
 LOG_FILE = RESULTS_DIR / f"experiment_log_{datetime.now().strftime('%Y-%m-%d-%H-%M-%S')}.txt"
 
+# Compact server responses: no str(response) blob, input images replaced by hashes
+RESPONSE_PARAMS = {"compact": "true"}
+
 page = "Page 1"
 frame = None
 format = "png"
 scale = 1
+FILE_JSON_GZIP = CONFIG.get("file_json_gzip", False)
+LEGACY_RESULT_FILES = CONFIG.get("legacy_result_files", False)
 
 allowed_ids = None
 if args.batch_name and args.batches_config_path:
@@ -101,24 +131,18 @@ def log(message):
     with open(LOG_FILE, "a", encoding="utf-8") as f:
         f.write(full_msg + "\n")
 
-def ensure_canvas_empty():
-    for _ in range(3):
+async def reset_canvas(session, api_base_url: str = API_BASE_URL, root_frame: bool = False):
+    """Clear the canvas (and optionally recreate the 320x720 root frame) in one server call."""
+    for _ in range(2):
         try:
-            res = requests.post(f"{API_BASE_URL}/tool/get_document_info")
-            results = res.json().get("status", "{}")
-            log(f"{results}")
-            if not results == "success":
-                del_res = requests.post(f"{API_BASE_URL}/tool/delete_all_top_level_nodes")
-                if del_res.status_code == 200:
-                    log("[CLEANUP] Deleted top-level nodes")
-                    return
-                else:
-                    log(f"[CLEANUP-RETRY] Failed with status {del_res.status_code}")
-            else:
-                return  # Already empty
+            async with session.post(f"{api_base_url}/canvas/reset", params={"root_frame": str(root_frame).lower()}) as res:
+                body = await res.json()
+            if res.status == 200 and body.get("status") == "success":
+                log(f"[CLEANUP] Deleted {len(body['deleted_node_ids'])} top-level nodes in {body['elapsed']}s")
+                return body
+            log(f"[CLEANUP-RETRY] Failed with status {res.status}: {body.get('message')}")
         except Exception as e:
             log(f"[CLEANUP-ERROR] Exception during cleanup: {e}")
-        time.sleep(1)
     raise RuntimeError("Canvas cleanup failed after retries")
 
 def increment_node_id(node_id):
@@ -129,19 +153,12 @@ def increment_node_id(node_id):
     new_suffix = str(int(suffix) + 1).zfill(len(suffix))
     return f"{prefix}-{new_suffix}"
 
-async def create_root_frame(session):
+async def create_root_frame(session, api_base_url: str = API_BASE_URL):
     params = {"x": 0, "y": 0, "width": 320, "height": 720, "name": "Frame"}
-    async with session.post(f"{API_BASE_URL}/tool/create_root_frame", params=params) as res:
+    async with session.post(f"{api_base_url}/tool/create_root_frame", params=params) as res:
         return await res.json()
 
-async def get_document_info():
-    response = requests.post(f"{API_BASE_URL}/tool/get_document_info")
-    try:
-        return json.loads(response.json()["message"])
-    except:
-        return {}
-
-async def generate_variant(session, variant, model_name, image_path, meta_json, result_name):
+async def generate_variant(session, variant, model_name, image_path, meta_json, result_name, api_base_url: str = API_BASE_URL):
     # ---------- Common ----------
     text_input = ""
     if "text" in variant:
@@ -152,14 +169,14 @@ async def generate_variant(session, variant, model_name, image_path, meta_json,
 
     # ---------- Multi-Agent ----------
     if args.multi_agent:
-        endpoint = "generate/multi"
+        endpoint = "generate/image/multi"
         data = aiohttp.FormData()
         data.add_field("message", text_input or "Replicate this UI.")
         data.add_field("metadata", result_name)
         if image_file:
             data.add_field("image", image_file, filename=image_path.name, content_type="image/png")
 
-        async with session.post(f"{API_BASE_URL}/{endpoint}?worker_model={model_name}",
+        async with session.post(f"{api_base_url}/{endpoint}?worker_model={model_name}",
                                 data=data) as res:
             return await res.json()
 
@@ -172,7 +189,8 @@ async def generate_variant(session, variant, model_name, image_path, meta_json,
 
     elif variant.startswith("text_level"):
         endpoint = "generate/text"
-        data = {"message": text_input}
+        data = aiohttp.FormData()
+        data.add_field("message", text_input)
         data.add_field("metadata", result_name)
 
     else:
@@ -185,7 +203,7 @@ async def generate_variant(session, variant, model_name, image_path, meta_json,
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            async with session.post(f"{API_BASE_URL}/{endpoint}", data=data) as res:
+            async with session.post(f"{api_base_url}/{endpoint}", data=data, params=RESPONSE_PARAMS) as res:
                 return await res.json()
         except Exception as e:
             if attempt < max_retries - 1:
@@ -194,79 +212,34 @@ async def generate_variant(session, variant, model_name, image_path, meta_json,
                 raise
 
 
-def get_node_infos(file_key: str, page_name: str, frame_name: str = None, result_dir: Path = None, result_name: str = None):
-    url = f"{EXPORT_BASE_URL}/files/{file_key}"
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            res = requests.get(url, headers=HEADERS)
-            if res.status_code == 200:
-                node_data = res.json()
-                with open(result_dir / result_name / f"{result_name}.json", "w", encoding="utf-8") as f:
-                    json.dump(node_data, f, indent=2, ensure_ascii=False)
-                break
-            res.raise_for_status()
-        except Exception as e:
-            if attempt < max_retries - 1:
-                time.sleep(2)
-            else:
-                raise
+def file_json_path(out_dir: Path, result_name: str) -> Path:
+    # Raw /v1/files payload, compact as Figma sends it (gzipped with `file_json_gzip: true`)
+    return out_dir / (f"{result_name}.json.gz" if FILE_JSON_GZIP else f"{result_name}.json")
 
-    res.raise_for_status()
-    document = res.json()["document"]
-
-    page = next((c for c in document["children"] if c["name"] == page_name), None)
-    if not page:
-        raise ValueError(f"Page '{page_name}' not found")
-
-    targets = []
-
-    def recurse(nodes):
-        for node in nodes:
-            if "absoluteRenderBounds" in node:
-                targets.append({
-                    "id": node["id"],
-                    "name": re.sub(r"[^\w\-_]", "_", node["name"]),
-                    "bbox": node["absoluteRenderBounds"]
-                })
-            if "children" in node:
-                recurse(node["children"])
-
-    if frame_name:
-        frame = next((f for f in page["children"] if f["name"] == frame_name), None)
-        if not frame:
-            raise ValueError(f"Frame '{frame_name}' not found")
-        recurse(frame["children"])
-    else:
-        recurse(page["children"])
 
-    return targets  # List of dicts: id, name, bbox
+async def snapshot_export(figma: FigmaClient, file_key: str, out_dir: Path, result_name: str, format: str = "png", scale: int = 1):
+    """
+    Everything that has to be read while the canvas still holds the agent's
+    result: the file JSON (streamed to disk, targets extracted on the way)
+    and a rendered image URL per target node.
+    """
+    snapshot = FileSnapshot(file_json_path(out_dir, result_name), page, frame)
+    await figma.stream_file(file_key, snapshot)
+    node_infos = [
+        {"id": t["id"], "name": re.sub(r"[^\w\-_]", "_", t["name"] or ""), "bbox": t["bbox"]}
+        for t in await asyncio.to_thread(snapshot.close)
+    ]
+    if not node_infos:
+        return node_infos, {}
+    images = await figma.get_image_urls(file_key, [n["id"] for n in node_infos], format=format, scale=scale)
+    return node_infos, {n["id"]: images.get(n["id"]) for n in node_infos}
 
 
-def export_images(file_key: str, node_infos: list, format: str = "png", out_dir: str = "exported_assets", scale: int = 1):
-    os.makedirs(out_dir, exist_ok=True)
-    ids = ",".join([n["id"] for n in node_infos])
-    url = f"{EXPORT_BASE_URL}/images/{file_key}?ids={ids}&format={format}&scale={scale}"
-    res = requests.get(url, headers=HEADERS)
-    res.raise_for_status()
-    images = res.json()["images"]
-
-    results = []
-    for node in node_infos:
-        node_id = node["id"]
-        name = node["name"]
-        if node_id not in images:
-            continue
-        img_url = images[node_id]
-        img_data = requests.get(img_url)
-        if img_data.status_code == 200:
-            file_path = Path(out_dir) / "assets" / f"{node_id}.{format}"
-            file_path.parent.mkdir(parents=True, exist_ok=True)
-            print(file_path)
-            with open(file_path, "wb") as f:
-                f.write(img_data.content)
-            results.append(str(file_path))
-    return results
+async def save_export(figma: FigmaClient, urls: dict, out_dir: Path, format: str = "png"):
+    """Download a snapshot's assets; the canvas may already be reused."""
+    out_dir.mkdir(parents=True, exist_ok=True)
+    downloaded = await figma.download_all(urls)
+    return ASSET_STORE.export_assets(out_dir / "assets", downloaded, ext=format)
 
 def fetch_node_export(json_response, step_count, model_dir: Path, result_name: str):
     output_dir = model_dir / result_name
@@ -278,103 +251,194 @@ def fetch_node_export(json_response, step_count, model_dir: Path, result_name: s
     with open(output_dir / f"{result_name}-step-count.json", "w", encoding="utf-8") as f:
         json.dump({"step_count": step_count}, f, indent=2)
 
+def record_result(job: Job, channel_name: str, response, ok: bool, error: str = None, node_infos: list = None, assets: int = 0):
+    """Append the job's response and metadata to the results store (plus the per-file copies with `legacy_result_files`)."""
+    response = response if isinstance(response, dict) else {}
+    RESULTS.append({
+        "result_name": job.result_name,
+        "base_id": job.base_id,
+        "model": job.model_name,
+        "variant": job.variant,
+        "channel": channel_name,
+        "ok": ok,
+        "error": error,
+        "step_count": response.get("step_count", -1),
+        "file_json": file_json_path(Path(job.result_name), job.result_name).as_posix() if node_infos is not None else None,
+        "targets": node_infos,
+        "assets": assets,
+    }, response.get("json_response"))
+    if LEGACY_RESULT_FILES and response:
+        fetch_node_export(response.get("json_response", {}), response.get("step_count", -1), RESULTS_DIR / job.model_name, job.result_name)
+
+def open_ledger(model_dir: Path) -> JobLedger:
+    ledger = JobLedger(model_dir / "jobs.sqlite")
+    interrupted = ledger.recover()
+    if interrupted:
+        log(f"[RESUME] {len(interrupted)} job(s) interrupted by a previous crash: {interrupted}")
+        print(f"[RESUME] {len(interrupted)} job(s) interrupted by a previous crash")
+    return ledger
+
+def result_exists(job: Job) -> bool:
+    # Finished results written before the ledger existed
+    result_dir = RESULTS_DIR / job.model_name / job.result_name
+    has_file_json = (result_dir / f"{job.result_name}.json").exists() or (result_dir / f"{job.result_name}.json.gz").exists()
+    return has_file_json and (result_dir / f"{job.result_name}-step-count.json").exists()
+
+def build_jobs(model_name: str, ledger: JobLedger):
+    jobs = []
+    for meta_file in BENCHMARK_DIR.glob("*-meta.json"):
+        base_id = meta_file.stem.replace("-meta", "")
+        
+        if allowed_ids is not None and base_id not in allowed_ids:
+            continue
+
+        for variant in VARIANTS:
+            jobs.append(Job(base_id=base_id, variant=variant, model_name=model_name, meta_file=meta_file))
+
+    ledger.register(jobs, is_done=result_exists)
+    pending = ledger.pending(model_name, VARIANTS)
+    skipped = len(jobs) - sum(job.result_name in pending for job in jobs)
+    log(f"[SKIP] {skipped} finished job(s), {len(jobs) - skipped} pending")
+    print(f"[SKIP] {skipped} finished job(s), {len(jobs) - skipped} pending")
+    return [job for job in jobs if job.result_name in pending]
+
+async def save_job(figma: FigmaClient, node_infos: list, urls: dict, response: dict, job: Job, channel_name: str, ledger: JobLedger, timer: JobTimer) -> bool:
+    model_dir = RESULTS_DIR / job.model_name
+    result_name = job.result_name
+    ok = False
+    try:
+        with timer.span("export"):
+            saved = await save_export(figma, urls, model_dir / result_name, format=format)
+
+        print("[Exported Files]")
+        print("\n".join(saved))
+
+        with timer.span("write_response"):
+            record_result(job, channel_name, response, ok=True, node_infos=node_infos, assets=len(saved))
+        ledger.finish(result_name, ok=True)
+        ok = True
+    except Exception as e:
+        log(f"[ERROR] Failed to save {result_name}: {e}")
+        print(f"[ERROR] Failed to save {result_name}: {e}")
+        ledger.finish(result_name, ok=False, error=str(e))
+        try:
+            record_result(job, channel_name, response, ok=False, error=str(e), node_infos=node_infos)
+        except Exception as e_inner:
+            log(f"[ERROR][SAVE-FAIL] Couldn't record {result_name}: {e_inner}")
+    finally:
+        try:
+            timer.write(model_dir, ok)
+        except Exception as e:
+            log(f"[TIMINGS-FAIL] Couldn't write timings for {result_name}: {e}")
+    return ok
+
+async def run_job(session, figma: FigmaClient, channel_name: str, job: Job, ledger: JobLedger, exports: ExportStage = None) -> "bool | asyncio.Task":
+    """
+    Run one job on `channel_name`. The canvas is only held until the result
+    is snapshotted; with `exports` the download and writes continue in the
+    background, the channel is free for the next job right away, and the
+    save's task is returned in place of the outcome.
+    """
+    channel = CHANNELS[channel_name]
+    api_base_url = channel["api_base_url"]
+    file_key = channel["figma_file_key"]
+
+    model_name, variant, result_name = job.model_name, job.variant, job.result_name
+    model_dir = RESULTS_DIR / model_name
+    image_path = BENCHMARK_DIR / f"{job.base_id}.png"
+    with open(job.meta_file, "r", encoding="utf-8") as f:
+        meta_json = json.load(f)
+
+    log(f"[RUN] {result_name} on {channel_name}")
+    print(f"[RUN] {result_name} on {channel_name}")
+    ledger.start(result_name, channel_name)
+    timer = JobTimer(result_name, model_name, variant, channel_name)
+
+    response = None
+    save = None
+    try:
+        with timer.span("reset"):
+            await reset_canvas(session, api_base_url)
+        with timer.span("agent"):
+            response = await generate_variant(session, variant, model_name, image_path, meta_json, result_name, api_base_url)
+        timer.add_server_timings(response.get("timings"))
+        log(f"response: {response}")
+
+        with timer.span("snapshot"):
+            node_infos, urls = await snapshot_export(figma, file_key, model_dir / result_name, result_name, format=format, scale=scale)
+        save = save_job(figma, node_infos, urls, response, job, channel_name, ledger, timer)
+
+    except Exception as e:
+        log(f"[ERROR] Failed {result_name}: {e}")
+        print(f"[ERROR] Failed {result_name}: {e}")
+        ledger.finish(result_name, ok=False, error=str(e))
+
+        try:
+            record_result(job, channel_name, response, ok=False, error=str(e))
+        except Exception as e_inner:
+            log(f"[ERROR][SAVE-FAIL] Couldn't save partial response for {result_name}: {e_inner}")
+
+    finally:
+        try:
+            with timer.span("cleanup"):
+                await reset_canvas(session, api_base_url)
+            log(f"[CLEANUP] Deleted all top-level nodes after {result_name}")
+            print(f"[CLEANUP] Deleted all top-level nodes after {result_name}")
+        except Exception as e:
+            log(f"[CLEANUP-FAIL] Failed to cleanup after {result_name}: {e}")
+
+    if save is None:
+        try:
+            timer.write(model_dir, False)
+        except Exception as e:
+            log(f"[TIMINGS-FAIL] Couldn't write timings for {result_name}: {e}")
+        return False
+    if exports is not None:
+        # The scheduler keeps the job in flight until this task settles and requeues it if the save fails
+        return await exports.submit(result_name, save)
+    return await save
+
 async def run_experiment():
-    async with aiohttp.ClientSession() as session:
+    figma_client = FigmaClient(FIGMA_API_TOKEN, image_chunk_size=CONFIG.get("export_chunk_size", MAX_IDS_PER_CHUNK))
+    async with aiohttp.ClientSession() as session, figma_client as figma:
         for model_name in MODELS:
-            log(f"[Figma File key]: {FIGMA_FILE_KEY}")
+            log(f"[CHANNELS]: {list(CHANNELS)}")
             log(f"[MODELS]: {MODELS}")
-            log(f"[API_BASE_URL]: {API_BASE_URL}")
             log(f"[VARIANTS]: {VARIANTS}")
             print(f"[DEBUG] Loaded allowed_ids: {allowed_ids}")
+            print(f"[RESULTS] {RESULTS_DIR} (pass --results_dir {RESULTS_DIR} to resume)")
 
             model_dir = RESULTS_DIR / model_name
             model_dir.mkdir(parents=True, exist_ok=True)
+            ledger = open_ledger(model_dir)
+            jobs = build_jobs(model_name, ledger)
+            exports = ExportStage(args.pipeline_depth, log=log) if args.pipeline else None
+
+            if args.scheduler:
+                scheduler = ChannelScheduler(
+                    list(CHANNELS),
+                    lambda channel_name, job: run_job(session, figma, channel_name, job, ledger, exports),
+                    max_attempts=args.max_attempts,
+                    log=log,
+                )
+                summary = await scheduler.run(jobs)
+                print(f"[SCHEDULER] {summary['completed']}/{summary['jobs']} done in {summary['elapsed_seconds']}s "
+                      f"({summary['jobs_per_hour']} jobs/h), failed: {len(summary['failed'])}")
+            else:
+                channel_name = channel_names[0]
+                log(f"[Figma File key]: {CHANNELS[channel_name]['figma_file_key']}")
+                log(f"[API_BASE_URL]: {CHANNELS[channel_name]['api_base_url']}")
+                for job in jobs:
+                    await run_job(session, figma, channel_name, job, ledger, exports)
+
+            if exports is not None:
+                saved = await exports.drain()
+                log(f"[PIPELINE] saved {saved['saved']}, failed: {saved['failed']}")
+                print(f"[PIPELINE] saved {saved['saved']}, failed {len(saved['failed'])}")
 
-            in_progress_path = model_dir / "in-progress.json"
-            failures_path = model_dir / "failures.json"
-            in_progress = json.loads(in_progress_path.read_text(encoding='utf-8')) if in_progress_path.exists() else {}
-            failures = json.loads(failures_path.read_text(encoding='utf-8')) if failures_path.exists() else {}
-
-            for meta_file in BENCHMARK_DIR.glob("*-meta.json"):
-                base_id = meta_file.stem.replace("-meta", "")
-                
-                if allowed_ids is not None and base_id not in allowed_ids:
-                    continue
-                
-                image_path = BENCHMARK_DIR / f"{base_id}.png"
-                with open(meta_file, "r", encoding="utf-8") as f:
-                    meta_json = json.load(f)
-
-                for variant in VARIANTS:
-                    result_name = f"{base_id}-{model_name}-{variant}"
-                    json_path = model_dir / f"{result_name}.json"
-                    png_path = model_dir / result_name / f"{result_name}.png"
-                    print(json_path)
-                    print(png_path)
-                    if json_path.exists() and png_path.exists():
-                        log(f"[SKIP] {result_name}")
-                        print(f"[SKIP] {result_name}")
-                        continue
-
-                    log(f"[RUN] {result_name}")
-                    print(f"[RUN] {result_name}")
-                    in_progress[result_name] = in_progress.get(result_name, 0) + 1
-                    in_progress_path.write_text(json.dumps(in_progress, indent=2, ensure_ascii=False), encoding='utf-8')
-
-                    try:
-                        ensure_canvas_empty()
-                        response = await generate_variant(session, variant, model_name, image_path, meta_json, result_name)
-                        log(f"response: {response}")
-
-                        fetch_node_export(
-                            response["json_response"],
-                            response["step_count"],
-                            model_dir,
-                            result_name
-                        )
-                        node_infos = get_node_infos(FIGMA_FILE_KEY, page_name=page, frame_name=frame, result_dir=model_dir, result_name=result_name)
-                        saved = export_images(FIGMA_FILE_KEY, node_infos, format=format, scale=scale, out_dir=model_dir / result_name)
-
-                        print("[Exported Files]")
-                        print("\n".join(saved))
-
-                        ids = ",".join([n["id"] for n in node_infos])
-                        url = f"{EXPORT_BASE_URL}/images/{FIGMA_FILE_KEY}?ids={ids}&format={format}&scale={scale}"
-                        img_res = requests.get(url, headers=HEADERS)
-                        img_res.raise_for_status()
-                        img_urls = img_res.json()["images"]
-
-                        with open(model_dir / result_name / f"{result_name}-step-count.json", "w", encoding="utf-8") as f:
-                            json.dump({"step_count": response["step_count"]}, f, indent=2)
-
-                    except Exception as e:
-                        log(f"[ERROR] Failed {result_name}: {e}")
-                        print(f"[ERROR] Failed {result_name}: {e}")
-                        failures[result_name] = failures.get(result_name, 0) + 1
-                        failures_path.write_text(json.dumps(failures, indent=2, ensure_ascii=False), encoding='utf-8')
-
-                        if 'response' in locals() and isinstance(response, dict):
-                            try:
-                                fetch_node_export(
-                                    response.get("json_response", {}),
-                                    response.get("step_count", -1),
-                                    model_dir,
-                                    result_name
-                                )
-                            except Exception as e_inner:
-                                log(f"[ERROR][SAVE-FAIL] Couldn't save partial response for {result_name}: {e_inner}")
-
-                    finally:
-                        try:
-                            ensure_canvas_empty()
-                            log(f"[CLEANUP] Deleted all top-level nodes after {result_name}")
-                            print(f"[CLEANUP] Deleted all top-level nodes after {result_name}")
-                        except Exception as e:
-                            log(f"[CLEANUP-FAIL] Failed to cleanup after {result_name}: {e}")
-
-                        if result_name in in_progress:
-                            del in_progress[result_name]
-                            in_progress_path.write_text(json.dumps(in_progress, indent=2, ensure_ascii=False), encoding='utf-8')
+            log(f"[LEDGER] {ledger.summary(model_name)}")
+            print(f"[LEDGER] {ledger.summary(model_name)}")
+            ledger.close()
 
 if __name__ == "__main__":
-    asyncio.run(run_experiment())
\ No newline at end of file
+    asyncio.run(run_experiment())
@@ -0,0 +1,139 @@
+import time
+import asyncio
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Union
+
+
+@dataclass
+class Job:
+    base_id: str
+    variant: str
+    model_name: str
+    meta_file: Optional[Path] = None
+    attempts: int = 0
+    failed_on: set = field(default_factory=set)
+
+    @property
+    def result_name(self) -> str:
+        return f"{self.base_id}-{self.model_name}-{self.variant}"
+
+
+class ChannelScheduler:
+    """
+    Work-stealing dispatch of experiment jobs over several Figma channels.
+
+    One worker per channel pulls the next pending job as soon as its channel is
+    free. A failed job goes back to the queue and is preferably picked up by a
+    channel it has not failed on yet, up to `max_attempts` tries in total.
+
+    `run_job` may also return a future (e.g. a result save still running in
+    the background): the channel moves on right away, but the job stays in
+    flight until the future resolves and is requeued if it resolves falsy.
+    """
+
+    def __init__(
+        self,
+        channels: list,
+        run_job: Callable[[str, Job], Awaitable[Union[bool, asyncio.Future]]],
+        max_attempts: int = 2,
+        log: Callable[[str], None] = print,
+    ):
+        self.channels = list(channels)
+        self.run_job = run_job
+        self.max_attempts = max_attempts
+        self.log = log
+        self.pending = []
+        self.in_flight = 0
+        self.completed = []
+        self.failed = []
+        self.deferred = set()
+        self.per_channel = {c: {"completed": 0, "failed": 0, "busy_seconds": 0.0} for c in self.channels}
+        self._cond = asyncio.Condition()
+
+    def _take(self, channel: str) -> Optional[Job]:
+        for i, job in enumerate(self.pending):
+            if channel not in job.failed_on:
+                return self.pending.pop(i)
+        # Only jobs that already failed here are left: take one if no other channel can
+        for i, job in enumerate(self.pending):
+            if set(self.channels) <= job.failed_on:
+                return self.pending.pop(i)
+        return None
+
+    async def _next_job(self, channel: str) -> Optional[Job]:
+        async with self._cond:
+            while True:
+                job = self._take(channel)
+                if job is not None:
+                    self.in_flight += 1
+                    return job
+                if not self.pending and self.in_flight == 0:
+                    return None
+                await self._cond.wait()
+
+    async def _worker(self, channel: str):
+        while True:
+            job = await self._next_job(channel)
+            if job is None:
+                return
+
+            job.attempts += 1
+            start = time.perf_counter()
+            try:
+                ok = await self.run_job(channel, job)
+            except Exception as e:
+                self.log(f"[SCHEDULER] {job.result_name} raised on {channel}: {e}")
+                ok = False
+            self.per_channel[channel]["busy_seconds"] += time.perf_counter() - start
+
+            if isinstance(ok, asyncio.Future):
+                task = asyncio.create_task(self._settle_later(channel, job, ok))
+                self.deferred.add(task)
+                task.add_done_callback(self.deferred.discard)
+            else:
+                await self._settle(channel, job, ok)
+
+    async def _settle_later(self, channel: str, job: Job, future: asyncio.Future):
+        try:
+            ok = await future
+        except Exception as e:
+            self.log(f"[SCHEDULER] {job.result_name} failed in the background after {channel}: {e}")
+            ok = False
+        await self._settle(channel, job, ok)
+
+    async def _settle(self, channel: str, job: Job, ok: bool):
+        stats = self.per_channel[channel]
+        async with self._cond:
+            self.in_flight -= 1
+            if ok:
+                stats["completed"] += 1
+                self.completed.append(job)
+            else:
+                stats["failed"] += 1
+                job.failed_on.add(channel)
+                if job.attempts < self.max_attempts:
+                    self.log(f"[SCHEDULER] Requeue {job.result_name} (attempt {job.attempts} failed on {channel})")
+                    self.pending.append(job)
+                else:
+                    self.failed.append(job)
+            self._cond.notify_all()
+
+    async def run(self, jobs: list) -> dict:
+        self.pending = list(jobs)
+        start = time.perf_counter()
+        await asyncio.gather(*(self._worker(c) for c in self.channels))
+        elapsed = time.perf_counter() - start
+
+        summary = {
+            "jobs": len(jobs),
+            "completed": len(self.completed),
+            "failed": [j.result_name for j in self.failed],
+            "elapsed_seconds": round(elapsed, 1),
+            "jobs_per_hour": round(len(self.completed) / elapsed * 3600, 2) if elapsed > 0 else 0.0,
+            "channels": {
+                c: {**s, "busy_seconds": round(s["busy_seconds"], 1)} for c, s in self.per_channel.items()
+            },
+        }
+        self.log(f"[SCHEDULER] {summary}")
+        return summary
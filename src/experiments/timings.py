@@ -0,0 +1,160 @@
+"""
+Per-job phase timings for the experiment runners.
+
+Each job appends one JSON line to `<model_dir>/timings.jsonl`:
+
+    {"result_name": ..., "model": ..., "variant": ..., "channel": ..., "ok": true,
+     "started_at": 1700000000.0, "total": 181.2,
+     "phases": {"reset": 2.1, "agent": 150.3, "tools": 41.0, "inference": 109.3, ...}}
+
+`agent` is the whole server-side request as seen by the runner; when the
+server reports its own timings, `tools` (wall-clock time with at least one
+MCP round trip in flight, concurrent calls counted once) and `inference`
+(agent time minus tool time) split it further.
+
+Summary:
+    python -m experiments.timings ../results/expr1 [--by model|variant|model,variant]
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from contextlib import contextmanager
+from collections import defaultdict
+
+TIMINGS_NAME = "timings.jsonl"
+
+
+class JobTimer:
+    """Wall-clock seconds spent per phase of one job."""
+
+    def __init__(self, result_name: str, model: str, variant: str, channel: str = None):
+        self.record = {
+            "result_name": result_name,
+            "model": model,
+            "variant": variant,
+            "channel": channel,
+            "ok": False,
+            "started_at": time.time(),
+        }
+        self.phases = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def span(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def add_server_timings(self, timings: dict):
+        """Fold the server's own stage timings (see pipeline.StageTimer) into the record."""
+        if not isinstance(timings, dict):
+            return
+        if "tools" in timings:
+            self.phases["tools"] = timings["tools"]
+            if "agent" in timings:
+                self.phases["inference"] = max(timings["agent"] - timings["tools"], 0.0)
+        self.record["server"] = timings
+
+    def as_dict(self) -> dict:
+        return {
+            **self.record,
+            "total": round(time.perf_counter() - self._start, 4),
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+        }
+
+    def write(self, model_dir: Path, ok: bool) -> dict:
+        self.record["ok"] = ok
+        record = self.as_dict()
+        path = Path(model_dir) / TIMINGS_NAME
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        return record
+
+
+def load_timings(paths) -> list:
+    """Records from timings.jsonl files, or from every one found under the given directories."""
+    records = []
+    for p in map(Path, paths):
+        files = sorted(p.rglob(TIMINGS_NAME)) if p.is_dir() else [p]
+        for file in files:
+            with open(file, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue  # a line cut short by a crash
+    return records
+
+
+def percentile(values: list, q: float) -> float:
+    """Linear-interpolated percentile, `q` in [0, 100]."""
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    pos = (len(values) - 1) * q / 100
+    lo = int(pos)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (pos - lo)
+
+
+def summarize(records: list, by=("model", "variant"), ok_only: bool = False) -> dict:
+    """{group: {phase: {"n", "p50", "p95"}}} where group is a tuple of the `by` fields."""
+    samples = defaultdict(lambda: defaultdict(list))
+    for r in records:
+        if ok_only and not r.get("ok"):
+            continue
+        group = tuple(r.get(k) for k in by)
+        for phase, seconds in r.get("phases", {}).items():
+            samples[group][phase].append(seconds)
+        samples[group]["total"].append(r.get("total", 0.0))
+
+    return {
+        group: {
+            phase: {"n": len(v), "p50": percentile(v, 50), "p95": percentile(v, 95)}
+            for phase, v in phases.items()
+        }
+        for group, phases in sorted(samples.items(), key=lambda kv: tuple(str(x) for x in kv[0]))
+    }
+
+
+def print_summary(summary: dict, by):
+    for group, phases in summary.items():
+        label = ", ".join(f"{k}={v}" for k, v in zip(by, group)) or "all"
+        print(f"\n[{label}]")
+        print(f"  {'phase':<12} {'n':>5} {'p50(s)':>9} {'p95(s)':>9}")
+        for phase, s in phases.items():
+            print(f"  {phase:<12} {s['n']:>5} {s['p50']:>9.2f} {s['p95']:>9.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="p50/p95 of experiment job phases")
+    parser.add_argument("paths", nargs="+", help="timings.jsonl files or results directories")
+    parser.add_argument("--by", default="model,variant", help="comma-separated grouping fields (model, variant, channel); empty for all jobs")
+    parser.add_argument("--ok_only", action="store_true", help="only count jobs that finished")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    by = tuple(k for k in args.by.split(",") if k)
+    records = load_timings(args.paths)
+    if not records:
+        print("No timings found.", file=sys.stderr)
+        return 1
+
+    summary = summarize(records, by=by, ok_only=args.ok_only)
+    if args.json:
+        print(json.dumps([{**dict(zip(by, g)), "phases": p} for g, p in summary.items()], indent=2))
+    else:
+        print_summary(summary, by)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,19 @@
 # src/fastapi_server/agent_multi.py
-import os, json, hashlib
+import os, json, time, asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 from pathlib import Path
 
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
+from mcp import StdioServerParameters
 from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from langchain_mcp_adapters.tools import load_mcp_tools
-from langchain_core.tools import BaseTool
+from langchain_core.messages import AIMessage, SystemMessage
 from langgraph.prebuilt import create_react_agent
 
 from .model_factory import get_model
+from .session_pool import PoolEntry, mcp_server_params, mirror_max_age
+from .canvas_mirror import CanvasMirror
+from .canvas_hash import CanvasHasher
+from config import load_server_config
 
 load_dotenv()
 
@@ -24,26 +26,25 @@ server_params = StdioServerParameters(
 )
 
 # ---------- 글로벌 상태 ----------
-session, stdio_ctx = None, None
-tool_dict = {}
-sup_agent = None
-worker_agent = None
-
-# ---------- 유틸 ----------
-def json_hash(obj) -> str:
-    dumped = json.dumps(obj, sort_keys=True, separators=(",", ":"))
-    return hashlib.sha256(dumped.encode()).hexdigest()
+CONFIG = load_server_config("multi") or {}
+RUNTIME_CFG = CONFIG.get("runtime") or {}
+DEFAULT_WORKER = (CONFIG.get("models") or ["gpt-4o"])[0]
+SUPERVISOR_MODEL = CONFIG.get("supervisor_model", "gpt-4o")
+server_params = mcp_server_params(CONFIG, server_params)
 
 # ---------- 에이전트 생성 ----------
 def build_supervisor():
-    model = ChatOpenAI(model="gpt-4o", temperature=0.3, max_tokens=512)
+    if SUPERVISOR_MODEL.startswith("scripted"):
+        model = get_model(SUPERVISOR_MODEL)
+    else:
+        model = ChatOpenAI(model=SUPERVISOR_MODEL, temperature=0.3, max_tokens=512)
     system_prompt = SystemMessage(content=(
         "You are the supervisor. After reading the latest canvas JSON "
         "and whether any change happened, decide the next single MCP tool call.\n"
         "Reply STRICTLY as JSON like {\"tool_name\": ..., \"args\": {...}}.\n"
         "If two consecutive rounds have no change, or after 10 rounds, reply TERMINATE."
     ))
-    return create_react_agent(model, tools=[], initial_messages=[system_prompt])
+    return create_react_agent(model, tools=[], prompt=system_prompt)
 
 def build_worker(worker_name: str, tools):
     model = get_model(worker_name)
@@ -51,42 +52,264 @@ def build_worker(worker_name: str, tools):
         "You are the worker agent. Execute EXACTLY the tool instruction provided "
         "by the supervisor, with no extra reasoning visible to the user."
     ))
-    return create_react_agent(model, tools, initial_messages=[system_prompt])
+    return create_react_agent(model, tools, prompt=system_prompt)
 
-# ---------- 라이프사이클 ----------
-async def startup(worker_name: str):
-    global session, stdio_ctx, tool_dict, sup_agent, worker_agent
+# ---------- 워커 런타임 ----------
+class WorkerRuntime:
+    """
+    Warm MCP session plus compiled supervisor/worker agents for one worker model.
+    The session lives in its own task because the stdio client must be entered
+    and exited from the same task, while runtimes are created from request
+    handlers and closed later by the evictor or at shutdown.
+    """
+
+    def __init__(self, worker_name: str):
+        self.worker_name = worker_name
+        max_age = mirror_max_age(CONFIG)
+        self.entry = PoolEntry(0, server_params, CanvasMirror(max_age) if max_age else None)
+        self.sup_agent = None
+        self.worker_agent = None
+        self.lock = asyncio.Lock()
+        self.users = 0  # checkouts in progress, counted under the cache lock
+        self.last_used = time.monotonic()
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error = None
+        self._task = None
+
+    @property
+    def tool_dict(self):
+        return self.entry.tool_dict
+
+    async def _serve(self):
+        try:
+            await self.entry.open()
+            self.sup_agent = build_supervisor()
+            self.worker_agent = build_worker(self.worker_name, self.entry.tools)
+        except Exception as e:
+            self._error = e
+            self._ready.set()
+            await self.entry.close()
+            return
+        self._ready.set()
+        await self._closing.wait()
+        await self.entry.close()
+
+    async def start(self):
+        self._task = asyncio.create_task(self._serve())
+        await self._ready.wait()
+        if self._error:
+            raise RuntimeError(f"Failed to start runtime for '{self.worker_name}': {self._error}")
+
+    async def close(self):
+        self._closing.set()
+        if self._task:
+            await self._task
+
+
+class WorkerRuntimeCache:
+    """
+    Runtimes keyed by worker model, kept warm across requests and evicted when
+    idle. Every `get()` counts as a user until its `release()`; the count is
+    kept under the cache lock, so the evictor never closes a runtime that was
+    handed out, even before its holder takes the runtime lock.
+
+    A runtime is started outside the cache lock (other models stay available
+    meanwhile); concurrent requests for the same model wait on its pending
+    start instead of spawning a second session.
+    """
+
+    def __init__(self, idle_ttl: float = 600, max_runtimes: int = 4, sweep_interval: float = 30):
+        self.idle_ttl = idle_ttl
+        self.max_runtimes = max_runtimes
+        self.sweep_interval = sweep_interval
+        self.runtimes = {}
+        self._starting = {}  # worker_name -> {"future": ..., "users": requests waiting on the start}
+        self._lock = asyncio.Lock()
+        self._evictor = None
+
+    async def start(self):
+        if self._evictor is None:
+            self._evictor = asyncio.create_task(self._evict_loop())
+
+    async def close(self):
+        if self._evictor:
+            self._evictor.cancel()
+            self._evictor = None
+        # Runtimes still starting are closed too, once their start settles
+        while True:
+            async with self._lock:
+                starting = [p["future"] for p in self._starting.values()]
+                if not starting:
+                    runtimes, self.runtimes = list(self.runtimes.values()), {}
+                    break
+            await asyncio.wait(starting)
+        for runtime in runtimes:
+            await runtime.close()
+
+    async def _evict_loop(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            await self.evict_idle()
 
-    stdio_ctx = stdio_client(server_params)
-    r, w = await stdio_ctx.__aenter__()
-    session = await ClientSession(r, w).__aenter__()
-    await session.initialize()
+    async def evict_idle(self, keep: int = None):
+        now = time.monotonic()
+        async with self._lock:
+            idle = sorted((r for r in self.runtimes.values() if r.users == 0), key=lambda r: r.last_used)
+            expired = [r for r in idle if now - r.last_used > self.idle_ttl]
+            if keep is not None:
+                overflow = len(self.runtimes) - keep
+                expired += [r for r in idle if r not in expired][:max(overflow - len(expired), 0)]
+            for runtime in expired:
+                del self.runtimes[runtime.worker_name]
+        for runtime in expired:
+            print(f"[RUNTIME] Evicting idle runtime '{runtime.worker_name}'")
+            await runtime.close()
 
-    tools = await load_mcp_tools(session)
-    tool_dict = {t.name: t for t in tools if isinstance(t, BaseTool)}
+    async def get(self, worker_name: str) -> WorkerRuntime:
+        """The runtime for `worker_name`, started if needed; pair every call with `release()`."""
+        async with self._lock:
+            runtime = self.runtimes.get(worker_name)
+            if runtime is not None:
+                runtime.users += 1
+                runtime.last_used = time.monotonic()
+                return runtime
+            pending = self._starting.get(worker_name)
+            starter = pending is None
+            if starter:
+                pending = self._starting[worker_name] = {"future": asyncio.get_running_loop().create_future(), "users": 0}
+            pending["users"] += 1
+        if not starter:
+            return await self._wait_for_start(pending)
 
-    sup_agent = build_supervisor()
-    worker_agent = build_worker(worker_name, tools)
+        runtime = WorkerRuntime(worker_name)
+        try:
+            await runtime.start()
+        except BaseException as e:
+            async with self._lock:
+                del self._starting[worker_name]
+                if isinstance(e, Exception):
+                    pending["future"].set_exception(e)
+                    pending["future"].exception()  # waiters re-raise it; no "never retrieved" warning when there are none
+                else:
+                    pending["future"].cancel()
+            raise
+        async with self._lock:
+            del self._starting[worker_name]
+            runtime.users = pending["users"]  # the starter and everyone who waited
+            runtime.last_used = time.monotonic()
+            self.runtimes[worker_name] = runtime
+            pending["future"].set_result(runtime)
+        if len(self.runtimes) > self.max_runtimes:
+            await self.evict_idle(keep=self.max_runtimes)
+        return runtime
+
+    async def _wait_for_start(self, pending: dict) -> WorkerRuntime:
+        future = pending["future"]
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Give back the use counted for this request
+            async with self._lock:
+                started = future.done() and not future.cancelled() and future.exception() is None
+                if not started:
+                    pending["users"] -= 1
+            if started:
+                await self.release(future.result())
+            raise
+
+    async def release(self, runtime: WorkerRuntime):
+        async with self._lock:
+            runtime.users -= 1
+            runtime.last_used = time.monotonic()
+
+    @asynccontextmanager
+    async def checkout(self, worker_name: str, channel: str = None):
+        """Hold the runtime for `worker_name`, joined to `channel` first when one is given."""
+        runtime = await self.get(worker_name)
+        try:
+            async with runtime.lock:
+                if channel and runtime.entry.channel != channel:
+                    result = await runtime.entry.join(channel)
+                    if runtime.entry.channel != channel:
+                        raise RuntimeError(f"Runtime '{worker_name}' could not join '{channel}': {result['message']}")
+                yield runtime
+        finally:
+            await self.release(runtime)
+
+    def status(self):
+        now = time.monotonic()
+        return [
+            {"worker_model": r.worker_name, "busy": r.users > 0, "users": r.users, "idle_seconds": round(now - r.last_used, 1)}
+            for r in self.runtimes.values()
+        ]
+
+runtimes = WorkerRuntimeCache(
+    idle_ttl=RUNTIME_CFG.get("idle_ttl", 600),
+    max_runtimes=RUNTIME_CFG.get("max_runtimes", 4),
+)
+
+# ---------- 라이프사이클 ----------
+async def startup(agent_type: str = "multi"):
+    await runtimes.start()
 
 async def shutdown():
-    global session, stdio_ctx
-    if session:
-        await session.__aexit__(None, None, None)
-    if stdio_ctx:
-        await stdio_ctx.__aexit__(None, None, None)
+    await runtimes.close()
+
+async def call_tool(tool_name: str, args: dict = {}, channel: str = None, worker_name: str = None):
+    try:
+        async with runtimes.checkout(worker_name or DEFAULT_WORKER, channel) as runtime:
+            return await runtime.entry.call_tool(tool_name, args)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+@asynccontextmanager
+async def tool_session(channel: str = None, worker_name: str = None):
+    async with runtimes.checkout(worker_name or DEFAULT_WORKER, channel) as runtime:
+        yield runtime.entry.call_tool
+
+async def select_channel(channel: str, worker_name: str = None):
+    try:
+        async with runtimes.checkout(worker_name or DEFAULT_WORKER) as runtime:
+            return await runtime.entry.join(channel)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
 
 # ---------- 실행 루프 ----------
-async def run_multi_agent(agent_input: list, worker_name: str, max_rounds: int = 10):
+async def run_multi_agent(agent_input: list, worker_name: str = None, max_rounds: int = 10, metadata: dict = None, channel: str = None):
+    async with runtimes.checkout(worker_name or DEFAULT_WORKER, channel) as runtime:
+        async for event in _iter_rounds(runtime, agent_input, max_rounds, metadata):
+            if event["event"] == "done":
+                return event["state"]
+
+async def stream_multi_agent(agent_input: list, worker_name: str = None, max_rounds: int = 10, metadata: dict = None, channel: str = None):
+    """Yield supervisor/worker/canvas events per round, then a final `done` event."""
+    async with runtimes.checkout(worker_name or DEFAULT_WORKER, channel) as runtime:
+        async for event in _iter_rounds(runtime, agent_input, max_rounds, metadata):
+            if event["event"] == "done":
+                yield {"event": "done", "step_count": event["state"]["step_count"]}
+            else:
+                yield event
+
+async def _iter_rounds(runtime: WorkerRuntime, agent_input: list, max_rounds: int, metadata: dict = None):
+    sup_agent, tool_dict = runtime.sup_agent, runtime.tool_dict
+    tags = [f"{k}={v}" for k, v in (metadata or {}).items()]
     state = {
         "messages": agent_input.copy(),  # 초기 입력 메시지 리스트
         "prev_hash": None,
         "stable_cnt": 0,
     }
+    hasher = CanvasHasher()
+    delta_msg = None
 
     for turn in range(max_rounds):
-        sup_out = await sup_agent.ainvoke(state)
+        # The canvas delta is shown to the supervisor but kept out of the step count
+        sup_in = {**state, "messages": state["messages"] + [delta_msg]} if delta_msg else state
+        sup_result = await sup_agent.ainvoke(sup_in, config={"tags": tags, "metadata": metadata or {}})
+        sup_out = sup_result["messages"][-1]
         sup_txt = sup_out.content.strip()
         state["messages"].append(sup_out)
+        yield {"event": "step", "round": turn, "node": "supervisor", "content": sup_txt}
 
         if sup_txt == "TERMINATE":
             break
@@ -110,20 +333,23 @@ async def run_multi_agent(agent_input: list, worker_name: str, max_rounds: int =
             state["messages"].append(AIMessage(content=json.dumps(res)))
         except Exception as e:
             state["messages"].append(AIMessage(content=f"[WORKER ERROR] {str(e)}"))
+        yield {"event": "step", "round": turn, "node": "worker", "tool_name": tool_name, "content": state["messages"][-1].content}
 
-        # Hash check
+        # Hash check: one digest of the canvas; node ids are diffed only when it changed
         canvas_info = await tool_dict["get_document_info"].ainvoke({})
         canvas_json = json.loads(canvas_info)
-        new_hash = json_hash(canvas_json)
-        changed = new_hash != state["prev_hash"]
+        delta = hasher.update(canvas_json)
+        changed = delta.root_digest != state["prev_hash"]
 
-        state["prev_hash"] = new_hash
+        state["prev_hash"] = delta.root_digest
         state["stable_cnt"] = 0 if changed else state["stable_cnt"] + 1
-        state["node_diff"] = changed
+        state["node_diff"] = delta.to_dict()
+        delta_msg = AIMessage(content=delta.to_message())
+        yield {"event": "canvas", "round": turn, **state["node_diff"]}
 
         if state["stable_cnt"] >= 2:
             state["messages"].append(AIMessage(content="TERMINATE"))
             break
 
     state["step_count"] = len(state["messages"]) - 1
-    return state
+    yield {"event": "done", "state": state}
@@ -12,17 +12,17 @@ from pathlib import Path
 import os
 import re
 import json
+from contextlib import asynccontextmanager
 from .model_factory import get_model
+from .session_pool import MCPSessionPool, mcp_server_params, mirror_max_age
+from .utils import jsonify_stream_update
 from config import load_server_config
 
 load_dotenv()
 
 # Global references
 model = None
-agent = None
-session = None
-stdio_context = None
-tool_dict = {}
+pool: MCPSessionPool = None
 
 def make_tracer():
     import os
@@ -56,47 +56,77 @@ server_params = StdioServerParameters(
 )
 
 async def startup(agent_type: str):
-    global agent, session, stdio_context, tool_dict, model
+    global pool, model
     initialize_model(agent_type)
 
-    stdio_context = stdio_client(server_params)
-    read, write = await stdio_context.__aenter__()
-    session = await ClientSession(read, write).__aenter__()
-    await session.initialize()
-
-    tools = await load_mcp_tools(session)
-    tool_dict = {tool.name: tool for tool in tools if isinstance(tool, BaseTool)}
-    agent = create_react_agent(model, tools)
+    pool_cfg = CONFIG.get("pool") or {}
+    pool = MCPSessionPool(
+        mcp_server_params(CONFIG, server_params),
+        size=pool_cfg.get("size", 1),
+        channels=pool_cfg.get("channels") or [],
+        agent_factory=lambda tools: create_react_agent(model, tools),
+        mirror_max_age=mirror_max_age(CONFIG),
+    )
+    await pool.startup()
 
 async def shutdown():
-    global session, stdio_context
-    if session:
-        await session.__aexit__(None, None, None)
-    if stdio_context:
-        await stdio_context.__aexit__(None, None, None)
-
-async def run_single_agent(user_input: list, metadata: dict = None):
-    global agent
+    if pool:
+        await pool.shutdown()
+
+async def run_single_agent(user_input: list, metadata: dict = None, channel: str = None):
     human_message = HumanMessage(content=user_input)
     tags = [f"{k}={v}" for k, v in (metadata or {}).items()]
 
-    return await agent.ainvoke(
-        {"messages": [human_message]},
-        config={
-            "recursion_limit": 100,
-            "callbacks": [tracer],
-            "tags": tags,
-            "metadata": metadata or {}
-        }
-    )
+    async with pool.checkout(channel) as entry:
+        return await entry.agent.ainvoke(
+            {"messages": [human_message]},
+            config={
+                "recursion_limit": 100,
+                "callbacks": [tracer],
+                "tags": tags,
+                "metadata": metadata or {}
+            }
+        )
+
+async def stream_single_agent(user_input: list, metadata: dict = None, channel: str = None):
+    """Yield one event per model step / tool result as the agent runs, then a final `done` event."""
+    human_message = HumanMessage(content=user_input)
+    tags = [f"{k}={v}" for k, v in (metadata or {}).items()]
+    step_count = 0
+
+    async with pool.checkout(channel) as entry:
+        async for chunk in entry.agent.astream(
+            {"messages": [human_message]},
+            config={
+                "recursion_limit": 100,
+                "callbacks": [tracer],
+                "tags": tags,
+                "metadata": metadata or {}
+            },
+            stream_mode="updates",
+        ):
+            for node_name, update in chunk.items():
+                event = jsonify_stream_update(node_name, update)
+                step_count += len(event["messages"])
+                yield {"event": "step", "step_count": step_count, **event}
+
+    yield {"event": "done", "step_count": step_count}
+
+async def call_tool(tool_name: str, args: dict = {}, channel: str = None):
+    try:
+        async with pool.checkout(channel) as entry:
+            return await entry.call_tool(tool_name, args)
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+@asynccontextmanager
+async def tool_session(channel: str = None):
+    """Hold one pooled session and hand out its call_tool, e.g. for batched tool calls."""
+    async with pool.checkout(channel) as entry:
+        yield entry.call_tool
 
-async def call_tool(tool_name: str, args: dict = {}):
-    global tool_dict
+async def select_channel(channel: str):
     try:
-        if tool_name not in tool_dict:
-            return {"status": "error", "message": f"Tool '{tool_name}' not found"}
-        tool = tool_dict[tool_name]
-        result = await tool.ainvoke(args)
-        return {"status": "success", "message": result}
+        return await pool.join(channel)
     except Exception as e:
-        return {"status": "error", "message": str(e)}
\ No newline at end of file
+        return {"status": "error", "message": str(e)}
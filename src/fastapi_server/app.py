@@ -1,5 +1,5 @@
-from fastapi import FastAPI, Request, UploadFile, File, Form, Query
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import FastAPI, Request, UploadFile, File, Form, Query, Depends
+from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
@@ -12,11 +12,15 @@ AGENT_TYPE = args.agent_type
 
 # ------------------ Agent setup ------------------
 if AGENT_TYPE == "single":
-    from fastapi_server.agent_single import startup, shutdown, run_single_agent as run_agent, call_tool
+    from fastapi_server.agent_single import startup, shutdown, run_single_agent as run_agent, stream_single_agent as stream_agent, call_tool, select_channel, tool_session
 if AGENT_TYPE == "multi":
-    from fastapi_server.agent_multi import startup, shutdown, run_multi_agent as run_agent, call_tool
+    from fastapi_server.agent_multi import startup, shutdown, run_multi_agent as run_agent, stream_multi_agent as stream_agent, call_tool, select_channel, tool_session
+from fastapi_server import agent_multi
 
-from fastapi_server.utils import jsonify_agent_response
+from fastapi_server.pipeline import StageTimer, prepare_agent_input, finalize_agent_response, serialize_multi_agent_state
+from fastapi_server.session_pool import request_timer
+from fastapi_server.serialization import ResponseOptions
+from fastapi_server.batch import BatchRequest, execute_batch
 from fastapi_server.prompts import (
     get_text_based_generation_prompt,
     get_image_based_generation_prompt,
@@ -27,12 +31,12 @@ from fastapi_server.prompts import (
 )
 
 # ------------------ Setup ------------------
-import base64
 from pydantic import BaseModel
 import uvicorn
 import os
 import re
 import json
+import time
 from typing import Optional, List
 from contextlib import asynccontextmanager
 
@@ -42,7 +46,12 @@ class ChatRequest(BaseModel):
 @asynccontextmanager
 async def lifespan_context(app: FastAPI):
     await startup(agent_type=AGENT_TYPE)
+    # Warm worker runtimes for /generate/image/multi are shared by both agent types
+    if AGENT_TYPE != "multi":
+        await agent_multi.startup()
     yield
+    if AGENT_TYPE != "multi":
+        await agent_multi.shutdown()
     await shutdown()
 
 current_channel: Optional[str] = None
@@ -56,6 +65,44 @@ app = FastAPI(lifespan=lifespan_context)
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
 templates = Jinja2Templates(directory=templates_dir)
 
+def stream_agent_events(events):
+    """Wrap an agent event iterator as a text/event-stream response."""
+    async def event_source():
+        try:
+            async for event in events:
+                yield f"event: {event['event']}\ndata: {json.dumps(event, default=str, ensure_ascii=False)}\n\n"
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            yield f"event: error\ndata: {json.dumps({'event': 'error', 'error': str(e)})}\n\n"
+
+    return StreamingResponse(event_source(), media_type="text/event-stream")
+
+async def run_agent_request(instruction: str, image: Optional[UploadFile], metadata: Optional[str], channel: Optional[str], stream: bool, options: ResponseOptions = None):
+    """Shared body of the generate/modify routes: encode, run the agent, serialize off the event loop."""
+    timer = StageTimer()
+    agent_input = await prepare_agent_input(instruction, image, timer)
+    agent_metadata = {"input_id": metadata or "unknown"}
+
+    if stream:
+        return stream_agent_events(stream_agent(agent_input, metadata=agent_metadata, channel=channel))
+    request_timer.set(timer)
+    with timer.stage("agent"):
+        response = await run_agent(agent_input, metadata=agent_metadata, channel=channel)
+    return await finalize_agent_response(response, timer, options)
+
+async def run_image_text_request(prompt_fn, image, message, metadata, channel, stream, options=None):
+    try:
+        if not image:
+            raise ValueError("No image provided.")
+        if not message:
+            raise ValueError("No instruction provided.")
+        return await run_agent_request(prompt_fn(message), image, metadata, channel, stream, options)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return JSONResponse(status_code=500, content={"error": str(e)})
+
 # ------------------ Routes ------------------
 @app.get("/", response_class=HTMLResponse)
 async def get_homepage(request: Request):
@@ -64,23 +111,15 @@ async def get_homepage(request: Request):
 @app.post("/generate/text")
 async def generate_with_text(
     req: ChatRequest,
-    metadata: str = Form(None)
+    metadata: str = Form(None),
+    channel: str = Query(None, description="Pooled Figma channel to run on"),
+    stream: bool = Query(False, description="Stream agent steps as server-sent events"),
+    options: ResponseOptions = Depends()
 ):
     try:        
         if req.message:
             instruction = get_text_based_generation_prompt(req.message)
-            agent_input = [{"type": "text", "text": instruction}]
-            
-            response = await run_agent(
-                agent_input,
-                metadata={
-                    "input_id": metadata or "unknown"
-                }
-            )
-            messages = response.get("messages", [])
-            step_count = response.get("step_count", len(messages) - 1)
-            json_response = jsonify_agent_response(response)
-            return {"response": str(response), "json_response": json_response, "step_count": step_count}
+            return await run_agent_request(instruction, None, metadata, channel, stream, options)
         else:
             raise ValueError("No instruction provided.")
     except Exception as e:
@@ -89,38 +128,16 @@ async def generate_with_text(
 @app.post("/generate/image")
 async def generate_with_image(
     image: UploadFile = File(None), 
-    metadata: str = Form(None)
+    metadata: str = Form(None),
+    channel: str = Query(None, description="Pooled Figma channel to run on"),
+    stream: bool = Query(False, description="Stream agent steps as server-sent events"),
+    options: ResponseOptions = Depends()
 ):
     try:
-        agent_input = []
-        
-        base64_image = None
-        if image:
-            image_bytes = await image.read()
-            base64_image = base64.b64encode(image_bytes).decode("utf-8")
-            instruction = get_image_based_generation_prompt()
-            agent_input.append({"type": "text", "text": instruction})
-        else:
+        if not image:
             raise ValueError("No image provided.")
-        if base64_image:
-            agent_input.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/png;base64,{base64_image}",
-                    "detail": "auto"
-                }
-            })
-        response = await run_agent(
-            agent_input,
-            metadata={
-                "input_id": metadata or "unknown"
-            }
-        )
-        messages = response.get("messages", [])
-        step_count = response.get("step_count", len(messages) - 1)
-
-        json_response = jsonify_agent_response(response)
-        return {"response": str(response), "json_response": json_response, "step_count": step_count}
+        instruction = get_image_based_generation_prompt()
+        return await run_agent_request(instruction, image, metadata, channel, stream, options)
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": str(e)})
     
@@ -128,244 +145,79 @@ async def generate_with_image(
 async def generate_with_text_image(
     image: UploadFile = File(None), 
     message: str = Form(...),
-    metadata: str = Form(None)
+    metadata: str = Form(None),
+    channel: str = Query(None, description="Pooled Figma channel to run on"),
+    stream: bool = Query(False, description="Stream agent steps as server-sent events"),
+    options: ResponseOptions = Depends()
 ):
-    try:
-        agent_input = []
-        
-        base64_image = None
-        if image:
-            image_bytes = await image.read()
-            base64_image = base64.b64encode(image_bytes).decode("utf-8")
-        else:
-            raise ValueError("No image provided.")
-            
-        if message:
-            instruction = get_text_image_based_generation_prompt(message)
-            agent_input.append({"type": "text", "text": instruction})
-        else:
-            raise ValueError("No instruction provided.")
-            
-        if base64_image:
-            agent_input.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/png;base64,{base64_image}",
-                    "detail": "auto"
-                }
-            })
-
-        response = await run_agent(
-            agent_input,
-            metadata={
-                "input_id": metadata or "unknown"
-            }
-        )
-        messages = response.get("messages", [])
-        step_count = response.get("step_count", len(messages) - 1)
-
-        json_response = jsonify_agent_response(response)
-        return {"response": str(response), "json_response": json_response, "step_count": step_count}
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return JSONResponse(status_code=500, content={"error": str(e)})
+    return await run_image_text_request(get_text_image_based_generation_prompt, image, message, metadata, channel, stream, options)
 
 @app.post("/modify/without-oracle")
 async def modify_without_oracle(
     image: UploadFile = File(None), 
     message: str = Form(...),
-    metadata: str = Form(None)
+    metadata: str = Form(None),
+    channel: str = Query(None, description="Pooled Figma channel to run on"),
+    stream: bool = Query(False, description="Stream agent steps as server-sent events"),
+    options: ResponseOptions = Depends()
 ):
-    try:
-        agent_input = []
-        
-        base64_image = None
-        if image:
-            image_bytes = await image.read()
-            base64_image = base64.b64encode(image_bytes).decode("utf-8")
-        else:
-            raise ValueError("No image provided.")
-            
-        if message:
-            instruction = get_modification_without_oracle_prompt(message)
-            agent_input.append({"type": "text", "text": instruction})
-        else:
-            raise ValueError("No instruction provided.")
-            
-        if base64_image:
-            agent_input.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/png;base64,{base64_image}",
-                    "detail": "auto"
-                }
-            })
-
-        response = await run_agent(
-            agent_input,
-            metadata={
-                "input_id": metadata or "unknown"
-            }
-        )
-        messages = response.get("messages", [])
-        step_count = response.get("step_count", len(messages) - 1)
-
-        json_response = jsonify_agent_response(response)
-        return {"response": str(response), "json_response": json_response, "step_count": step_count}
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return JSONResponse(status_code=500, content={"error": str(e)})
+    return await run_image_text_request(get_modification_without_oracle_prompt, image, message, metadata, channel, stream, options)
 
 @app.post("/modify/with-oracle/perfect-hierachy")
 async def modify_with_oracle_perfect_hierarchy(
     image: UploadFile = File(None), 
     message: str = Form(...),
-    metadata: str = Form(None)
+    metadata: str = Form(None),
+    channel: str = Query(None, description="Pooled Figma channel to run on"),
+    stream: bool = Query(False, description="Stream agent steps as server-sent events"),
+    options: ResponseOptions = Depends()
 ):
-    try:
-        agent_input = []
-        
-        base64_image = None
-        if image:
-            image_bytes = await image.read()
-            base64_image = base64.b64encode(image_bytes).decode("utf-8")
-        else:
-            raise ValueError("No image provided.")
-            
-        if message:
-            instruction = get_modification_with_oracle_hierarchy_prompt(message)
-            agent_input.append({"type": "text", "text": instruction})
-        else:
-            raise ValueError("No instruction provided.")
-            
-        if base64_image:
-            agent_input.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/png;base64,{base64_image}",
-                    "detail": "auto"
-                }
-            })
-
-        response = await run_agent(
-            agent_input,
-            metadata={
-                "input_id": metadata or "unknown"
-            }
-        )
-        messages = response.get("messages", [])
-        step_count = response.get("step_count", len(messages) - 1)
-
-        json_response = jsonify_agent_response(response)
-        return {"response": str(response), "json_response": json_response, "step_count": step_count}
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return JSONResponse(status_code=500, content={"error": str(e)})
+    return await run_image_text_request(get_modification_with_oracle_hierarchy_prompt, image, message, metadata, channel, stream, options)
 
 
 @app.post("/modify/with-oracle/perfect-canvas")
 async def modify_with_oracle_perfect_canvas(
     image: UploadFile = File(None), 
     message: str = Form(...),
-    metadata: str = Form(None)
+    metadata: str = Form(None),
+    channel: str = Query(None, description="Pooled Figma channel to run on"),
+    stream: bool = Query(False, description="Stream agent steps as server-sent events"),
+    options: ResponseOptions = Depends()
 ):
-    try:
-        agent_input = []
-        
-        base64_image = None
-        if image:
-            image_bytes = await image.read()
-            base64_image = base64.b64encode(image_bytes).decode("utf-8")
-        else:
-            raise ValueError("No image provided.")
-            
-        if message:
-            instruction = get_modification_with_oracle_perfect_canvas_prompt(message)
-            agent_input.append({"type": "text", "text": instruction})
-        else:
-            raise ValueError("No instruction provided.")
-            
-        if base64_image:
-            agent_input.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/png;base64,{base64_image}",
-                    "detail": "auto"
-                }
-            })
-
-        response = await run_agent(
-            agent_input,
-            metadata={
-                "input_id": metadata or "unknown"
-            }
-        )
-        messages = response.get("messages", [])
-        step_count = response.get("step_count", len(messages) - 1)
-
-        json_response = jsonify_agent_response(response)
-        return {"response": str(response), "json_response": json_response, "step_count": step_count}
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return JSONResponse(status_code=500, content={"error": str(e)})
+    return await run_image_text_request(get_modification_with_oracle_perfect_canvas_prompt, image, message, metadata, channel, stream, options)
 
 @app.post("/generate/image/multi")
 async def generate_multi(
     image: UploadFile = File(None),
     message: str = Form("Replicate this UI."),
     worker_model: str = Query(..., description="e.g., claude-3-5-sonnet"),
-    metadata: str = Form(None)
+    metadata: str = Form(None),
+    channel: str = Query(None, description="Figma channel the worker's session joins before running"),
+    stream: bool = Query(False, description="Stream agent steps as server-sent events"),
+    options: ResponseOptions = Depends()
 ):
     try:
-        from fastapi_server.agent_multi import startup as startup_multi, shutdown as shutdown_multi, run_multi_agent
-
-        agent_input = []
-
-        if message:
-            from fastapi_server.prompts import get_image_based_generation_prompt
-            instruction = get_image_based_generation_prompt()
-            agent_input.append({"type": "text", "text": instruction})
-
-        if image:
-            image_bytes = await image.read()
-            image_b64 = base64.b64encode(image_bytes).decode("utf-8")
-            agent_input.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/png;base64,{image_b64}",
-                    "detail": "auto"
-                }
-            })
-        else:
+        if not image:
             raise ValueError("No image provided.")
 
-        await startup_multi(worker_model)
-        state = await run_agent(
-            agent_input,
-            worker_model,
-            metadata={
-                "input_id": metadata or "unknown"
-            }
-        )
-        await shutdown_multi()
+        timer = StageTimer()
+        agent_input = await prepare_agent_input(get_image_based_generation_prompt(), image, timer)
+        agent_metadata = {"input_id": metadata or "unknown"}
 
-        return {
-            "response": str(state),
-            "json_response": state,
-            "step_count": state.get("step_count", -1)
-        }
+        if stream:
+            return stream_agent_events(agent_multi.stream_multi_agent(agent_input, worker_model, metadata=agent_metadata, channel=channel))
+        request_timer.set(timer)
+        with timer.stage("agent"):
+            state = await agent_multi.run_multi_agent(agent_input, worker_model, metadata=agent_metadata, channel=channel)
+        return await finalize_agent_response(state, timer, options, serialize=serialize_multi_agent_state)
     except Exception as e:
         import traceback
         traceback.print_exc()
         return JSONResponse(status_code=500, content={"error": str(e)})
 
 @app.post("/tool/get_selection")
-async def get_selection():
-    result = await call_tool("get_selection")
+async def get_selection(channel: str = Query(None, description="Pooled Figma channel to run on")):
+    result = await call_tool("get_selection", channel=channel)
     return result
 
 @app.post("/tool/create_root_frame")
@@ -374,7 +226,8 @@ async def create_root_frame_endpoint(
     y: int = Query(0),
     width: int = Query(...),
     height: int = Query(...),
-    name: str = Query("Frame")
+    name: str = Query("Frame"),
+    channel: str = Query(None, description="Pooled Figma channel to run on")
 ):
     result = await call_tool("create_frame", {
         "x": x,
@@ -383,7 +236,7 @@ async def create_root_frame_endpoint(
         "height": height,
         "name": name,
         "fillColor": {"r": 1, "g": 1, "b": 1, "a": 1}
-    })
+    }, channel=channel)
     global root_frame_width, root_frame_height, root_frame_id
     root_frame_width = width
     root_frame_height = height
@@ -398,7 +251,7 @@ async def create_root_frame_endpoint(
     return {"response": result, "root_frame_id": root_frame_id}
 
 @app.post("/tool/create_text_in_root_frame")
-async def create_text_in_root_frame():
+async def create_text_in_root_frame(channel: str = Query(None, description="Pooled Figma channel to run on")):
     global root_frame_id
     if not root_frame_id:
         return {"status": "error", "message": "No root_frame_id set. Please call /tool/create_frame first."}
@@ -408,23 +261,29 @@ async def create_text_in_root_frame():
         "x": 100,
         "y": 100,
         "text": "Hello in root!"
-    })
+    }, channel=channel)
     return result
 
 @app.post("/tool/delete_node")
-async def delete_node(node_id: str = Query(..., description="ID of the node to delete")):
-    result = await call_tool("delete_node", {"nodeId": node_id})
+async def delete_node(
+    node_id: str = Query(..., description="ID of the node to delete"),
+    channel: str = Query(None, description="Pooled Figma channel to run on")
+):
+    result = await call_tool("delete_node", {"nodeId": node_id}, channel=channel)
     return result
 
 @app.post("/tool/delete_multiple_nodes")
-async def delete_multiple_nodes(node_ids: List[str] = Query(..., description="List of node IDs to delete")):
-    result = await call_tool("delete_multiple_nodes", {"nodeIds": node_ids})
+async def delete_multiple_nodes(
+    node_ids: List[str] = Query(..., description="List of node IDs to delete"),
+    channel: str = Query(None, description="Pooled Figma channel to run on")
+):
+    result = await call_tool("delete_multiple_nodes", {"nodeIds": node_ids}, channel=channel)
     return result
 
 @app.post("/tool/delete_all_top_level_nodes")
-async def delete_all_top_level_nodes():
+async def delete_all_top_level_nodes(channel: str = Query(None, description="Pooled Figma channel to run on")):
     try:
-        response = await call_tool("get_document_info")
+        response = await call_tool("get_document_info", channel=channel)
         document_info = json.loads(response["message"])
 
         if "children" not in document_info:
@@ -435,18 +294,108 @@ async def delete_all_top_level_nodes():
         if not top_node_ids:
             return {"status": "success", "message": "No nodes to delete."}
 
-        result = await call_tool("delete_multiple_nodes", {"nodeIds": top_node_ids})
+        result = await call_tool("delete_multiple_nodes", {"nodeIds": top_node_ids}, channel=channel)
         return {"status": "success", "deleted_node_ids": top_node_ids, "result": result}
     
     except Exception as e:
         import traceback
         traceback.print_exc()
         return {"status": "error", "message": str(e)}
-    
+
+@app.post("/canvas/reset")
+async def canvas_reset(
+    root_frame: bool = Query(False, description="Recreate the root frame after clearing"),
+    width: int = Query(320),
+    height: int = Query(720),
+    max_rounds: int = Query(3, description="Delete/verify rounds before giving up"),
+    channel: str = Query(None, description="Pooled Figma channel to run on")
+):
+    """
+    Delete every top-level node, verify the page is empty and optionally
+    recreate the root frame, all on one pooled session in one request.
+    """
+    global root_frame_width, root_frame_height, root_frame_id
+    start = time.perf_counter()
+    deleted = []
+    try:
+        async with tool_session(channel) as session_call_tool:
+            empty = False
+            rounds, failed_reads = 0, 0
+            # Every delete round is followed by a read, so the last delete is verified too.
+            # Failed reads retry without using up a round, up to max_rounds of them.
+            while failed_reads <= max_rounds:
+                # Verify against Figma, not the mirror: a partly failed delete still looks applied there
+                response = await session_call_tool("get_document_info", fresh=True)
+                if response["status"] != "success":
+                    failed_reads += 1
+                    continue
+                top_node_ids = [node["id"] for node in json.loads(response["message"]).get("children", [])]
+                if not top_node_ids:
+                    empty = True
+                    break
+                if rounds >= max_rounds:
+                    break
+                rounds += 1
+                result = await session_call_tool("delete_multiple_nodes", {"nodeIds": top_node_ids})
+                if result["status"] == "success":
+                    deleted += top_node_ids
+
+            if not empty:
+                return JSONResponse(status_code=409, content={
+                    "status": "error",
+                    "message": f"Canvas not empty after {rounds} rounds" if failed_reads <= max_rounds
+                               else f"Canvas could not be read ({failed_reads} failed reads)",
+                    "deleted_node_ids": deleted,
+                })
+
+            new_root_id = None
+            if root_frame:
+                result = await session_call_tool("create_frame", {
+                    "x": 0,
+                    "y": 0,
+                    "width": width,
+                    "height": height,
+                    "name": "Frame",
+                    "fillColor": {"r": 1, "g": 1, "b": 1, "a": 1}
+                })
+                id_match = re.search(r'ID: ([^\.]+)', str(result["message"]))
+                if result["status"] != "success" or not id_match:
+                    return JSONResponse(status_code=502, content={"status": "error", "message": f"Root frame not created: {result['message']}"})
+                new_root_id = id_match.group(1)
+                root_frame_id, root_frame_width, root_frame_height = new_root_id, width, height
+
+        return {
+            "status": "success",
+            "deleted_node_ids": deleted,
+            "root_frame_id": new_root_id,
+            "elapsed": round(time.perf_counter() - start, 4),
+        }
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return JSONResponse(status_code=500, content={"status": "error", "message": str(e)})
+
+@app.post("/tool/batch")
+async def tool_batch(
+    req: BatchRequest,
+    channel: str = Query(None, description="Pooled Figma channel to run on")
+):
+    """
+    Run an ordered list of tool calls on one session. Use {"$ref": i} in args
+    to pass the node id created by call i; independent calls run concurrently.
+    """
+    try:
+        async with tool_session(channel) as session_call_tool:
+            return await execute_batch(req, session_call_tool)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+
 @app.post("/tool/get_channels")
-async def get_channels_endpoint():
+async def get_channels_endpoint(channel: str = Query(None, description="Pooled Figma channel to run on")):
     try:
-        result = await call_tool("get_channels")
+        result = await call_tool("get_channels", channel=channel)
         
         # Process the result to make it more user-friendly
         if isinstance(result, dict) and "message" in result and result["message"]:
@@ -478,7 +427,7 @@ async def select_channel_endpoint(
 ):
     global current_channel
     try:
-        result = await call_tool("select_channel", {"channel": channel})
+        result = await select_channel(channel)
         
         # Process the result to make it more user-friendly
         if isinstance(result, dict) and "message" in result and result["message"]:
@@ -505,5 +454,13 @@ async def select_channel_endpoint(
         traceback.print_exc()
         return {"status": "error", "message": str(e)}
 
+@app.get("/pool/status")
+async def pool_status():
+    sessions = []
+    if AGENT_TYPE == "single":
+        from fastapi_server import agent_single
+        sessions = agent_single.pool.status() if agent_single.pool else []
+    return {"status": "success", "sessions": sessions, "worker_runtimes": agent_multi.runtimes.status()}
+
 if __name__ == "__main__":
     uvicorn.run("fastapi_server.app:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
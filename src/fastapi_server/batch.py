@@ -0,0 +1,141 @@
+# src/fastapi_server/batch.py
+import re
+import json
+import time
+import asyncio
+from typing import Any, Callable, Dict, List
+
+from pydantic import BaseModel, Field
+
+# Node ids in tool results: 'with ID: 1:2' or a JSON payload with "id" (possibly escaped)
+ID_PATTERN = re.compile(r'(?:ID: |\\?"id\\?":\s*\\?")([^\s\.,"\\]+)')
+# The MCP server reports tool failures as ordinary text replies starting with one of these
+ERROR_PREFIXES = ("Error", "Failed", "Not connected", "Timed out")
+
+
+class ToolInvocation(BaseModel):
+    tool: str
+    args: Dict[str, Any] = Field(default_factory=dict)
+    # Indices of earlier calls that must finish first. Calls referenced through
+    # {"$ref": i} in args are added automatically.
+    depends_on: List[int] = Field(default_factory=list)
+
+
+class BatchRequest(BaseModel):
+    calls: List[ToolInvocation]
+    max_in_flight: int = 4
+    stop_on_error: bool = False
+
+
+def result_node_id(message) -> str:
+    """Pull the node id out of a tool result ("... with ID: 1:23." or a JSON payload)."""
+    text = message if isinstance(message, str) else json.dumps(message)
+    try:
+        # the top-level "id" of a JSON payload, not the first one nested in it
+        payload = json.loads(text[text.index("{"):text.rindex("}") + 1])
+        if "id" in payload:
+            return payload["id"]
+    except (ValueError, TypeError):
+        pass
+    match = ID_PATTERN.search(text)
+    if match:
+        return match.group(1)
+    raise ValueError(f"No node id in result: {text[:200]}")
+
+
+def is_error_reply(message) -> bool:
+    """True for a tool reply that carries an error text instead of a result."""
+    return isinstance(message, str) and message.startswith(ERROR_PREFIXES)
+
+
+def _find_refs(value, found: set):
+    if isinstance(value, dict):
+        if "$ref" in value:
+            found.add(int(value["$ref"]))
+        else:
+            for v in value.values():
+                _find_refs(v, found)
+    elif isinstance(value, list):
+        for v in value:
+            _find_refs(v, found)
+    return found
+
+
+def _resolve(value, results: list):
+    if isinstance(value, dict):
+        if "$ref" in value:
+            result = results[int(value["$ref"])]
+            if value.get("field", "id") == "message":
+                return result["message"]
+            return result_node_id(result["message"])
+        return {k: _resolve(v, results) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve(v, results) for v in value]
+    return value
+
+
+async def execute_batch(req: BatchRequest, call_tool: Callable) -> dict:
+    """
+    Run `req.calls` over one MCP session. Independent calls run concurrently
+    (at most `max_in_flight` at a time); a call waits for the calls it depends
+    on, either explicitly or through a {"$ref": i, "field": "id"|"message"} arg.
+    """
+    n = len(req.calls)
+    deps = []
+    for i, call in enumerate(req.calls):
+        wanted = set(call.depends_on) | _find_refs(call.args, set())
+        bad = [d for d in wanted if not 0 <= d < i]
+        if bad:
+            raise ValueError(f"Call {i} ({call.tool}) depends on {bad}; only earlier calls can be referenced")
+        deps.append(sorted(wanted))
+
+    results = [None] * n
+    done = [asyncio.Event() for _ in range(n)]
+    semaphore = asyncio.Semaphore(max(1, req.max_in_flight))
+    aborted = False
+    batch_start = time.perf_counter()
+
+    async def run(i: int):
+        nonlocal aborted
+        call = req.calls[i]
+        try:
+            for d in deps[i]:
+                await done[d].wait()
+            failed = [d for d in deps[i] if results[d]["status"] != "success"]
+            if failed:
+                results[i] = {"index": i, "tool": call.tool, "status": "skipped", "message": f"dependency {failed} failed", "elapsed": 0.0}
+                return
+
+            async with semaphore:
+                # checked after the wait for a slot: an earlier call may have failed meanwhile
+                if aborted:
+                    results[i] = {"index": i, "tool": call.tool, "status": "skipped", "message": "batch stopped after an earlier error", "elapsed": 0.0}
+                    return
+                start = time.perf_counter()
+                try:
+                    args = _resolve(call.args, results)
+                    outcome = await call_tool(call.tool, args)
+                except Exception as e:
+                    outcome = {"status": "error", "message": str(e)}
+                if is_error_reply(outcome.get("message")):
+                    outcome = {**outcome, "status": "error"}
+                results[i] = {
+                    "index": i,
+                    "tool": call.tool,
+                    "status": outcome.get("status", "error"),
+                    "message": outcome.get("message"),
+                    "started": round(start - batch_start, 4),
+                    "elapsed": round(time.perf_counter() - start, 4),
+                }
+            if results[i]["status"] != "success" and req.stop_on_error:
+                aborted = True
+        finally:
+            done[i].set()
+
+    await asyncio.gather(*(run(i) for i in range(n)))
+
+    return {
+        "status": "success" if all(r["status"] == "success" for r in results) else "partial",
+        "results": results,
+        "elapsed": round(time.perf_counter() - batch_start, 4),
+    }
@@ -0,0 +1,75 @@
+# src/fastapi_server/canvas_hash.py
+import json
+import hashlib
+from dataclasses import dataclass, field
+
+
+def _digest(canvas: dict) -> str:
+    return hashlib.sha256(json.dumps(canvas, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def _index(node: dict, out: dict) -> dict:
+    """node id -> the node's own fields (children left out), for every node in the tree."""
+    node_id = node.get("id")
+    if node_id is not None:
+        out[node_id] = {k: v for k, v in node.items() if k != "children"}
+    for child in node.get("children", []):
+        if isinstance(child, dict):
+            _index(child, out)
+    return out
+
+
+@dataclass
+class CanvasDelta:
+    """Which parts of the canvas changed between two rounds."""
+    root_digest: str
+    added: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+    modified: list = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+    def to_dict(self) -> dict:
+        return {"added": self.added, "removed": self.removed, "modified": self.modified}
+
+    def to_message(self, limit: int = 20) -> str:
+        if not self.changed:
+            return "[CANVAS] No change."
+        parts = []
+        for label, ids in (("added", self.added), ("removed", self.removed), ("modified", self.modified)):
+            if ids:
+                shown = ", ".join(ids[:limit]) + (f", ... (+{len(ids) - limit})" if len(ids) > limit else "")
+                parts.append(f"{label}: {shown}")
+        return "[CANVAS] " + "; ".join(parts)
+
+
+class CanvasHasher:
+    """
+    Change detection for the canvas JSON the supervisor sees each round.
+
+    One digest of the whole payload decides whether anything changed; only
+    then are the node ids diffed against the previous round (added, removed,
+    own fields modified). `get_document_info` returns a flat list of
+    top-level nodes, so there is no subtree worth hashing separately.
+    """
+
+    def __init__(self):
+        self.nodes = {}   # node_id -> own fields of the previous round
+        self.root_digest = None
+
+    def update(self, root: dict) -> CanvasDelta:
+        root_digest = _digest(root)
+        if root_digest == self.root_digest:
+            return CanvasDelta(root_digest=root_digest)
+
+        nodes = _index(root, {})
+        added = [i for i in nodes if i not in self.nodes]
+        removed = [i for i in self.nodes if i not in nodes]
+        modified = [i for i, own in nodes.items() if i in self.nodes and self.nodes[i] != own]
+        if not (added or removed or modified) and root.get("id") is not None:
+            modified = [root["id"]]  # same nodes, new order
+
+        self.nodes, self.root_digest = nodes, root_digest
+        return CanvasDelta(root_digest=root_digest, added=added, removed=removed, modified=modified)
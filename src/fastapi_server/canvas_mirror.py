@@ -0,0 +1,305 @@
+# src/fastapi_server/canvas_mirror.py
+import re
+import json
+import time
+from collections import deque
+
+from langchain_core.tools import BaseTool, StructuredTool
+
+from .batch import ID_PATTERN, ERROR_PREFIXES
+
+# Tools whose answers can be served from the mirror
+READ_TOOLS = {"get_document_info", "get_node_info", "get_nodes_info", "read_my_design", "scan_nodes_by_types"}
+# Read tools that depend on the current selection rather than on node ids
+SELECTION_TOOLS = {"read_my_design", "scan_nodes_by_types"}
+CREATE_TOOLS = {
+    "create_frame": "FRAME",
+    "create_rectangle": "RECTANGLE",
+    "create_text": "TEXT",
+    "create_component_instance": "INSTANCE",
+}
+# Tools that only inspect the canvas or the connection and never change it
+PASSIVE_TOOLS = READ_TOOLS | {
+    "get_selection", "get_styles", "get_local_components", "get_annotations",
+    "scan_text_nodes", "export_node_as_image", "get_channels", "check_connection_status",
+}
+
+# Tools that only repaint their own node: the node and the ancestors embedding it go stale, nothing else.
+# Every other mutation can move or resize other nodes (auto-layout reflow, text resize), so all cached
+# nodes are dropped; the top-level document listing is kept.
+PAINT_TOOLS = {"set_fill_color", "set_stroke_color", "set_corner_radius", "set_annotation", "set_multiple_annotations"}
+
+
+def _is_error(result: str) -> bool:
+    return not isinstance(result, str) or result.startswith(ERROR_PREFIXES)
+
+
+def _args_key(args: dict) -> str:
+    return json.dumps(args or {}, sort_keys=True)
+
+
+class CanvasMirror:
+    """
+    In-memory mirror of one Figma canvas, kept per MCP session.
+
+    Every mutating tool call is appended to an event log and applied to the
+    mirror; read tools are answered from it while it is known to be fresh.
+    Anything the mirror cannot follow (an error, an unparseable result, a
+    node whose parent is unknown) drops the affected cache entries so the next
+    read goes to Figma. Entries older than `max_age` seconds are reconciled
+    against Figma on the next read.
+    """
+
+    def __init__(self, max_age: float = 30.0, log_size: int = 1000):
+        self.max_age = max_age
+        self.events = deque(maxlen=log_size)
+        self.seq = 0
+        self.hits = 0
+        self.misses = 0
+        self.reset()
+
+    def reset(self):
+        self.document = None       # last get_document_info payload, kept in sync
+        self.document_at = 0.0
+        self.nodes = {}            # node_id -> (filtered node dict, fetched_at)
+        self.parents = {}          # node_id -> parent id (None for top level)
+        self.selection = {}        # (tool, args) -> (result text, fetched_at)
+
+    # ---------- reads ----------
+    def _fresh(self, fetched_at: float) -> bool:
+        return time.monotonic() - fetched_at <= self.max_age
+
+    def read(self, tool_name: str, args: dict = None):
+        """Return a cached result for a read tool, or None when Figma must be asked."""
+        args = args or {}
+        result = None
+        if tool_name == "get_document_info":
+            if self.document is not None and self._fresh(self.document_at):
+                result = json.dumps(self.document)
+        elif tool_name == "get_node_info":
+            node = self._cached_node(args.get("nodeId"))
+            if node is not None:
+                result = json.dumps(node)
+        elif tool_name == "get_nodes_info":
+            node_ids = args.get("nodeIds") or []
+            nodes = [self._cached_node(i) for i in node_ids]
+            if node_ids and all(n is not None for n in nodes):
+                result = json.dumps(nodes)
+        elif tool_name in SELECTION_TOOLS:
+            hit = self.selection.get((tool_name, _args_key(args)))
+            if hit and self._fresh(hit[1]):
+                result = hit[0]
+
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def _cached_node(self, node_id):
+        hit = self.nodes.get(node_id)
+        if hit and self._fresh(hit[1]):
+            return hit[0]
+        return None
+
+    def record_read(self, tool_name: str, args: dict, result: str):
+        """Store the answer of a read tool that actually went to Figma."""
+        if _is_error(result):
+            return
+        now = time.monotonic()
+        try:
+            if tool_name == "get_document_info":
+                self.document = json.loads(result)
+                self.document_at = now
+                for child in self.document.get("children", []):
+                    self.parents[child["id"]] = None
+            elif tool_name == "get_node_info":
+                self._store_node(json.loads(result), now)
+            elif tool_name == "get_nodes_info":
+                for node in json.loads(result):
+                    self._store_node(node, now)
+            elif tool_name in SELECTION_TOOLS:
+                self.selection[(tool_name, _args_key(args))] = (result, now)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            pass
+
+    def _store_node(self, node: dict, fetched_at: float):
+        if not isinstance(node, dict) or "id" not in node:
+            return
+        self.nodes[node["id"]] = (node, fetched_at)
+
+        def link(parent):
+            for child in parent.get("children", []) or []:
+                if isinstance(child, dict) and "id" in child:
+                    self.parents[child["id"]] = parent["id"]
+                    link(child)
+
+        link(node)
+
+    # ---------- writes ----------
+    def apply(self, tool_name: str, args: dict, result: str):
+        """Apply the outcome of a mutating tool call to the mirror."""
+        if tool_name in PASSIVE_TOOLS:
+            return
+        args = args or {}
+        self.seq += 1
+        self.events.append({"seq": self.seq, "tool": tool_name, "args": args, "at": time.time()})
+
+        # Selection-scoped reads may cover anything that was touched
+        self.selection.clear()
+
+        if _is_error(result):
+            self.reset()
+            return
+
+        if tool_name in CREATE_TOOLS:
+            self._apply_create(tool_name, args, result)
+        elif tool_name == "clone_node":
+            self._apply_clone(args, result)
+        elif tool_name in ("delete_node", "delete_multiple_nodes"):
+            node_ids = args.get("nodeIds") or [args.get("nodeId")]
+            for node_id in node_ids:
+                self._apply_delete(node_id)
+        elif tool_name in ("select_channel",):
+            # A different channel is a different canvas
+            self.reset()
+        elif tool_name in PAINT_TOOLS:
+            node_ids = [v for k, v in args.items() if k == "nodeId" and isinstance(v, str)]
+            node_ids += [n.get("nodeId") for n in args.get("annotations", []) or [] if isinstance(n, dict)]
+            if not node_ids:
+                self.reset()
+            for node_id in node_ids:
+                self._invalidate(node_id)
+        else:
+            self.nodes.clear()
+
+    def _invalidate(self, node_id):
+        """Drop the node and every cached ancestor; without a known parent chain drop all nodes."""
+        seen = set()
+        while node_id is not None and node_id not in seen:
+            seen.add(node_id)
+            self.nodes.pop(node_id, None)
+            if node_id not in self.parents:
+                self.nodes.clear()
+                return
+            node_id = self.parents[node_id]
+
+    def _apply_create(self, tool_name: str, args: dict, result: str):
+        node_id, name = None, args.get("name")
+        try:
+            # JSON payload first: it also carries the name the node actually got
+            payload = json.loads(result[result.index("{"):result.rindex("}") + 1])
+            node_id, name = payload.get("id"), payload.get("name", name)
+        except (ValueError, AttributeError):
+            pass
+        if node_id is None:
+            match = ID_PATTERN.search(result)
+            node_id = match.group(1) if match else None
+        if node_id is None:
+            self.reset()
+            return
+
+        parent_id = args.get("parentId")
+        self.parents[node_id] = parent_id
+        if parent_id:
+            self.nodes.clear()  # an auto-layout parent reflows its other children
+        elif self.document is not None:
+            self._add_top_level(node_id, name or CREATE_TOOLS[tool_name].title(), CREATE_TOOLS[tool_name])
+
+    def _apply_clone(self, args: dict, result: str):
+        match = re.search(r"new ID: ([^\s]+)", result)
+        source_id = args.get("nodeId")
+        if not match or source_id not in self.parents:
+            self.reset()
+            return
+        clone_id = match.group(1)
+        parent_id = self.parents[source_id]
+        self.parents[clone_id] = parent_id
+        if parent_id:
+            self.nodes.clear()
+        elif self.document is not None:
+            source = next((c for c in self.document["children"] if c["id"] == source_id), None)
+            if source is None:
+                self.document = None
+            else:
+                self._add_top_level(clone_id, source["name"], source["type"])
+
+    def _apply_delete(self, node_id):
+        if node_id is None:
+            return
+        if self.parents.get(node_id) is not None or node_id not in self.parents:
+            self.nodes.clear()  # siblings of a removed child may reflow
+        self.nodes.pop(node_id, None)
+        if self.document is not None:
+            children = self.document.get("children", [])
+            self.document["children"] = [c for c in children if c["id"] != node_id]
+            self._sync_counts()
+        # Descendants of a deleted node go with it
+        doomed, grew = {node_id}, True
+        while grew:
+            grew = False
+            for child, parent in self.parents.items():
+                if parent in doomed and child not in doomed:
+                    doomed.add(child)
+                    grew = True
+        for child in doomed:
+            self.parents.pop(child, None)
+            self.nodes.pop(child, None)
+
+    def _add_top_level(self, node_id: str, name: str, node_type: str):
+        self.document.setdefault("children", []).append({"id": node_id, "name": name, "type": node_type})
+        self._sync_counts()
+
+    def _sync_counts(self):
+        count = len(self.document.get("children", []))
+        if isinstance(self.document.get("currentPage"), dict):
+            self.document["currentPage"]["childCount"] = count
+        for page in self.document.get("pages", []) or []:
+            if page.get("id") == self.document.get("id"):
+                page["childCount"] = count
+
+    def status(self) -> dict:
+        return {
+            "events": self.seq,
+            "hits": self.hits,
+            "misses": self.misses,
+            "cached_nodes": len(self.nodes),
+            "document_cached": self.document is not None,
+        }
+
+
+def mirror_tools(tools: list, mirror: CanvasMirror) -> list:
+    """Wrap MCP tools so reads are served from `mirror` and writes are applied to it."""
+    wrapped = []
+    for tool in tools:
+        if not isinstance(tool, BaseTool):
+            wrapped.append(tool)
+            continue
+        wrapped.append(StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            coroutine=_mirrored_call(tool, mirror),
+        ))
+    return wrapped
+
+
+def _mirrored_call(tool: BaseTool, mirror: CanvasMirror):
+    async def call(**kwargs):
+        if tool.name in READ_TOOLS:
+            cached = mirror.read(tool.name, kwargs)
+            if cached is not None:
+                return cached
+        try:
+            result = await tool.ainvoke(kwargs)
+        except Exception:
+            # The call may or may not have reached the canvas
+            if tool.name not in PASSIVE_TOOLS:
+                mirror.reset()
+            raise
+        if tool.name in READ_TOOLS:
+            mirror.record_read(tool.name, kwargs, result)
+        else:
+            mirror.apply(tool.name, kwargs, result)
+        return result
+    return call
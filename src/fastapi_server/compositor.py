@@ -0,0 +1,117 @@
+# src/fastapi_server/compositor.py
+from typing import Callable, Optional
+
+import numpy as np
+from PIL import Image
+
+from .geometry import Boxes
+
+WHITE = (255, 255, 255)
+# Coverage at which a pixel counts as fully painted (float error margin)
+OPAQUE = 1.0 - 1.0 / 512
+
+
+def canvas_bounds(elements, scale: float = 1.0) -> tuple:
+    """(min_x, min_y, width, height) in output pixels of the union of element bboxes (a list or Boxes)."""
+    boxes = elements if isinstance(elements, Boxes) else Boxes.from_elements(elements)
+    min_x, min_y, max_x, max_y = (float(v) * scale for v in boxes.bounds())
+    return min_x, min_y, int(max_x - min_x), int(max_y - min_y)
+
+
+def composite(
+    elements: list,
+    load: Callable[[str], Optional[Image.Image]],
+    scale: float = 1.0,
+    image_scale: float = 1.0,
+    background: Optional[tuple] = WHITE,
+    stats: dict = None,
+) -> Image.Image:
+    """
+    Flatten node images onto one canvas.
+
+    `elements` are {"id", "bbox": {x, y, width, height}} in paint order (first
+    is bottom-most); `load(node_id)` returns the node's image or None. The
+    canvas spans the union of the bboxes; `scale` maps bbox units to output
+    pixels and `image_scale` is the scale the images were exported at, so
+    `scale < image_scale` gives a downscaled preview.
+
+    The result matches pasting the images back to front with
+    `paste(img, mask=img)` onto a transparent white canvas, which lerps both
+    colour and alpha by each layer's alpha. Both are linear in what shows
+    through, so nodes are drawn front to back into preallocated buffers
+    instead: a node outside the canvas is never loaded, and one whose drawn
+    area is already fully covered is skipped before its pixels are converted
+    (lazily opened images are never decoded).
+    `background=None` returns RGBA with transparent gaps, otherwise RGB.
+    """
+    stats = stats if stats is not None else {}
+    stats.update(drawn=0, occluded=0, offscreen=0, missing=0)
+
+    boxes = Boxes.from_elements(elements)
+    min_x, min_y, width, height = canvas_bounds(boxes, scale)
+    width, height = max(width, 1), max(height, 1)
+    # Pixel rects of every node at once, clipped to the canvas; empty ones are offscreen
+    rects = boxes.pixel_rects(scale, (min_x, min_y))
+    clipped = np.concatenate([np.maximum(rects[:, :2], 0), np.minimum(rects[:, 2:], (width, height))], axis=1)
+    onscreen = (clipped[:, 0] < clipped[:, 2]) & (clipped[:, 1] < clipped[:, 3])
+    stats["offscreen"] += int((~onscreen).sum())
+
+    color = np.zeros((height, width, 3), dtype=np.float32)   # RGB of the layers drawn so far
+    alpha = np.zeros((height, width), dtype=np.float32)      # canvas alpha, 0..1
+    cover = np.zeros((height, width), dtype=np.float32)      # 1 - share still showing through
+    weight = np.empty((height, width), dtype=np.float32)     # per-layer scratch
+    resize = scale / image_scale
+
+    for k in reversed(np.flatnonzero(onscreen).tolist()):
+        el = elements[k]
+        x, y = int(rects[k, 0]), int(rects[k, 1])
+        x0, y0 = clipped[k, :2].tolist()
+
+        img = load(el["id"])
+        if img is None:
+            stats["missing"] += 1
+            continue
+        iw, ih = img.size
+        if resize != 1:
+            iw, ih = max(round(iw * resize), 1), max(round(ih * resize), 1)
+
+        # The drawn area is the image, not the bbox: render bounds can be larger (shadows,
+        # strokes) or smaller, so clip the image to the canvas and test that area
+        ix1, iy1 = min(x + iw, width), min(y + ih, height)
+        if x0 >= ix1 or y0 >= iy1:
+            stats["offscreen"] += 1
+            continue
+        if cover[y0:iy1, x0:ix1].min() >= OPAQUE:
+            stats["occluded"] += 1
+            continue
+
+        if img.mode != "RGBA":
+            img = img.convert("RGBA")
+        if resize != 1:
+            img = img.resize((iw, ih), Image.BILINEAR)
+        src = np.asarray(img, dtype=np.float32)[y0 - y:iy1 - y, x0 - x:ix1 - x]
+
+        w = weight[y0:iy1, x0:ix1]
+        c = cover[y0:iy1, x0:ix1]
+        a = src[..., 3] * (1.0 / 255)
+        np.subtract(1.0, c, out=w)
+        w *= a
+        color[y0:iy1, x0:ix1] += w[..., None] * src[..., :3]
+        alpha[y0:iy1, x0:ix1] += w * a
+        c += w
+        stats["drawn"] += 1
+
+    # The rest shows the canvas' initial white
+    np.subtract(1.0, cover, out=weight)
+    color += weight[..., None] * 255.0
+
+    if background is not None:
+        color *= alpha[..., None]
+        np.subtract(1.0, alpha, out=weight)
+        color += weight[..., None] * np.asarray(background, dtype=np.float32)
+        return Image.fromarray(np.clip(color + 0.5, 0, 255).astype(np.uint8), "RGB")
+
+    rgba = np.empty((height, width, 4), dtype=np.float32)
+    rgba[..., :3] = color
+    rgba[..., 3] = alpha * 255
+    return Image.fromarray(np.clip(rgba + 0.5, 0, 255).astype(np.uint8), "RGBA")
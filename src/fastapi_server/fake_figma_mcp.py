@@ -0,0 +1,571 @@
+# src/fastapi_server/fake_figma_mcp.py
+"""
+In-memory stand-in for talk_to_figma_mcp/dist/server.js.
+
+Speaks MCP over stdio with the same tool names, arguments and result text as
+the real server, but keeps the canvas in a dict instead of talking to the
+Figma plugin through socket.ts. Selected with `mcp_server: fake` in the
+server config; FAKE_FIGMA_LATENCY adds a per-call delay (seconds) to stand in
+for the plugin round trip.
+
+    python src/fastapi_server/fake_figma_mcp.py
+"""
+import os
+import json
+import asyncio
+import base64
+from typing import Dict, List, Optional
+
+from mcp.server.fastmcp import FastMCP, Image
+
+LATENCY = float(os.getenv("FAKE_FIGMA_LATENCY", "0"))
+# 1x1 white PNG returned by export_node_as_image
+PIXEL_PNG = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8/x8AAwMCAO+ip1sAAAAASUVORK5CYII="
+)
+WHITE = {"r": 1, "g": 1, "b": 1, "a": 1}
+BLACK = {"r": 0, "g": 0, "b": 0, "a": 1}
+
+
+def rgba_to_hex(color: dict) -> str:
+    r, g, b = (round(color.get(k, 0) * 255) for k in ("r", "g", "b"))
+    a = round(color.get("a", 1) * 255)
+    return f"#{r:02x}{g:02x}{b:02x}" + ("" if a == 255 else f"{a:02x}")
+
+
+class FakeCanvas:
+    """One Figma page held in memory; node ids follow Figma's "<n>:<m>" form."""
+
+    def __init__(self):
+        self.page = {"id": "0:1", "name": "Page 1", "type": "PAGE", "children": []}
+        self.nodes = {}
+        self.next_id = 2
+        self.channel = None
+
+    def _new_id(self) -> str:
+        node_id = f"1:{self.next_id}"
+        self.next_id += 1
+        return node_id
+
+    def get(self, node_id: str) -> dict:
+        if node_id not in self.nodes:
+            raise ValueError(f"Node not found with ID: {node_id}")
+        return self.nodes[node_id]
+
+    def _children_of(self, parent_id: Optional[str]) -> list:
+        if parent_id:
+            return self.get(parent_id)["children"]
+        return self.page["children"]
+
+    def create(self, node_type: str, name: str, x, y, width, height, parent_id=None, **props) -> dict:
+        siblings = self._children_of(parent_id)
+        node = {
+            "id": self._new_id(), "name": name, "type": node_type,
+            "x": x, "y": y, "width": width, "height": height,
+            "parentId": parent_id, "children": [], **props,
+        }
+        self.nodes[node["id"]] = node
+        siblings.append(node["id"])
+        return node
+
+    def absolute_position(self, node: dict):
+        x, y, parent_id = node["x"], node["y"], node["parentId"]
+        while parent_id:
+            parent = self.nodes[parent_id]
+            x, y, parent_id = x + parent["x"], y + parent["y"], parent["parentId"]
+        return x, y
+
+    def clone(self, node_id: str, x=None, y=None) -> dict:
+        source = self.get(node_id)
+
+        def copy(node, parent_id, dx=None, dy=None):
+            props = {k: v for k, v in node.items() if k not in ("id", "children", "parentId", "x", "y")}
+            new = {**props, "id": self._new_id(), "parentId": parent_id, "children": [],
+                   "x": node["x"] if dx is None else dx, "y": node["y"] if dy is None else dy}
+            self.nodes[new["id"]] = new
+            for child_id in node["children"]:
+                new["children"].append(copy(self.nodes[child_id], new["id"])["id"])
+            return new
+
+        clone = copy(source, source["parentId"], x, y)
+        self._children_of(source["parentId"]).append(clone["id"])
+        return clone
+
+    def delete(self, node_id: str):
+        node = self.get(node_id)
+        self._children_of(node["parentId"]).remove(node_id)
+        stack = [node_id]
+        while stack:
+            current = self.nodes.pop(stack.pop())
+            stack.extend(current["children"])
+
+    def dump(self, node_id: str) -> dict:
+        """Node as the real server returns it from get_node_info (filterFigmaNode)."""
+        node = self.get(node_id)
+        x, y = self.absolute_position(node)
+        out = {"id": node["id"], "name": node["name"], "type": node["type"]}
+        if node.get("fillColor"):
+            out["fills"] = [{"type": "SOLID", "visible": True, "opacity": 1, "blendMode": "NORMAL", "color": rgba_to_hex(node["fillColor"])}]
+        if node.get("strokeColor"):
+            out["strokes"] = [{"type": "SOLID", "color": rgba_to_hex(node["strokeColor"])}]
+        if node.get("cornerRadius") is not None:
+            out["cornerRadius"] = node["cornerRadius"]
+        out["absoluteBoundingBox"] = {"x": x, "y": y, "width": node["width"], "height": node["height"]}
+        if node.get("characters"):
+            out["characters"] = node["characters"]
+            out["style"] = {"fontFamily": "Inter", "fontStyle": "Regular", "fontWeight": node.get("fontWeight", 400),
+                            "fontSize": node.get("fontSize", 14), "textAlignHorizontal": "LEFT"}
+        if node["children"]:
+            out["children"] = [self.dump(c) for c in node["children"]]
+        return out
+
+    def document_info(self) -> dict:
+        children = [{"id": c, "name": self.nodes[c]["name"], "type": self.nodes[c]["type"]} for c in self.page["children"]]
+        page = {"id": self.page["id"], "name": self.page["name"], "childCount": len(children)}
+        return {
+            "name": self.page["name"], "id": self.page["id"], "type": "PAGE",
+            "children": children, "currentPage": page, "pages": [page],
+        }
+
+    def descendants(self, node_id: str, types=None) -> list:
+        found, stack = [], list(self.get(node_id)["children"])
+        while stack:
+            node = self.nodes[stack.pop(0)]
+            if types is None or node["type"] in types:
+                found.append(node)
+            stack.extend(node["children"])
+        return found
+
+
+canvas = FakeCanvas()
+mcp = FastMCP("FakeTalkToFigma")
+
+
+async def plugin_round_trip():
+    if LATENCY:
+        await asyncio.sleep(LATENCY)
+
+
+def error(action: str, e: Exception) -> str:
+    return f"Error {action}: {e}"
+
+
+# ---------- connection ----------
+@mcp.tool()
+async def get_channels() -> str:
+    """Get available Figma channels for communication"""
+    return json.dumps({"availableChannels": ["fake"], "currentChannel": canvas.channel})
+
+
+@mcp.tool()
+async def select_channel(channel: str) -> str:
+    """Select a specific Figma channel for communication"""
+    canvas.channel = channel
+    return f"Successfully joined channel: {channel}"
+
+
+@mcp.tool()
+async def check_connection_status() -> str:
+    """Check the connection status with Figma"""
+    return "Connected to Figma (fake in-memory canvas)"
+
+
+# ---------- reads ----------
+@mcp.tool()
+async def get_document_info() -> str:
+    """Get image of the current page in Figma"""
+    await plugin_round_trip()
+    return json.dumps(canvas.document_info())
+
+
+@mcp.tool()
+async def get_selection() -> str:
+    """Get information about the current selection in Figma"""
+    await plugin_round_trip()
+    return json.dumps({"selectionCount": 0, "selection": []})
+
+
+@mcp.tool()
+async def read_my_design() -> str:
+    """Get detailed information about the current selection in Figma, including all node details"""
+    await plugin_round_trip()
+    return json.dumps([])
+
+
+@mcp.tool()
+async def get_node_info(nodeId: str) -> str:
+    """Get detailed information about a specific node in Figma"""
+    await plugin_round_trip()
+    try:
+        return json.dumps(canvas.dump(nodeId))
+    except Exception as e:
+        return error("getting node info", e)
+
+
+@mcp.tool()
+async def get_nodes_info(nodeIds: List[str]) -> str:
+    """Get detailed information about multiple nodes in Figma"""
+    await plugin_round_trip()
+    try:
+        return json.dumps([canvas.dump(n) for n in nodeIds])
+    except Exception as e:
+        return error("getting nodes info", e)
+
+
+@mcp.tool()
+async def get_styles() -> str:
+    """Get all styles from the current Figma document"""
+    return json.dumps({"colors": [], "texts": [], "effects": [], "grids": []})
+
+
+@mcp.tool()
+async def get_local_components() -> str:
+    """Get all local components from the Figma document"""
+    return json.dumps({"count": 0, "components": []})
+
+
+@mcp.tool()
+async def get_annotations(nodeId: Optional[str] = None, includeCategories: bool = True) -> str:
+    """Get all annotations in the current document or specific node"""
+    try:
+        nodes = [canvas.get(nodeId)] if nodeId else list(canvas.nodes.values())
+    except Exception as e:
+        return error("getting annotations", e)
+    annotations = [{"nodeId": n["id"], **a} for n in nodes for a in n.get("annotations", [])]
+    return json.dumps({"annotatedNodes": annotations, "categories": [] if includeCategories else None})
+
+
+@mcp.tool()
+async def scan_text_nodes(nodeId: str) -> str:
+    """Scan all text nodes in the selected Figma node"""
+    await plugin_round_trip()
+    try:
+        texts = canvas.descendants(nodeId, {"TEXT"})
+    except Exception as e:
+        return error("scanning text nodes", e)
+    return json.dumps({"success": True, "count": len(texts), "textNodes": [
+        {"id": t["id"], "name": t["name"], "characters": t.get("characters", "")} for t in texts
+    ]})
+
+
+@mcp.tool()
+async def scan_nodes_by_types(nodeId: str, types: List[str]) -> str:
+    """Scan for nodes with specific types in the selected Figma node"""
+    await plugin_round_trip()
+    try:
+        found = canvas.descendants(nodeId, set(types))
+    except Exception as e:
+        return error("scanning nodes", e)
+    return json.dumps({"success": True, "count": len(found), "matchingNodes": [
+        {"id": n["id"], "name": n["name"], "type": n["type"]} for n in found
+    ]})
+
+
+@mcp.tool()
+async def export_node_as_image(nodeId: str, format: Optional[str] = None, scale: Optional[float] = None):
+    """Export a node as an image from Figma"""
+    await plugin_round_trip()
+    try:
+        canvas.get(nodeId)
+    except Exception as e:
+        return error("exporting node as image", e)
+    return Image(data=PIXEL_PNG, format="png")
+
+
+# ---------- creation ----------
+@mcp.tool()
+async def create_frame(
+    x: float,
+    y: float,
+    width: float,
+    height: float,
+    name: Optional[str] = None,
+    parentId: Optional[str] = None,
+    fillColor: Optional[Dict[str, float]] = None,
+    strokeColor: Optional[Dict[str, float]] = None,
+    strokeWeight: Optional[float] = None,
+    layoutMode: Optional[str] = None,
+    layoutWrap: Optional[str] = None,
+    paddingTop: Optional[float] = None,
+    paddingRight: Optional[float] = None,
+    paddingBottom: Optional[float] = None,
+    paddingLeft: Optional[float] = None,
+    primaryAxisAlignItems: Optional[str] = None,
+    counterAxisAlignItems: Optional[str] = None,
+    layoutSizingHorizontal: Optional[str] = None,
+    layoutSizingVertical: Optional[str] = None,
+    itemSpacing: Optional[float] = None,
+) -> str:
+    """Create a new frame in Figma"""
+    await plugin_round_trip()
+    try:
+        node = canvas.create(
+            "FRAME", name or "Frame", x, y, width, height, parentId,
+            fillColor=fillColor or WHITE, strokeColor=strokeColor, layoutMode=layoutMode or "NONE",
+        )
+    except Exception as e:
+        return error("creating frame", e)
+    return f'Created frame "{node["name"]}" with ID: {node["id"]}.'
+
+
+@mcp.tool()
+async def create_rectangle(x: float, y: float, width: float, height: float, name: Optional[str] = None, parentId: Optional[str] = None) -> str:
+    """Create a new rectangle in Figma"""
+    await plugin_round_trip()
+    try:
+        node = canvas.create("RECTANGLE", name or "Rectangle", x, y, width, height, parentId, fillColor={"r": 0.85, "g": 0.85, "b": 0.85, "a": 1})
+    except Exception as e:
+        return error("creating rectangle", e)
+    result = {k: node[k] for k in ("id", "name", "x", "y", "width", "height")}
+    result["parentId"] = parentId
+    return f'Created rectangle "{json.dumps(result)}"'
+
+
+@mcp.tool()
+async def create_text(
+    x: float,
+    y: float,
+    text: str,
+    fontSize: Optional[float] = None,
+    fontWeight: Optional[float] = None,
+    fontColor: Optional[Dict[str, float]] = None,
+    name: Optional[str] = None,
+    parentId: Optional[str] = None,
+) -> str:
+    """Create a new text element in Figma"""
+    await plugin_round_trip()
+    size = fontSize or 14
+    try:
+        node = canvas.create(
+            "TEXT", name or "Text", x, y, round(len(text) * size * 0.6, 2), round(size * 1.2, 2), parentId,
+            characters=text, fontSize=size, fontWeight=fontWeight or 400, fillColor=fontColor or BLACK,
+        )
+    except Exception as e:
+        return error("creating text", e)
+    return f'Created text "{node["name"]}" with ID: {node["id"]}'
+
+
+@mcp.tool()
+async def create_component_instance(componentKey: str, x: float, y: float) -> str:
+    """Create an instance of a component in Figma"""
+    await plugin_round_trip()
+    return error("creating component instance", ValueError(f"Component not found: {componentKey}"))
+
+
+@mcp.tool()
+async def clone_node(nodeId: str, x: Optional[float] = None, y: Optional[float] = None) -> str:
+    """Clone an existing node in Figma"""
+    await plugin_round_trip()
+    try:
+        node = canvas.clone(nodeId, x, y)
+    except Exception as e:
+        return error("cloning node", e)
+    position = f" at position ({x}, {y})" if x is not None and y is not None else ""
+    return f'Cloned node "{node["name"]}" with new ID: {node["id"]}{position}'
+
+
+# ---------- edits ----------
+async def _edit(node_id: str, **changes):
+    await plugin_round_trip()
+    node = canvas.get(node_id)
+    node.update(changes)
+    return node
+
+
+@mcp.tool()
+async def set_fill_color(nodeId: str, r: float, g: float, b: float, a: Optional[float] = None) -> str:
+    """Set the fill color of a node in Figma can be TextNode or FrameNode"""
+    try:
+        node = await _edit(nodeId, fillColor={"r": r, "g": g, "b": b, "a": a or 1})
+    except Exception as e:
+        return error("setting fill color", e)
+    return f'Set fill color of node "{node["name"]}" to RGBA({r}, {g}, {b}, {a or 1})'
+
+
+@mcp.tool()
+async def set_stroke_color(nodeId: str, r: float, g: float, b: float, a: Optional[float] = None, weight: Optional[float] = None) -> str:
+    """Set the stroke color of a node in Figma"""
+    try:
+        node = await _edit(nodeId, strokeColor={"r": r, "g": g, "b": b, "a": a or 1}, strokeWeight=weight or 1)
+    except Exception as e:
+        return error("setting stroke color", e)
+    return f'Set stroke color of node "{node["name"]}" to RGBA({r}, {g}, {b}, {a or 1}) with weight {weight or 1}'
+
+
+@mcp.tool()
+async def move_node(nodeId: str, x: float, y: float) -> str:
+    """Move a node to a new position in Figma"""
+    try:
+        node = await _edit(nodeId, x=x, y=y)
+    except Exception as e:
+        return error("moving node", e)
+    return f'Moved node "{node["name"]}" to position ({x}, {y})'
+
+
+@mcp.tool()
+async def resize_node(nodeId: str, width: float, height: float) -> str:
+    """Resize a node in Figma"""
+    try:
+        node = await _edit(nodeId, width=width, height=height)
+    except Exception as e:
+        return error("resizing node", e)
+    return f'Resized node "{node["name"]}" to width {width} and height {height}'
+
+
+@mcp.tool()
+async def set_corner_radius(nodeId: str, radius: float, corners: Optional[List[bool]] = None) -> str:
+    """Set the corner radius of a node in Figma"""
+    try:
+        node = await _edit(nodeId, cornerRadius=radius)
+    except Exception as e:
+        return error("setting corner radius", e)
+    return f'Set corner radius of node "{node["name"]}" to {radius}px'
+
+
+@mcp.tool()
+async def set_text_content(nodeId: str, text: str) -> str:
+    """Set the text content of an existing text node in Figma"""
+    try:
+        node = await _edit(nodeId, characters=text)
+    except Exception as e:
+        return error("setting text content", e)
+    return f'Updated text content of node "{node["name"]}" to "{text}"'
+
+
+@mcp.tool()
+async def set_multiple_text_contents(nodeId: str, text: List[Dict[str, str]]) -> str:
+    """Set multiple text contents parallelly in a node"""
+    replaced, failed = 0, 0
+    for item in text:
+        try:
+            await _edit(item["nodeId"], characters=item["text"])
+            replaced += 1
+        except Exception:
+            failed += 1
+    return f"Text replacement completed: {replaced} of {len(text)} successfully updated, {failed} failed."
+
+
+@mcp.tool()
+async def set_annotation(
+    nodeId: str,
+    labelMarkdown: str,
+    annotationId: Optional[str] = None,
+    categoryId: Optional[str] = None,
+    properties: Optional[List[Dict[str, str]]] = None,
+) -> str:
+    """Create or update an annotation"""
+    try:
+        node = canvas.get(nodeId)
+    except Exception as e:
+        return error("setting annotation", e)
+    node.setdefault("annotations", []).append({"labelMarkdown": labelMarkdown, "categoryId": categoryId})
+    return json.dumps({"success": True, "nodeId": nodeId})
+
+
+@mcp.tool()
+async def set_multiple_annotations(nodeId: str, annotations: List[Dict]) -> str:
+    """Set multiple annotations parallelly in a node"""
+    applied = 0
+    for item in annotations:
+        if item.get("nodeId") in canvas.nodes:
+            canvas.nodes[item["nodeId"]].setdefault("annotations", []).append(
+                {"labelMarkdown": item.get("labelMarkdown"), "categoryId": item.get("categoryId")}
+            )
+            applied += 1
+    return f"Annotation process completed: {applied} of {len(annotations)} successfully applied."
+
+
+# ---------- auto layout ----------
+@mcp.tool()
+async def set_layout_mode(nodeId: str, layoutMode: str, layoutWrap: Optional[str] = None) -> str:
+    """Set the layout mode and wrap behavior of a frame in Figma"""
+    try:
+        node = await _edit(nodeId, layoutMode=layoutMode, layoutWrap=layoutWrap or "NO_WRAP")
+    except Exception as e:
+        return error("setting layout mode", e)
+    return f'Set layout mode of frame "{node["name"]}" to {layoutMode}'
+
+
+@mcp.tool()
+async def set_padding(
+    nodeId: str,
+    paddingTop: Optional[float] = None,
+    paddingRight: Optional[float] = None,
+    paddingBottom: Optional[float] = None,
+    paddingLeft: Optional[float] = None,
+) -> str:
+    """Set padding values for an auto-layout frame in Figma"""
+    padding = {k: v for k, v in (("paddingTop", paddingTop), ("paddingRight", paddingRight),
+                                 ("paddingBottom", paddingBottom), ("paddingLeft", paddingLeft)) if v is not None}
+    try:
+        node = await _edit(nodeId, **padding)
+    except Exception as e:
+        return error("setting padding", e)
+    return f'Set padding for frame "{node["name"]}": {", ".join(f"{k}: {v}" for k, v in padding.items())}'
+
+
+@mcp.tool()
+async def set_axis_align(nodeId: str, primaryAxisAlignItems: Optional[str] = None, counterAxisAlignItems: Optional[str] = None) -> str:
+    """Set primary and counter axis alignment for an auto-layout frame in Figma"""
+    try:
+        node = await _edit(nodeId, primaryAxisAlignItems=primaryAxisAlignItems, counterAxisAlignItems=counterAxisAlignItems)
+    except Exception as e:
+        return error("setting axis alignment", e)
+    return f'Set axis alignment for frame "{node["name"]}"'
+
+
+@mcp.tool()
+async def set_layout_sizing(nodeId: str, layoutSizingHorizontal: Optional[str] = None, layoutSizingVertical: Optional[str] = None) -> str:
+    """Set horizontal and vertical sizing modes for an auto-layout frame in Figma"""
+    try:
+        node = await _edit(nodeId, layoutSizingHorizontal=layoutSizingHorizontal, layoutSizingVertical=layoutSizingVertical)
+    except Exception as e:
+        return error("setting layout sizing", e)
+    return f'Set layout sizing for frame "{node["name"]}"'
+
+
+@mcp.tool()
+async def set_item_spacing(nodeId: str, itemSpacing: float) -> str:
+    """Set distance between children in an auto-layout frame"""
+    try:
+        node = await _edit(nodeId, itemSpacing=itemSpacing)
+    except Exception as e:
+        return error("setting item spacing", e)
+    return f'Set item spacing to {itemSpacing} for frame "{node["name"]}"'
+
+
+# ---------- deletion ----------
+@mcp.tool()
+async def delete_node(nodeId: str) -> str:
+    """Delete a node from Figma"""
+    await plugin_round_trip()
+    try:
+        canvas.delete(nodeId)
+    except Exception as e:
+        return error("deleting node", e)
+    return f"Deleted node with ID: {nodeId}"
+
+
+@mcp.tool()
+async def delete_multiple_nodes(nodeIds: List[str]) -> str:
+    """Delete multiple nodes from Figma at once"""
+    await plugin_round_trip()
+    results = []
+    for node_id in nodeIds:
+        try:
+            canvas.delete(node_id)
+            results.append({"success": True, "nodeId": node_id})
+        except Exception as e:
+            results.append({"success": False, "nodeId": node_id, "error": str(e)})
+    deleted = sum(r["success"] for r in results)
+    return json.dumps({
+        "success": deleted > 0,
+        "nodesDeleted": deleted,
+        "nodesFailed": len(results) - deleted,
+        "totalNodes": len(nodeIds),
+        "results": results,
+    })
+
+
+if __name__ == "__main__":
+    mcp.run()
@@ -0,0 +1,194 @@
+# src/fastapi_server/figma_client.py
+import os
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+EXPORT_BASE_URL = "https://api.figma.com/v1"
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# Bounds for one /images call: node count and length of the joined ids
+MAX_IDS_PER_CHUNK = 50
+MAX_IDS_CHARS = 1500
+STREAM_CHUNK_SIZE = 1 << 16
+
+
+class FigmaAPIError(RuntimeError):
+    def __init__(self, status: int, url: str, body: str = ""):
+        super().__init__(f"Figma request failed ({status}) for {url}: {body[:200]}")
+        self.status = status
+        self.url = url
+
+
+def retry_delay(headers, attempt: int, backoff: float = 1.0, max_backoff: float = 60.0) -> float:
+    """Seconds to wait before retry `attempt` (0-based): Retry-After if given, else jittered exponential."""
+    retry_after = (headers or {}).get("Retry-After")
+    if retry_after:
+        try:
+            return min(float(retry_after), max_backoff)
+        except ValueError:
+            try:
+                return min(max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0), max_backoff)
+            except (TypeError, ValueError):
+                pass
+    delay = min(backoff * (2 ** attempt), max_backoff)
+    return delay * (0.5 + random.random() / 2)
+
+
+def chunk_ids(ids: list, max_ids: int = MAX_IDS_PER_CHUNK, max_chars: int = MAX_IDS_CHARS) -> list:
+    """Split node ids into chunks of at most `max_ids` ids and `max_chars` joined characters."""
+    chunks, current, length = [], [], 0
+    for node_id in ids:
+        extra = len(node_id) + (1 if current else 0)
+        if current and (len(current) >= max_ids or length + extra > max_chars):
+            chunks.append(current)
+            current, length, extra = [], 0, len(node_id)
+        current.append(node_id)
+        length += extra
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class FigmaClient:
+    """
+    Shared async client for the Figma REST API.
+
+    One keep-alive connection pool per client; at most `max_concurrency`
+    requests in flight; 429 and 5xx answers are retried with exponential
+    backoff, honoring Retry-After. Use as `async with FigmaClient() as figma:`.
+    """
+
+    def __init__(
+        self,
+        token: str = None,
+        base_url: str = EXPORT_BASE_URL,
+        max_concurrency: int = 8,
+        max_retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        timeout: float = 120.0,
+        image_chunk_size: int = MAX_IDS_PER_CHUNK,
+        chunk_rounds: int = 2,
+    ):
+        self.token = token if token is not None else os.getenv("FIGMA_API_TOKEN")
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.image_chunk_size = image_chunk_size
+        self.chunk_rounds = chunk_rounds
+        self.session = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0}
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def open(self):
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=60)
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+    async def close(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _request(self, url: str, params: dict = None, auth: bool = True, as_json: bool = True, sink=None):
+        """GET with retries. With `sink` the body is fed to `sink.write` chunk by chunk (after `sink.reset()` on every attempt)."""
+        headers = {"X-Figma-Token": self.token} if auth and self.token else {}
+        for attempt in range(self.max_retries + 1):
+            async with self._semaphore:
+                self.stats["requests"] += 1
+                try:
+                    async with self.session.get(url, params=params, headers=headers) as res:
+                        if res.status == 200 and sink is not None:
+                            sink.reset()
+                            async for chunk in res.content.iter_chunked(STREAM_CHUNK_SIZE):
+                                sink.write(chunk)
+                            return sink
+                        if res.status == 200:
+                            return await (res.json(content_type=None) if as_json else res.read())
+                        body = await res.text(errors="replace")
+                        if res.status not in RETRY_STATUS or attempt == self.max_retries:
+                            raise FigmaAPIError(res.status, url, body)
+                        if res.status == 429:
+                            self.stats["throttled"] += 1
+                        delay = retry_delay(res.headers, attempt, self.backoff, self.max_backoff)
+                except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError):
+                    if attempt == self.max_retries:
+                        raise
+                    delay = retry_delay(None, attempt, self.backoff, self.max_backoff)
+            # Sleep outside the semaphore so a throttled call does not hold a slot
+            self.stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    # ---------- Figma endpoints ----------
+    async def get_file(self, file_key: str, **params) -> dict:
+        return await self._request(f"{self.base_url}/files/{file_key}", params=params or None)
+
+    async def stream_file(self, file_key: str, sink, **params):
+        """GET /files/{key} into `sink` (e.g. figma_stream.FileSnapshot) without holding the whole body."""
+        return await self._request(f"{self.base_url}/files/{file_key}", params=params or None, sink=sink)
+
+    async def _image_chunk(self, file_key: str, ids: list, format: str, scale: int) -> dict:
+        params = {"ids": ",".join(ids), "format": format, "scale": scale}
+        payload = await self._request(f"{self.base_url}/images/{file_key}", params=params)
+        if payload.get("err"):
+            raise FigmaAPIError(200, f"{self.base_url}/images/{file_key}", str(payload["err"]))
+        return payload.get("images") or {}
+
+    async def get_image_urls(self, file_key: str, ids: list, format: str = "png", scale: int = 1) -> dict:
+        """
+        Render URLs for `ids`, requested in size-bounded chunks concurrently.
+        Chunks that fail are retried (split in half) for up to `chunk_rounds`
+        more rounds; the successful chunks are kept, not requested again.
+        """
+        pending = chunk_ids(list(dict.fromkeys(ids)), max_ids=self.image_chunk_size)
+        images = {}
+        for round_no in range(self.chunk_rounds + 1):
+            results = await asyncio.gather(
+                *(self._image_chunk(file_key, chunk, format, scale) for chunk in pending),
+                return_exceptions=True,
+            )
+            failed, errors = [], []
+            for chunk, result in zip(pending, results):
+                if isinstance(result, Exception):
+                    failed.append(chunk)
+                    errors.append(result)
+                else:
+                    images.update(result)
+            if not failed:
+                return images
+
+            failed_ids = sum(len(c) for c in failed)
+            print(f"[FIGMA] {len(failed)} image chunk(s) / {failed_ids} ids failed (round {round_no}): {errors[0]}")
+            if round_no == self.chunk_rounds:
+                raise errors[0]
+            # A chunk that timed out or was rejected is more likely to pass when smaller
+            pending = [half for c in failed for half in (c[:(len(c) + 1) // 2], c[(len(c) + 1) // 2:]) if half]
+
+    async def download(self, url: str) -> bytes:
+        # Rendered images live on a CDN and must not get the Figma token
+        return await self._request(url, auth=False, as_json=False)
+
+    async def download_all(self, urls: dict) -> dict:
+        """Download {key: url} concurrently; returns {key: bytes} for every URL that succeeded."""
+        items = [(key, url) for key, url in urls.items() if url]
+        results = await asyncio.gather(*(self.download(url) for _, url in items), return_exceptions=True)
+        downloaded = {}
+        for (key, _), result in zip(items, results):
+            if isinstance(result, Exception):
+                print(f"[FIGMA] Download failed for {key}: {result}")
+                continue
+            downloaded[key] = result
+        return downloaded
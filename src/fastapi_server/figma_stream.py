@@ -0,0 +1,227 @@
+# src/fastapi_server/figma_stream.py
+import gzip
+import json
+import warnings
+from pathlib import Path
+
+try:
+    import ijson
+except ImportError:  # listed in requirements.txt; without it the saved payload is parsed once after the download
+    ijson = None
+
+RENDER_BOUNDS = "absoluteRenderBounds"
+NODE_STEP = ".children.item"
+
+
+def node_depth(prefix: str):
+    """Depth of the node at an ijson prefix (0 = document, 1 = page, ...), or None if it is not a node."""
+    if not prefix.startswith("document"):
+        return None
+    rest = prefix[len("document"):]
+    depth, extra = divmod(len(rest), len(NODE_STEP))
+    if extra or rest != NODE_STEP * depth:
+        return None
+    return depth
+
+
+def _number(value):
+    return value if isinstance(value, int) else float(value)
+
+
+class TargetCollector:
+    """
+    Builds the target list of one page (or of one frame on it) from ijson
+    parse events, keeping only an {id, name, bbox} record per node instead
+    of the document tree. Targets come out in document order, as
+    `find_targets` returns them.
+    """
+
+    def __init__(self, page_name: str, frame_name: str = None, bounds_key: str = RENDER_BOUNDS):
+        self.page_name = page_name
+        self.frame_name = frame_name
+        self.bounds_key = bounds_key
+        self.stack = []
+        self.page = None     # records of the page being parsed
+        self.found = None    # records of the first matching page
+
+    def _push(self, prefix: str, depth: int):
+        node = {
+            "prefix": prefix,
+            "depth": depth,
+            "record": {"id": None, "name": None},
+            "bounds": f"{prefix}.{self.bounds_key}",
+            "has_bounds": False,
+        }
+        page = self.page
+        if depth == 1 and self.found is None:
+            self.page = {"name": None, "groups": []}
+        elif depth >= 2 and page is not None and page["name"] in (None, self.page_name):
+            if depth == 2:
+                page["groups"].append([])
+            page["groups"][-1].append(node)
+        self.stack.append(node)
+
+    def _pop(self):
+        node = self.stack.pop()
+        if node["depth"] == 1 and self.page is not None:
+            if self.page["name"] == self.page_name:
+                self.found = self.page
+            self.page = None
+
+    def feed(self, prefix: str, event: str, value):
+        if event == "start_map":
+            depth = node_depth(prefix)
+            if depth is not None:
+                self._push(prefix, depth)
+            elif self.stack and prefix == self.stack[-1]["bounds"]:
+                self.stack[-1]["record"]["bbox"] = {}
+            return
+        if not self.stack:
+            return
+        node = self.stack[-1]
+        if event == "end_map":
+            if prefix == node["prefix"]:
+                self._pop()
+        elif event == "map_key":
+            if prefix == node["prefix"] and value == self.bounds_key:
+                node["has_bounds"] = True
+                node["record"]["bbox"] = None
+        elif event == "string":
+            if prefix == node["prefix"] + ".id":
+                node["record"]["id"] = value
+            elif prefix == node["prefix"] + ".name":
+                node["record"]["name"] = value
+                if node["depth"] == 1 and self.page is not None:
+                    self.page["name"] = value
+        elif event == "number" and prefix.startswith(node["bounds"] + "."):
+            node["record"]["bbox"][prefix[len(node["bounds"]) + 1:]] = _number(value)
+
+    def targets(self) -> list:
+        if self.found is None:
+            raise ValueError(f"Page '{self.page_name}' not found")
+        groups = self.found["groups"]
+        if self.frame_name:
+            frame = next((g for g in groups if g[0]["record"]["name"] == self.frame_name), None)
+            if frame is None:
+                raise ValueError(f"Frame '{self.frame_name}' not found")
+            groups = [frame[1:]]
+        return [node["record"] for group in groups for node in group if node["has_bounds"]]
+
+
+def find_targets(file_json: dict, page_name: str, frame_name: str = None, bounds_key: str = RENDER_BOUNDS) -> list:
+    """{id, name, bbox} of every node with `bounds_key` on a page (or inside one of its frames)."""
+    document = file_json["document"]
+
+    page = next((c for c in document["children"] if c["name"] == page_name), None)
+    if not page:
+        raise ValueError(f"Page '{page_name}' not found")
+
+    targets = []
+
+    def recurse(nodes):
+        for node in nodes:
+            if bounds_key in node:
+                targets.append({"id": node["id"], "name": node["name"], "bbox": node[bounds_key]})
+            if "children" in node:
+                recurse(node["children"])
+
+    if frame_name:
+        frame = next((f for f in page["children"] if f["name"] == frame_name), None)
+        if not frame:
+            raise ValueError(f"Frame '{frame_name}' not found")
+        recurse(frame["children"])
+    else:
+        recurse(page["children"])
+
+    return targets
+
+
+def open_file_json(path: Path):
+    path = Path(path)
+    return gzip.open(path, "rt", encoding="utf-8") if path.suffix == ".gz" else open(path, "r", encoding="utf-8")
+
+
+def load_file_json(path: Path) -> dict:
+    """A saved /v1/files payload, plain or gzipped."""
+    with open_file_json(path) as f:
+        return json.load(f)
+
+
+class FileSnapshot:
+    """
+    Sink for a streamed /v1/files response (see FigmaClient.stream_file).
+
+    The raw bytes go straight to `path` as Figma sent them (compact), gzipped
+    when the path ends in .gz, or nowhere with `path=None`. With ijson the
+    targets are extracted while the bytes arrive, so memory stays flat
+    whatever the file size; without it the saved payload is parsed once at
+    `close()` (which then needs a `path`, or keeps the body in memory).
+    """
+
+    def __init__(self, path, page_name: str, frame_name: str = None, bounds_key: str = RENDER_BOUNDS):
+        self.path = Path(path) if path else None
+        self.page_name = page_name
+        self.frame_name = frame_name
+        self.bounds_key = bounds_key
+        self.size = 0
+        self._file = None
+        self._buffer = None
+        self._parser = None
+        self._events = None
+        self._collector = None
+
+    def reset(self):
+        """Start over (called again when a download is retried)."""
+        self._close_file()
+        self.size = 0
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = gzip.open(self.path, "wb", compresslevel=5) if self.path.suffix == ".gz" else open(self.path, "wb")
+        if ijson is not None:
+            self._collector = TargetCollector(self.page_name, self.frame_name, self.bounds_key)
+            self._events = ijson.sendable_list()
+            self._parser = ijson.parse_coro(self._events)
+        elif self.path is None:
+            warnings.warn(
+                "ijson is not installed: the whole /v1/files body is buffered in memory (pip install ijson)",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+            self._buffer = bytearray()
+
+    def write(self, chunk: bytes):
+        if self._file is None and self._parser is None and self._buffer is None:
+            self.reset()
+        self.size += len(chunk)
+        if self._file is not None:
+            self._file.write(chunk)
+        if self._buffer is not None:
+            self._buffer.extend(chunk)
+        if self._parser is not None:
+            self._parser.send(chunk)
+            self._drain()
+
+    def _drain(self):
+        for prefix, event, value in self._events:
+            self._collector.feed(prefix, event, value)
+        del self._events[:]
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> list:
+        """Finish the payload and return the targets ({id, name, bbox}, names unsanitized)."""
+        self._close_file()
+        if self._parser is not None:
+            self._parser.close()
+            self._drain()
+            self._parser = None
+            return self._collector.targets()
+        if self._buffer is not None:
+            file_json = json.loads(bytes(self._buffer))
+            self._buffer = None
+        else:
+            file_json = load_file_json(self.path)
+        return find_targets(file_json, self.page_name, self.frame_name, self.bounds_key)
@@ -0,0 +1,272 @@
+# src/fastapi_server/geometry.py
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # optional: without it matching uses the Hungarian fallback below
+    linear_sum_assignment = None
+
+RENDER_BOUNDS = "absoluteRenderBounds"
+BOUNDING_BOX = "absoluteBoundingBox"
+# Above this many GT x generated pairs, IoU is computed only for grid-overlapping pairs
+DENSE_PAIRS = 1_000_000
+
+
+def collect_elements(node, bounds_key: str = RENDER_BOUNDS) -> list:
+    """{id, name, bbox} of every node under `node` with `bounds_key`, in paint (document) order."""
+    elements, stack = [], [node]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        bounds = node.get(bounds_key)
+        if bounds and node.get("id"):
+            elements.append({"id": node["id"], "name": node.get("name"), "bbox": bounds})
+        stack.extend(reversed(node.get("children") or []))
+    return elements
+
+
+class Boxes:
+    """
+    Bounding boxes as one (N, 4) float array of x0, y0, x1, y1, with the node
+    ids alongside. Built once from the {id, bbox} lists the exporter and
+    postprocess runner produce; everything below works on whole arrays.
+    """
+
+    def __init__(self, xyxy, ids=None):
+        self.xyxy = np.asarray(xyxy, dtype=np.float64).reshape(-1, 4)
+        self.ids = list(ids) if ids is not None else list(range(len(self.xyxy)))
+
+    @classmethod
+    def from_elements(cls, elements: list) -> "Boxes":
+        xywh = np.array([[e["bbox"]["x"], e["bbox"]["y"], e["bbox"]["width"], e["bbox"]["height"]] for e in elements],
+                        dtype=np.float64).reshape(-1, 4)
+        xywh[:, 2:] += xywh[:, :2]
+        return cls(xywh, [e["id"] for e in elements])
+
+    @classmethod
+    def from_file_json(cls, file_json: dict, bounds_key: str = RENDER_BOUNDS) -> "Boxes":
+        return cls.from_elements(collect_elements(file_json.get("document", file_json), bounds_key))
+
+    def __len__(self):
+        return len(self.xyxy)
+
+    @property
+    def area(self) -> np.ndarray:
+        return np.clip(self.xyxy[:, 2] - self.xyxy[:, 0], 0, None) * np.clip(self.xyxy[:, 3] - self.xyxy[:, 1], 0, None)
+
+    def bounds(self) -> tuple:
+        """(x0, y0, x1, y1) of the union."""
+        return (*self.xyxy[:, :2].min(axis=0), *self.xyxy[:, 2:].max(axis=0))
+
+    def translated(self, dx: float, dy: float) -> "Boxes":
+        return Boxes(self.xyxy + (dx, dy, dx, dy), self.ids)
+
+    def normalized(self) -> "Boxes":
+        """Moved so the union starts at (0, 0): frames placed anywhere on the canvas become comparable."""
+        if not len(self):
+            return self
+        x0, y0, _, _ = self.bounds()
+        return self.translated(-x0, -y0)
+
+    def subset(self, mask) -> "Boxes":
+        keep = np.flatnonzero(mask) if np.asarray(mask).dtype == bool else np.asarray(mask)
+        return Boxes(self.xyxy[keep], [self.ids[i] for i in keep])
+
+    def pixel_rects(self, scale: float, origin: tuple) -> np.ndarray:
+        """(N, 4) int x0, y0, x1, y1 in output pixels of a canvas whose top-left is `origin` (scaled units)."""
+        x = (self.xyxy[:, 0] * scale - origin[0]).astype(np.int64)
+        y = (self.xyxy[:, 1] * scale - origin[1]).astype(np.int64)
+        w = np.maximum(np.ceil((self.xyxy[:, 2] - self.xyxy[:, 0]) * scale), 1).astype(np.int64)
+        h = np.maximum(np.ceil((self.xyxy[:, 3] - self.xyxy[:, 1]) * scale), 1).astype(np.int64)
+        return np.stack([x, y, x + w, y + h], axis=1)
+
+
+def intersection(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Intersection areas of xyxy arrays that broadcast against each other."""
+    w = np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0])
+    h = np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1])
+    return np.clip(w, 0, None) * np.clip(h, 0, None)
+
+
+def _iou(inter, area_a, area_b):
+    union = area_a + area_b - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+def pairwise_iou(a: Boxes, b: Boxes) -> np.ndarray:
+    """(len(a), len(b)) IoU matrix."""
+    inter = intersection(a.xyxy[:, None, :], b.xyxy[None, :, :])
+    return _iou(inter, a.area[:, None], b.area[None, :])
+
+
+class GridIndex:
+    """
+    Uniform grid over a Boxes set: each box is listed under every cell it
+    touches (cell keys kept sorted), so overlap queries only look at boxes
+    sharing a cell instead of scanning all of them.
+    """
+
+    def __init__(self, boxes: Boxes, cell: float = None):
+        self.boxes = boxes
+        if cell is None:
+            sizes = boxes.xyxy[:, 2:] - boxes.xyxy[:, :2]
+            cell = float(np.median(sizes)) if len(boxes) else 1.0
+        self.cell = max(cell, 1.0)
+        self.keys, self.members = self._cells(boxes.xyxy)
+        order = np.argsort(self.keys, kind="stable")
+        self.keys, self.members = self.keys[order], self.members[order]
+
+    def _cells(self, xyxy: np.ndarray) -> tuple:
+        """(cell key, box index) for every cell each box touches."""
+        c0 = np.floor(xyxy[:, :2] / self.cell).astype(np.int64)
+        c1 = np.maximum(np.ceil(xyxy[:, 2:] / self.cell).astype(np.int64) - 1, c0)
+        span = c1 - c0 + 1
+        counts = span[:, 0] * span[:, 1]
+        members = np.repeat(np.arange(len(xyxy)), counts)
+        k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        gx = c0[members, 0] + k % span[members, 0]
+        gy = c0[members, 1] + k // span[members, 0]
+        return (gy << 32) + (gx & 0xFFFFFFFF), members
+
+    def _candidates(self, xyxy: np.ndarray) -> tuple:
+        """(query index, box index) of every pair sharing a cell, deduplicated."""
+        keys, queries = self._cells(xyxy)
+        lo = np.searchsorted(self.keys, keys, "left")
+        hi = np.searchsorted(self.keys, keys, "right")
+        counts = hi - lo
+        q = np.repeat(queries, counts)
+        pos = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(lo, counts)
+        pairs = np.unique(q * len(self.boxes) + self.members[pos])
+        return pairs // max(len(self.boxes), 1), pairs % max(len(self.boxes), 1)
+
+    def overlapping(self, other: Boxes) -> tuple:
+        """(i in other, j in self) of every pair with a positive-area overlap."""
+        if not len(other) or not len(self.boxes):
+            return np.empty(0, np.int64), np.empty(0, np.int64)
+        i, j = self._candidates(other.xyxy)
+        hit = intersection(other.xyxy[i], self.boxes.xyxy[j]) > 0
+        return i[hit], j[hit]
+
+    def query(self, rect) -> np.ndarray:
+        """Indices of boxes overlapping the xyxy `rect`."""
+        _, j = self.overlapping(Boxes([rect]))
+        return np.sort(j)
+
+    def containing(self, rect) -> np.ndarray:
+        """Indices of boxes that fully contain the xyxy `rect`."""
+        j = self.query(rect)
+        b = self.boxes.xyxy[j]
+        inside = (b[:, 0] <= rect[0]) & (b[:, 1] <= rect[1]) & (b[:, 2] >= rect[2]) & (b[:, 3] >= rect[3])
+        return j[inside]
+
+
+def sparse_iou(a: Boxes, b: Boxes, index: GridIndex = None) -> tuple:
+    """(i, j, iou) of the overlapping pairs only."""
+    index = index or GridIndex(b)
+    i, j = index.overlapping(a)
+    inter = intersection(a.xyxy[i], b.xyxy[j])
+    return i, j, _iou(inter, a.area[i], b.area[j])
+
+
+def occluders(boxes: Boxes, i: int, index: GridIndex = None) -> np.ndarray:
+    """Boxes painted after box `i` whose bbox alone covers it (the renderer still checks their pixels)."""
+    index = index or GridIndex(boxes)
+    j = index.containing(boxes.xyxy[i])
+    return j[j > i]
+
+
+def hungarian(cost: np.ndarray) -> tuple:
+    """Minimum-cost assignment (rows, cols) of a rectangular cost matrix; scipy when installed."""
+    cost = np.asarray(cost, dtype=np.float64)
+    if cost.size == 0:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    if linear_sum_assignment is not None:
+        return linear_sum_assignment(cost)
+    if cost.shape[0] > cost.shape[1]:
+        cols, rows = hungarian(cost.T)
+        order = np.argsort(rows)
+        return rows[order], cols[order]
+
+    # O(n^2 m) shortest augmenting path (potentials u, v), inner loop over columns vectorized
+    n, m = cost.shape
+    u, v = np.zeros(n + 1), np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)      # p[j]: row (1-based) assigned to column j
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        p[0], j0 = i, 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            cur = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (cur < minv[1:])
+            minv[1:][better] = cur[better]
+            way[1:][better] = j0
+            masked = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(masked)) + 1
+            delta = masked[j1 - 1]
+            done = np.flatnonzero(used)
+            u[p[done]] += delta
+            v[done] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    cols = np.flatnonzero(p[1:])
+    rows = p[1:][cols] - 1
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def match(gt: Boxes, gen: Boxes, threshold: float = 0.5) -> list:
+    """
+    One-to-one (gt index, gen index, iou) pairs maximizing total IoU, keeping
+    pairs with IoU >= threshold. Only boxes that have a candidate above the
+    threshold enter the assignment.
+    """
+    if not len(gt) or not len(gen):
+        return []
+    if len(gt) * len(gen) <= DENSE_PAIRS:
+        iou = pairwise_iou(gt, gen)
+        rows, cols = np.nonzero(iou >= threshold)
+        values = iou[rows, cols]
+    else:
+        i, j, values = sparse_iou(gt, gen)
+        keep = values >= threshold
+        rows, cols, values = i[keep], j[keep], values[keep]
+    if not len(rows):
+        return []
+
+    r_ids, r = np.unique(rows, return_inverse=True)
+    c_ids, c = np.unique(cols, return_inverse=True)
+    scores = np.zeros((len(r_ids), len(c_ids)))
+    scores[r, c] = values
+    ri, ci = hungarian(-scores)
+    return [(int(r_ids[a]), int(c_ids[b]), float(scores[a, b])) for a, b in zip(ri, ci) if scores[a, b] >= threshold]
+
+
+def structural_scores(gt: Boxes, gen: Boxes, threshold: float = 0.5, normalize: bool = True) -> dict:
+    """Node-level precision / recall / F1 of generated boxes against the ground truth."""
+    if normalize:
+        gt, gen = gt.normalized(), gen.normalized()
+    pairs = match(gt, gen, threshold)
+    matched = len(pairs)
+    precision = matched / len(gen) if len(gen) else 0.0
+    recall = matched / len(gt) if len(gt) else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "gt_nodes": len(gt),
+        "gen_nodes": len(gen),
+        "matched": matched,
+        "precision": round(precision, 6),
+        "recall": round(recall, 6),
+        "f1": round(f1, 6),
+        "mean_iou": round(sum(p[2] for p in pairs) / matched, 6) if matched else None,
+    }
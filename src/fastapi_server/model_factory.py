@@ -53,5 +53,10 @@ def get_model(model_name: str = None):
             model_kwargs={"temperature": 0.7, "max_tokens": 1024}
         )
 
+    elif model_name.startswith("scripted"):
+        # Offline stand-in: "scripted" or "scripted:<steps.json>"
+        from .scripted_model import ScriptedChatModel
+        return ScriptedChatModel.from_name(model_name)
+
     else:
         raise ValueError(f"Unsupported model: {model_name}")
@@ -0,0 +1,114 @@
+# src/fastapi_server/pipeline.py
+import os
+import time
+import base64
+import asyncio
+from functools import partial
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.encoders import jsonable_encoder
+
+from .utils import jsonify_agent_response
+from .serialization import ResponseOptions, render
+
+# Bounded pool for CPU-heavy pre/post-processing so the event loop (and the
+# in-flight MCP tool calls on it) keeps running while a request is encoded or
+# serialized. Threads rather than processes: LangChain messages are expensive
+# to pickle across a process boundary.
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))
+executor = ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="pipeline")
+
+
+class StageTimer:
+    """
+    Wall-clock seconds spent per named request stage. Overlapping spans of one
+    stage (e.g. tool calls the agent runs concurrently) count their union, so
+    a stage never exceeds the time the request actually spent in it.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self._open = {}    # stage -> spans currently running
+        self._since = {}   # stage -> when the current busy period started
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self._open.get(name):
+            self._since[name] = time.perf_counter()
+        self._open[name] = self._open.get(name, 0) + 1
+        try:
+            yield
+        finally:
+            self._open[name] -= 1
+            if not self._open[name]:
+                self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - self._since.pop(name)
+
+    def as_dict(self) -> dict:
+        return {name: round(seconds, 4) for name, seconds in self.stages.items()}
+
+
+async def run_blocking(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+
+
+def build_agent_input(instruction: str, image_bytes: bytes = None) -> list:
+    agent_input = [{"type": "text", "text": instruction}]
+    if image_bytes:
+        base64_image = base64.b64encode(image_bytes).decode("utf-8")
+        agent_input.append({
+            "type": "image_url",
+            "image_url": {
+                "url": f"data:image/png;base64,{base64_image}",
+                "detail": "auto"
+            }
+        })
+    return agent_input
+
+
+def serialize_agent_response(response, include_raw: bool = True) -> dict:
+    messages = response.get("messages", [])
+    step_count = response.get("step_count", len(messages) - 1)
+    result = {
+        "json_response": jsonify_agent_response(response),
+        "step_count": step_count,
+    }
+    if include_raw:
+        result = {"response": str(response), **result}
+    return result
+
+
+def serialize_multi_agent_state(state: dict, include_raw: bool = True) -> dict:
+    """The multi-agent loop's final state, JSON-encoded (messages included) so it can be compacted."""
+    result = {
+        "json_response": jsonable_encoder(state),
+        "step_count": state.get("step_count", -1),
+    }
+    if include_raw:
+        result = {"response": str(state), **result}
+    return result
+
+
+async def prepare_agent_input(instruction: str, image=None, timer: StageTimer = None) -> list:
+    timer = timer or StageTimer()
+    image_bytes = None
+    if image:
+        with timer.stage("read"):
+            image_bytes = await image.read()
+    with timer.stage("encode"):
+        return await run_blocking(build_agent_input, instruction, image_bytes)
+
+
+async def finalize_agent_response(response, timer: StageTimer = None, options: ResponseOptions = None, serialize=serialize_agent_response):
+    timer = timer or StageTimer()
+    if options is None or options.is_default:
+        with timer.stage("serialize"):
+            result = await run_blocking(serialize, response)
+        result["timings"] = timer.as_dict()
+        return result
+
+    with timer.stage("serialize"):
+        result = await run_blocking(serialize, response, options.raw)
+    result["timings"] = timer.as_dict()
+    return await run_blocking(render, result, options)
@@ -0,0 +1,115 @@
+# src/fastapi_server/scripted_model.py
+import os
+import re
+import json
+import time
+import asyncio
+from pathlib import Path
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from .batch import ID_PATTERN
+
+# A small mobile screen: root frame, header bar, title, card and a button.
+# "$root" is the first node created in the conversation, "$last" the latest.
+DEFAULT_SCRIPT = [
+    {"tool": "create_frame", "args": {"x": 0, "y": 0, "width": 320, "height": 720, "name": "Frame"}},
+    {"tool": "create_rectangle", "args": {"x": 0, "y": 0, "width": 320, "height": 56, "name": "Header", "parentId": "$root"}},
+    {"tool": "create_text", "args": {"x": 16, "y": 16, "text": "Title", "fontSize": 20, "fontWeight": 700, "name": "Title", "parentId": "$root"}},
+    {"tool": "create_frame", "args": {"x": 16, "y": 80, "width": 288, "height": 160, "name": "Card", "parentId": "$root"}},
+    {"tool": "create_text", "args": {"x": 16, "y": 16, "text": "Card body", "name": "Body", "parentId": "$last"}},
+    {"tool": "create_rectangle", "args": {"x": 16, "y": 640, "width": 288, "height": 48, "name": "Button", "parentId": "$root"}},
+    {"tool": "set_corner_radius", "args": {"nodeId": "$last", "radius": 8}},
+    {"tool": "create_text", "args": {"x": 140, "y": 654, "text": "OK", "name": "Button Label", "parentId": "$root"}},
+]
+
+
+def load_script(name: str) -> list:
+    """`scripted` uses the built-in script; `scripted:<path.json>` loads a list of {"tool", "args"} steps."""
+    if ":" in name:
+        return json.loads(Path(name.split(":", 1)[1]).read_text(encoding="utf-8"))
+    return DEFAULT_SCRIPT
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for a chat model, for offline runs and benchmarks.
+
+    With tools bound (single agent / worker) it emits one tool call per turn
+    from `script`, then a final answer. Without tools (multi-agent supervisor)
+    it answers {"tool_name": ..., "args": ...} per round and then TERMINATE.
+    `latency` seconds are slept per call to stand in for model time.
+    """
+
+    script: List[dict] = DEFAULT_SCRIPT
+    latency: float = 0.0
+    tool_names: Optional[List[str]] = None
+
+    @classmethod
+    def from_name(cls, model_name: str) -> "ScriptedChatModel":
+        return cls(script=load_script(model_name), latency=float(os.getenv("SCRIPTED_MODEL_LATENCY", "0")))
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools: list, **kwargs: Any):
+        names = [t.name if hasattr(t, "name") else t["function"]["name"] for t in tools]
+        return self.model_copy(update={"tool_names": names})
+
+    def _conversation(self, messages: List[BaseMessage]) -> List[BaseMessage]:
+        last_human = max((i for i, m in enumerate(messages) if isinstance(m, HumanMessage)), default=-1)
+        return messages[last_human + 1:]
+
+    def _resolve(self, value, created: list):
+        if isinstance(value, str) and value in ("$root", "$last"):
+            if not created:
+                return None
+            return created[0] if value == "$root" else created[-1]
+        if isinstance(value, dict):
+            return {k: v for k, v in ((k, self._resolve(v, created)) for k, v in value.items()) if v is not None}
+        return value
+
+    def _next_message(self, messages: List[BaseMessage]) -> AIMessage:
+        conversation = self._conversation(messages)
+        created = [
+            m.group(1)
+            for msg in conversation if re.search(r"(Created|Cloned) ", str(msg.content))
+            for m in ID_PATTERN.finditer(str(msg.content))
+        ]
+        steps = [s for s in self.script if self.tool_names is None or s["tool"] in self.tool_names]
+
+        if self.tool_names is not None:
+            turn = sum(isinstance(m, ToolMessage) for m in conversation)
+            if turn >= len(steps):
+                return AIMessage(content=f"Done: executed {turn} scripted tool calls.")
+            step = steps[turn]
+            return AIMessage(content="", tool_calls=[{
+                "name": step["tool"],
+                "args": self._resolve(step.get("args", {}), created),
+                "id": f"call_{turn}",
+                "type": "tool_call",
+            }])
+
+        # Supervisor: count the instructions it already gave
+        turn = 0
+        for m in conversation:
+            if isinstance(m, AIMessage) and str(m.content).startswith('{"tool_name"'):
+                turn += 1
+        if turn >= len(steps):
+            return AIMessage(content="TERMINATE")
+        step = steps[turn]
+        return AIMessage(content=json.dumps({"tool_name": step["tool"], "args": self._resolve(step.get("args", {}), created)}))
+
+    def _generate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages))])
@@ -0,0 +1,92 @@
+# src/fastapi_server/serialization.py
+import json
+import hashlib
+from gzip import compress as gzip_compress
+from typing import Optional
+
+from fastapi import Query
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the stdlib encoder
+    orjson = None
+
+DATA_URL_PREFIX = "data:image/"
+
+
+class ResponseOptions:
+    """
+    Query parameters controlling how an agent response is serialized.
+    Used as `options: ResponseOptions = Depends()` on the generate/modify routes.
+    """
+
+    def __init__(
+        self,
+        compact: bool = Query(False, description="Drop the str(response) blob, replace images by hashes and use the fast encoder"),
+        fields: Optional[str] = Query(None, description="Comma-separated fields to return, dotted paths allowed (e.g. step_count,json_response.messages)"),
+        raw: Optional[bool] = Query(None, description="Include the str(response) blob (default: on unless compact)"),
+        gzip: bool = Query(False, description="Gzip the response body"),
+    ):
+        self.compact = compact
+        self.fields = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+        self.raw = (not compact) if raw is None else raw
+        self.gzip = gzip
+
+    @property
+    def is_default(self) -> bool:
+        return not self.compact and self.fields is None and self.raw and not self.gzip
+
+
+def strip_images(obj):
+    """Replace base64 data-URL images anywhere in `obj` by their sha256 and size."""
+    if isinstance(obj, str):
+        if obj.startswith(DATA_URL_PREFIX):
+            return {"image_sha256": hashlib.sha256(obj.encode()).hexdigest(), "size": len(obj)}
+        return obj
+    if isinstance(obj, dict):
+        return {k: strip_images(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [strip_images(v) for v in obj]
+    return obj
+
+
+def select_fields(result: dict, fields: list) -> dict:
+    selected = {}
+    for path in fields:
+        value, found = result, True
+        for key in path.split("."):
+            if isinstance(value, dict) and key in value:
+                value = value[key]
+            else:
+                found = False
+                break
+        if not found:
+            continue
+        target = selected
+        keys = path.split(".")
+        for key in keys[:-1]:
+            target = target.setdefault(key, {})
+        target[keys[-1]] = value
+    return selected
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def render(result: dict, options: ResponseOptions) -> Response:
+    """Apply image stripping / field selection / encoding / gzip to a serialized result."""
+    if options.compact:
+        result = strip_images(result)
+    if options.fields:
+        result = select_fields(result, options.fields)
+
+    body = dumps(result)
+    headers = {}
+    if options.gzip:
+        body = gzip_compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=body, media_type="application/json", headers=headers)
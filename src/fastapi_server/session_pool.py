@@ -0,0 +1,218 @@
+# src/fastapi_server/session_pool.py
+import os
+import sys
+import asyncio
+from contextlib import asynccontextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from mcp import ClientSession, StdioServerParameters
+from mcp.client.stdio import stdio_client
+from langchain_mcp_adapters.tools import load_mcp_tools
+from langchain_core.tools import BaseTool, StructuredTool
+
+from .canvas_mirror import CanvasMirror, mirror_tools
+
+
+FAKE_MCP_SERVER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_figma_mcp.py")
+
+
+def mcp_server_params(config: dict, default: StdioServerParameters) -> StdioServerParameters:
+    """The node talk_to_figma server, or the in-memory stand-in with `mcp_server: fake` (or MCP_SERVER=fake)."""
+    if os.getenv("MCP_SERVER", (config or {}).get("mcp_server", "node")) == "fake":
+        return StdioServerParameters(command=sys.executable, args=[FAKE_MCP_SERVER])
+    return default
+
+
+# StageTimer of the request being served; its agent's MCP calls add to the "tools" stage
+request_timer: ContextVar = ContextVar("request_timer", default=None)
+
+
+def timed_tools(tools: list) -> list:
+    """Wrap tools so each MCP round trip is counted in the current request's timer."""
+    wrapped = []
+    for tool in tools:
+        if not isinstance(tool, BaseTool):
+            wrapped.append(tool)
+            continue
+        wrapped.append(StructuredTool(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            coroutine=_timed_call(tool),
+        ))
+    return wrapped
+
+
+def _timed_call(tool: BaseTool):
+    async def call(**kwargs):
+        timer = request_timer.get()
+        with timer.stage("tools") if timer else nullcontext():
+            return await tool.ainvoke(kwargs)
+    return call
+
+
+def mirror_max_age(config: dict):
+    """Seconds a mirrored read stays fresh, or None when the canvas mirror is disabled."""
+    mirror_cfg = (config or {}).get("mirror") or {}
+    if not mirror_cfg.get("enabled", False):
+        return None
+    return mirror_cfg.get("max_age", 30)
+
+
+class PoolEntry:
+    """
+    One pooled MCP connection: its own `talk_to_figma_mcp/dist/server.js`
+    subprocess, the Figma channel it joined and the tools/agent built on it.
+    """
+
+    def __init__(self, index: int, server_params: StdioServerParameters, mirror: CanvasMirror = None):
+        self.index = index
+        self.server_params = server_params
+        self.mirror = mirror
+        self.channel: Optional[str] = None
+        self.stdio_context = None
+        self.session: Optional[ClientSession] = None
+        self.tools = []
+        self.tool_dict = {}
+        self.agent = None
+        self.busy = False
+
+    async def open(self):
+        self.stdio_context = stdio_client(self.server_params)
+        read, write = await self.stdio_context.__aenter__()
+        self.session = await ClientSession(read, write).__aenter__()
+        await self.session.initialize()
+
+        self.tools = timed_tools(await load_mcp_tools(self.session))
+        if self.mirror is not None:
+            self.tools = mirror_tools(self.tools, self.mirror)
+        self.tool_dict = {tool.name: tool for tool in self.tools if isinstance(tool, BaseTool)}
+
+    async def close(self):
+        if self.session:
+            await self.session.__aexit__(None, None, None)
+        if self.stdio_context:
+            await self.stdio_context.__aexit__(None, None, None)
+        self.session, self.stdio_context = None, None
+
+    async def call_tool(self, tool_name: str, args: dict = None, fresh: bool = False):
+        """`fresh=True` drops the canvas mirror first, so a read is answered by Figma itself."""
+        try:
+            if fresh and self.mirror is not None:
+                self.mirror.reset()
+            if tool_name not in self.tool_dict:
+                return {"status": "error", "message": f"Tool '{tool_name}' not found"}
+            result = await self.tool_dict[tool_name].ainvoke(args or {})
+            return {"status": "success", "message": result}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def join(self, channel: str):
+        result = await self.call_tool("select_channel", {"channel": channel})
+        if result["status"] == "success" and "Successfully joined channel:" in str(result["message"]):
+            self.channel = channel
+        return result
+
+
+class ChannelNotJoinedError(LookupError):
+    """A request named a channel that no pooled session has joined."""
+
+
+class MCPSessionPool:
+    """
+    Fixed-size pool of MCP sessions so one FastAPI process can drive several
+    Figma channels at once. Requests check out an entry (optionally the one
+    bound to a given channel) and hold it exclusively until they finish.
+    """
+
+    def __init__(
+        self,
+        server_params: StdioServerParameters,
+        size: int = 1,
+        channels: list = None,
+        agent_factory: Callable = None,
+        mirror_max_age: float = None,
+    ):
+        self.channels = list(channels or [])
+        self.size = max(size, len(self.channels), 1)
+        self.agent_factory = agent_factory
+        self.entries = [
+            PoolEntry(i, server_params, CanvasMirror(mirror_max_age) if mirror_max_age else None)
+            for i in range(self.size)
+        ]
+        self._cond = asyncio.Condition()
+
+    async def startup(self):
+        # Entries are opened one after another on purpose: the stdio client is
+        # an anyio context and must be exited from the task that entered it.
+        for entry in self.entries:
+            await entry.open()
+            if self.agent_factory:
+                entry.agent = self.agent_factory(entry.tools)
+
+        for entry, channel in zip(self.entries, self.channels):
+            result = await entry.join(channel)
+            if entry.channel != channel:
+                print(f"[POOL] Session {entry.index} could not join '{channel}': {result['message']}")
+
+    async def shutdown(self):
+        for entry in reversed(self.entries):
+            try:
+                await entry.close()
+            except Exception as e:
+                print(f"[POOL] Failed to close session {entry.index}: {e}")
+
+    def _pick(self, channel: Optional[str], rebind: bool = False) -> Optional[PoolEntry]:
+        free = [e for e in self.entries if not e.busy]
+        if channel is None:
+            # Prefer sessions that are not pinned to a channel for anonymous work
+            free.sort(key=lambda e: e.channel is not None)
+            return free[0] if free else None
+
+        bound = [e for e in self.entries if e.channel == channel]
+        if bound:
+            return next((e for e in bound if not e.busy), None)
+        if not rebind:
+            joined = ", ".join(sorted(e.channel for e in self.entries if e.channel)) or "none"
+            raise ChannelNotJoinedError(
+                f"Channel '{channel}' is not joined by any pooled session (joined: {joined}); "
+                f"join it with /tool/select_channel first"
+            )
+
+        free.sort(key=lambda e: e.channel is not None)
+        return free[0] if free else None
+
+    @asynccontextmanager
+    async def checkout(self, channel: Optional[str] = None, rebind: bool = False):
+        async with self._cond:
+            entry = self._pick(channel, rebind)
+            while entry is None:
+                await self._cond.wait()
+                entry = self._pick(channel, rebind)
+            entry.busy = True
+        try:
+            yield entry
+        finally:
+            async with self._cond:
+                entry.busy = False
+                self._cond.notify_all()
+
+    async def join(self, channel: str):
+        """Bind `channel` to a pooled session, reusing one already joined to it."""
+        async with self.checkout(channel, rebind=True) as entry:
+            if entry.channel == channel:
+                return {"status": "success", "message": f"Successfully joined channel: {channel}"}
+            return await entry.join(channel)
+
+    def status(self):
+        return [
+            {
+                "index": e.index,
+                "channel": e.channel,
+                "busy": e.busy,
+                "tools": len(e.tool_dict),
+                "mirror": e.mirror.status() if e.mirror else None,
+            }
+            for e in self.entries
+        ]
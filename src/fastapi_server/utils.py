@@ -57,4 +57,21 @@ def message_type_to_role(message):
     elif isinstance(message, ToolMessage):
         return "tool"
     else:
-        return "system"
\ No newline at end of file
+        return "system"
+
+def jsonify_stream_update(node_name: str, update: dict) -> dict:
+    """
+    Convert one LangGraph `astream(stream_mode="updates")` chunk into the same
+    message layout used by jsonify_agent_response, for streaming endpoints.
+    """
+    messages = []
+    for msg in (update or {}).get("messages", []):
+        message_data = {
+            "role": message_type_to_role(msg),
+            "content": "",
+            "id": getattr(msg, "id", "")
+        }
+        if isinstance(msg, (HumanMessage, AIMessage, ToolMessage)):
+            message_data["content"] = message_to_dict(msg)
+        messages.append(message_data)
+    return {"node": node_name, "messages": messages}
@@ -0,0 +1,70 @@
+# Local stand-in for the Figma REST API and its image CDN, for client tests.
+import json
+
+from aiohttp import web
+
+
+class FigmaStub:
+    """
+    Serves /v1/files/{key}, /v1/images/{key} and /cdn/{node_id}.png.
+    `throttle` makes the next N requests answer 429 with Retry-After,
+    `max_ids` rejects larger images calls with 414 and an images call that
+    includes one of `flaky_ids` fails once with 400.
+    """
+
+    def __init__(self, document: dict = None, throttle: int = 0, retry_after: str = "0", max_ids: int = None, flaky_ids=()):
+        self.document = document or {"document": {"children": []}}
+        self.throttle = throttle
+        self.retry_after = retry_after
+        self.max_ids = max_ids
+        self.flaky_ids = set(flaky_ids)
+        self.calls = []
+        self.runner = None
+        self.base_url = None
+
+    async def _guard(self, request):
+        self.calls.append(request.path)
+        if self.throttle > 0:
+            self.throttle -= 1
+            return web.Response(status=429, headers={"Retry-After": self.retry_after})
+        return None
+
+    async def files(self, request):
+        return await self._guard(request) or web.json_response(self.document)
+
+    async def images(self, request):
+        blocked = await self._guard(request)
+        if blocked:
+            return blocked
+        ids = request.query.get("ids", "").split(",")
+        if self.max_ids is not None and len(ids) > self.max_ids:
+            return web.Response(status=414, text="URI too long")
+        flaky = self.flaky_ids & set(ids)
+        if flaky:
+            self.flaky_ids -= flaky
+            return web.Response(status=400, text="render failed")
+        return web.json_response({"err": None, "images": {i: f"{self.base_url}/cdn/{i}.png" for i in ids if i}})
+
+    async def cdn(self, request):
+        blocked = await self._guard(request)
+        if blocked:
+            return blocked
+        if "X-Figma-Token" in request.headers:
+            return web.Response(status=400, text="token sent to CDN")
+        return web.Response(body=json.dumps({"node": request.match_info["node_id"]}).encode())
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/v1/files/{key}", self.files)
+        app.router.add_get("/v1/images/{key}", self.images)
+        app.router.add_get("/cdn/{node_id}.png", self.cdn)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def stop(self):
+        await self.runner.cleanup()
@@ -0,0 +1,105 @@
+import asyncio
+import time
+
+import pytest
+
+agent_multi = pytest.importorskip("fastapi_server.agent_multi")
+WorkerRuntimeCache = agent_multi.WorkerRuntimeCache
+
+class FakeEntry:
+    def __init__(self):
+        self.channel = None
+
+    async def join(self, channel):
+        self.channel = channel
+        return {"status": "success", "message": f"Successfully joined channel: {channel}"}
+
+class FakeRuntime:
+    started = []
+    closed = []
+
+    def __init__(self, worker_name):
+        self.worker_name = worker_name
+        self.entry = FakeEntry()
+        self.lock = asyncio.Lock()
+        self.users = 0
+        self.last_used = time.monotonic()
+
+    async def start(self):
+        FakeRuntime.started.append(self.worker_name)
+        await asyncio.sleep(0.05)
+        if self.worker_name == "broken":
+            raise RuntimeError("no session")
+
+    async def close(self):
+        FakeRuntime.closed.append(self.worker_name)
+
+def test_start_runs_outside_the_cache_lock(monkeypatch):
+    monkeypatch.setattr(agent_multi, "WorkerRuntime", FakeRuntime)
+    FakeRuntime.started = []
+
+    async def main():
+        cache = WorkerRuntimeCache()
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        a1, a2, b = await asyncio.gather(cache.get("a"), cache.get("a"), cache.get("b"))
+        return a1, a2, b, loop.time() - start
+
+    a1, a2, b, elapsed = asyncio.run(main())
+    assert a1 is a2 and a1 is not b
+    assert a1.users == 2 and b.users == 1
+    assert sorted(FakeRuntime.started) == ["a", "b"]  # one start per model
+    assert elapsed < 0.09  # "a" and "b" started side by side
+
+def test_failed_start_is_not_cached(monkeypatch):
+    monkeypatch.setattr(agent_multi, "WorkerRuntime", FakeRuntime)
+
+    async def main():
+        cache = WorkerRuntimeCache()
+        results = await asyncio.gather(cache.get("broken"), cache.get("broken"), return_exceptions=True)
+        return results, cache
+
+    results, cache = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert cache.runtimes == {} and cache._starting == {}
+
+def test_checkout_joins_the_requested_channel(monkeypatch):
+    monkeypatch.setattr(agent_multi, "WorkerRuntime", FakeRuntime)
+
+    async def main():
+        cache = WorkerRuntimeCache()
+        async with cache.checkout("a", "channel_2") as runtime:
+            return runtime.entry.channel
+
+    assert asyncio.run(main()) == "channel_2"
+
+def test_handed_out_runtime_is_not_evicted(monkeypatch):
+    monkeypatch.setattr(agent_multi, "WorkerRuntime", FakeRuntime)
+    FakeRuntime.closed = []
+
+    async def main():
+        cache = WorkerRuntimeCache(idle_ttl=0)
+        runtime = await cache.get("a")  # returned, runtime lock not taken yet
+        await cache.evict_idle()
+        kept = list(cache.runtimes)
+        await cache.release(runtime)
+        await cache.evict_idle()
+        return kept, list(cache.runtimes)
+
+    kept, after = asyncio.run(main())
+    assert kept == ["a"] and after == []
+    assert FakeRuntime.closed == ["a"]
+
+def test_close_waits_for_runtimes_still_starting(monkeypatch):
+    monkeypatch.setattr(agent_multi, "WorkerRuntime", FakeRuntime)
+    FakeRuntime.closed = []
+
+    async def main():
+        cache = WorkerRuntimeCache()
+        task = asyncio.create_task(cache.get("a"))
+        await asyncio.sleep(0.01)  # start in progress
+        await cache.close()
+        await task
+
+    asyncio.run(main())
+    assert FakeRuntime.closed == ["a"]
@@ -0,0 +1,41 @@
+from io import BytesIO
+
+from PIL import Image
+
+from experiments.asset_store import AssetStore, read_index
+
+def png(color):
+    buf = BytesIO()
+    Image.new("RGBA", (4, 4), color).save(buf, format="PNG")
+    return buf.getvalue()
+
+def test_identical_assets_stored_once(tmp_path):
+    store = AssetStore(tmp_path / "store")
+    white = png((255, 255, 255, 255))
+    store.export_assets(tmp_path / "a" / "assets", {"1:2": white, "1:3": png((0, 0, 0, 255))})
+    store.export_assets(tmp_path / "b" / "assets", {"5:1": white})
+
+    assert store.stats["stored"] == 2
+    assert store.stats["deduped"] == 1
+    assert (tmp_path / "b" / "assets" / "5:1.png").read_bytes() == white
+    assert read_index(tmp_path / "a" / "assets")["1:2"] == read_index(tmp_path / "b" / "assets")["5:1"]
+
+def test_decoded_image_shared_across_results(tmp_path):
+    store = AssetStore(tmp_path / "store")
+    white = png((255, 255, 255, 255))
+    store.export_assets(tmp_path / "a" / "assets", {"1:2": white})
+    store.export_assets(tmp_path / "b" / "assets", {"5:1": white})
+
+    first = store.load_image(tmp_path / "a" / "assets", "1:2")
+    second = store.load_image(tmp_path / "b" / "assets", "5:1")
+    assert first is second
+    assert store.stats["decoded"] == 1
+    assert store.load_image(tmp_path / "a" / "assets", "9:9") is None
+
+def test_reads_results_exported_without_store(tmp_path):
+    asset_dir = tmp_path / "old" / "assets"
+    asset_dir.mkdir(parents=True)
+    (asset_dir / "1:2.png").write_bytes(png((255, 0, 0, 255)))
+
+    img = AssetStore().load_image(asset_dir, "1:2")
+    assert img.getpixel((0, 0)) == (255, 0, 0, 255)
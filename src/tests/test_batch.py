@@ -0,0 +1,100 @@
+import json
+import asyncio
+
+import pytest
+
+pytest.importorskip("mcp")
+
+from fastapi_server.batch import BatchRequest, execute_batch, result_node_id
+from fastapi_server.session_pool import MCPSessionPool, mcp_server_params
+
+def run_on_fake_server(req: BatchRequest, wrap=None):
+    async def main():
+        pool = MCPSessionPool(mcp_server_params({"mcp_server": "fake"}, None))
+        await pool.startup()
+        try:
+            async with pool.checkout() as entry:
+                call_tool = wrap(entry.call_tool) if wrap else entry.call_tool
+                result = await execute_batch(req, call_tool)
+                document = json.loads((await entry.call_tool("get_document_info"))["message"])
+                return result, document
+        finally:
+            await pool.shutdown()
+
+    return asyncio.run(main())
+
+def test_refs_resolve_to_created_node_ids():
+    req = BatchRequest(calls=[
+        {"tool": "create_frame", "args": {"x": 0, "y": 0, "width": 320, "height": 720, "name": "Root"}},
+        {"tool": "create_rectangle", "args": {"x": 0, "y": 0, "width": 10, "height": 10, "parentId": {"$ref": 0}}},
+        {"tool": "create_text", "args": {"x": 0, "y": 20, "text": "Hi", "parentId": {"$ref": 0}}},
+        {"tool": "set_corner_radius", "args": {"nodeId": {"$ref": 1}, "radius": 8}},
+        {"tool": "get_node_info", "args": {"nodeId": {"$ref": 0}}, "depends_on": [3]},
+    ])
+    result, document = run_on_fake_server(req)
+
+    assert result["status"] == "success", result["results"]
+    root_id = result_node_id(result["results"][0]["message"])
+    assert [c["id"] for c in document["children"]] == [root_id]
+    root = json.loads(result["results"][4]["message"])
+    children = {c["type"]: c for c in root["children"]}
+    assert sorted(children) == ["RECTANGLE", "TEXT"]  # 1 and 2 ran side by side
+    assert children["RECTANGLE"]["cornerRadius"] == 8
+
+def test_max_in_flight_bounds_concurrent_calls():
+    in_flight, peak = 0, 0
+
+    def wrap(call_tool):
+        async def counted(tool, args):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            try:
+                await asyncio.sleep(0.01)
+                return await call_tool(tool, args)
+            finally:
+                in_flight -= 1
+        return counted
+
+    calls = [{"tool": "create_frame", "args": {"x": 40 * i, "y": 0, "width": 30, "height": 30}} for i in range(6)]
+    result, document = run_on_fake_server(BatchRequest(calls=calls, max_in_flight=2), wrap)
+
+    assert result["status"] == "success"
+    assert peak == 2
+    assert len(document["children"]) == 6
+
+def test_stop_on_error_skips_the_rest():
+    req = BatchRequest(calls=[
+        {"tool": "no_such_tool", "args": {}},
+        {"tool": "create_frame", "args": {"x": 0, "y": 0, "width": 30, "height": 30}},
+        {"tool": "create_text", "args": {"x": 0, "y": 0, "text": "x", "parentId": {"$ref": 0}}},
+    ], max_in_flight=1, stop_on_error=True)
+    result, document = run_on_fake_server(req)
+
+    assert result["status"] == "partial"
+    assert [r["status"] for r in result["results"]] == ["error", "skipped", "skipped"]
+    assert "dependency [0] failed" in result["results"][2]["message"]
+    assert document["children"] == []
+
+def test_error_reply_fails_the_call_and_its_dependents():
+    req = BatchRequest(calls=[
+        {"tool": "set_corner_radius", "args": {"nodeId": "9:99", "radius": 8}},
+        {"tool": "create_frame", "args": {"x": 0, "y": 0, "width": 30, "height": 30}, "depends_on": [0]},
+        {"tool": "create_frame", "args": {"x": 40, "y": 0, "width": 30, "height": 30}},
+    ], max_in_flight=1)
+    result, document = run_on_fake_server(req)
+
+    assert result["status"] == "partial"
+    assert [r["status"] for r in result["results"]] == ["error", "skipped", "success"]
+    assert result["results"][0]["message"].startswith("Error setting corner radius")
+    assert len(document["children"]) == 1
+
+def test_error_reply_stops_the_batch():
+    req = BatchRequest(calls=[
+        {"tool": "get_node_info", "args": {"nodeId": "9:99"}},
+        {"tool": "create_frame", "args": {"x": 0, "y": 0, "width": 30, "height": 30}},
+    ], max_in_flight=1, stop_on_error=True)
+    result, document = run_on_fake_server(req)
+
+    assert [r["status"] for r in result["results"]] == ["error", "skipped"]
+    assert document["children"] == []
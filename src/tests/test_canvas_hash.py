@@ -0,0 +1,71 @@
+from fastapi_server.canvas_hash import CanvasHasher
+
+def make_canvas(title="Hello"):
+    return {
+        "id": "0:1",
+        "name": "Page 1",
+        "children": [
+            {"id": "1:2", "name": "Frame", "children": [
+                {"id": "1:3", "name": "Title", "characters": title},
+                {"id": "1:4", "name": "Button"},
+            ]},
+        ],
+    }
+
+def test_first_round_reports_everything_added():
+    hasher = CanvasHasher()
+    delta = hasher.update(make_canvas())
+    assert set(delta.added) == {"0:1", "1:2", "1:3", "1:4"}
+    assert delta.changed
+
+def test_unchanged_canvas_has_same_root_digest():
+    hasher = CanvasHasher()
+    first = hasher.update(make_canvas())
+    second = hasher.update(make_canvas())
+    assert first.root_digest == second.root_digest
+    assert not second.changed
+
+def test_modified_node():
+    hasher = CanvasHasher()
+    hasher.update(make_canvas())
+    delta = hasher.update(make_canvas("Bye"))
+    assert delta.modified == ["1:3"]
+
+def test_added_and_removed_children():
+    hasher = CanvasHasher()
+    hasher.update(make_canvas())
+    canvas = make_canvas()
+    frame = canvas["children"][0]
+    frame["children"] = [frame["children"][0], {"id": "1:5", "name": "Icon"}]
+    delta = hasher.update(canvas)
+    assert delta.added == ["1:5"]
+    assert delta.removed == ["1:4"]
+    assert delta.modified == []
+
+def test_side_effects_on_other_nodes_are_detected():
+    # e.g. resizing the title reflows its auto-layout sibling
+    hasher = CanvasHasher()
+    hasher.update(make_canvas())
+    canvas = make_canvas()
+    canvas["children"][0]["children"][1]["y"] = 40
+    delta = hasher.update(canvas)
+    assert delta.modified == ["1:4"]
+
+def test_flat_document_info():
+    # get_document_info lists only the top-level nodes of the page
+    def doc(*names):
+        return {"id": "0:1", "name": "Page 1", "children": [{"id": f"1:{i}", "name": n, "type": "FRAME"} for i, n in enumerate(names)]}
+
+    hasher = CanvasHasher()
+    hasher.update(doc("Frame"))
+    delta = hasher.update(doc("Frame", "Card"))
+    assert delta.added == ["1:1"] and delta.modified == []
+    assert not hasher.update(doc("Frame", "Card")).changed
+
+def test_reorder_reports_the_root():
+    hasher = CanvasHasher()
+    canvas = make_canvas()
+    hasher.update(canvas)
+    canvas["children"][0]["children"].reverse()
+    delta = hasher.update(canvas)
+    assert delta.changed and delta.modified == ["0:1"]
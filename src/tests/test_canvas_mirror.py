@@ -0,0 +1,42 @@
+import json
+import asyncio
+
+import pytest
+from langchain_core.tools import StructuredTool
+
+from fastapi_server.canvas_mirror import CanvasMirror, mirror_tools
+
+def frame():
+    return {"id": "1:1", "name": "Frame", "children": [
+        {"id": "1:2", "name": "A", "absoluteBoundingBox": {"x": 0, "y": 0, "width": 10, "height": 10}},
+        {"id": "1:3", "name": "B", "absoluteBoundingBox": {"x": 0, "y": 10, "width": 10, "height": 10}},
+    ]}
+
+def cached(mirror):
+    mirror.record_read("get_document_info", {}, json.dumps({"id": "0:1", "children": [{"id": "1:1", "name": "Frame", "type": "FRAME"}]}))
+    mirror.record_read("get_node_info", {"nodeId": "1:1"}, json.dumps(frame()))
+    for child in frame()["children"]:
+        mirror.record_read("get_node_info", {"nodeId": child["id"]}, json.dumps(child))
+    return mirror
+
+def test_paint_keeps_siblings_but_layout_drops_everything():
+    mirror = cached(CanvasMirror())
+    mirror.apply("set_fill_color", {"nodeId": "1:2", "r": 1, "g": 0, "b": 0}, "Set fill color of node")
+    assert mirror.read("get_node_info", {"nodeId": "1:2"}) is None
+    assert mirror.read("get_node_info", {"nodeId": "1:1"}) is None
+    assert mirror.read("get_node_info", {"nodeId": "1:3"}) is not None
+
+    mirror = cached(CanvasMirror())
+    mirror.apply("resize_node", {"nodeId": "1:2", "width": 10, "height": 40}, "Resized node")
+    assert all(mirror.read("get_node_info", {"nodeId": i}) is None for i in ("1:1", "1:2", "1:3"))
+
+def test_tool_exception_resets_mirror():
+    async def boom(**kwargs):
+        raise RuntimeError("socket closed")
+
+    tool = StructuredTool.from_function(coroutine=boom, name="set_padding", description="pad")
+    mirror = cached(CanvasMirror())
+    [wrapped] = mirror_tools([tool], mirror)
+    with pytest.raises(Exception):
+        asyncio.run(wrapped.ainvoke({"nodeId": "1:1"}))
+    assert mirror.nodes == {}
@@ -0,0 +1,57 @@
+import json
+import asyncio
+from contextlib import asynccontextmanager
+
+import pytest
+
+pytest.importorskip("jinja2")
+app_module = pytest.importorskip("fastapi_server.app")
+
+class FakeCanvas:
+    """Top-level node ids; `read_failures` get_document_info calls fail first."""
+
+    def __init__(self, ids, read_failures=0):
+        self.ids = list(ids)
+        self.read_failures = read_failures
+        self.calls = []
+
+    async def call_tool(self, tool_name, args=None, fresh=False):
+        self.calls.append(tool_name)
+        if tool_name == "get_document_info":
+            assert fresh
+            if self.read_failures:
+                self.read_failures -= 1
+                return {"status": "error", "message": "Timed out"}
+            return {"status": "success", "message": json.dumps({"children": [{"id": i} for i in self.ids]})}
+        if tool_name == "delete_multiple_nodes":
+            self.ids = [i for i in self.ids if i not in args["nodeIds"]]
+            return {"status": "success", "message": "Deleted"}
+        raise AssertionError(tool_name)
+
+def reset(monkeypatch, canvas, max_rounds):
+    @asynccontextmanager
+    async def tool_session(channel=None):
+        yield canvas.call_tool
+
+    monkeypatch.setattr(app_module, "tool_session", tool_session)
+    return asyncio.run(app_module.canvas_reset(root_frame=False, width=320, height=720, max_rounds=max_rounds, channel=None))
+
+def test_last_delete_is_verified(monkeypatch):
+    canvas = FakeCanvas(["1:1", "1:2"])
+    result = reset(monkeypatch, canvas, max_rounds=1)
+
+    assert result["status"] == "success" and result["deleted_node_ids"] == ["1:1", "1:2"]
+    assert canvas.calls == ["get_document_info", "delete_multiple_nodes", "get_document_info"]
+
+def test_failed_reads_do_not_use_up_rounds(monkeypatch):
+    canvas = FakeCanvas(["1:1"], read_failures=1)
+    result = reset(monkeypatch, canvas, max_rounds=1)
+
+    assert result["status"] == "success" and canvas.ids == []
+
+def test_unreadable_canvas_is_a_conflict(monkeypatch):
+    canvas = FakeCanvas(["1:1"], read_failures=10)
+    response = reset(monkeypatch, canvas, max_rounds=2)
+
+    assert response.status_code == 409
+    assert canvas.calls == ["get_document_info"] * 3
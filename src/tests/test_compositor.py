@@ -0,0 +1,70 @@
+import numpy as np
+from PIL import Image
+
+from fastapi_server.compositor import composite
+
+def solid(w, h, color):
+    return Image.new("RGBA", (w, h), color)
+
+def elements():
+    return [
+        {"id": "hidden", "bbox": {"x": 10, "y": 10, "width": 20, "height": 20}},
+        {"id": "bg", "bbox": {"x": 0, "y": 0, "width": 100, "height": 50}},
+        {"id": "half", "bbox": {"x": 50, "y": 0, "width": 50, "height": 50}},
+    ]
+
+IMAGES = {
+    "hidden": solid(20, 20, (0, 0, 255, 255)),
+    "bg": solid(100, 50, (255, 0, 0, 255)),
+    "half": solid(50, 50, (0, 255, 0, 128)),
+}
+
+def paste_reference(elements, images):
+    """The renderer the compositor replaced: paste(mask=img) back to front, then flatten on white."""
+    min_x = min(e["bbox"]["x"] for e in elements)
+    min_y = min(e["bbox"]["y"] for e in elements)
+    width = max(e["bbox"]["x"] + e["bbox"]["width"] for e in elements) - min_x
+    height = max(e["bbox"]["y"] + e["bbox"]["height"] for e in elements) - min_y
+    canvas = Image.new("RGBA", (width, height), (255, 255, 255, 0))
+    for el in elements:
+        img = images[el["id"]]
+        canvas.paste(img, (el["bbox"]["x"] - min_x, el["bbox"]["y"] - min_y), mask=img)
+    final = Image.new("RGB", canvas.size, (255, 255, 255))
+    final.paste(canvas, mask=canvas.split()[3])
+    return final
+
+def assert_close(out, reference):
+    assert out.size == reference.size and out.mode == reference.mode
+    diff = np.abs(np.asarray(out, dtype=np.int16) - np.asarray(reference, dtype=np.int16))
+    assert diff.max() <= 1  # integer vs float rounding of the same blend
+
+def test_matches_paste_renderer_and_skips_covered_nodes():
+    stats = {}
+    out = composite(elements(), IMAGES.get, stats=stats)
+
+    assert_close(out, paste_reference(elements(), IMAGES))
+    assert stats == {"drawn": 2, "occluded": 1, "offscreen": 0, "missing": 0}
+
+def test_image_larger_than_its_bbox_is_not_culled():
+    # "shadow" has a covered bbox, but its image (render bounds) reaches past it
+    els = [
+        {"id": "page", "bbox": {"x": 0, "y": 0, "width": 30, "height": 30}},
+        {"id": "shadow", "bbox": {"x": 0, "y": 0, "width": 10, "height": 10}},
+        {"id": "top", "bbox": {"x": 0, "y": 0, "width": 10, "height": 10}},
+    ]
+    images = {
+        "page": solid(30, 30, (200, 200, 200, 255)),
+        "shadow": solid(20, 20, (0, 0, 255, 255)),
+        "top": solid(10, 10, (255, 0, 0, 255)),
+    }
+    stats = {}
+    out = composite(els, images.get, stats=stats)
+
+    assert_close(out, paste_reference(els, images))
+    assert out.getpixel((15, 15)) == (0, 0, 255)
+    assert stats["drawn"] == 3 and stats["occluded"] == 0
+
+def test_preview_and_transparent_background():
+    out = composite(elements()[2:], IMAGES.get, scale=0.5, background=None)
+    assert out.size == (25, 25) and out.mode == "RGBA"
+    assert out.getpixel((10, 10)) == (127, 255, 127, 64)  # paste() on transparent white lerps colour and alpha
@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+from PIL import Image
+
+from experiments.evaluate import evaluate, ssim, phash_bits
+
+def write_png(path, array):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.fromarray(array.astype(np.uint8)).save(path)
+
+def pattern(seed, size=(80, 120)):
+    rng = np.random.default_rng(seed)
+    blocks = rng.integers(0, 256, (size[0] // 8, size[1] // 8, 3))
+    return np.kron(blocks, np.ones((8, 8, 1)))
+
+def result(model_dir, name, png=None):
+    d = model_dir / name
+    d.mkdir(parents=True)
+    (d / f"{name}-step-count.json").write_text(json.dumps({"step_count": 3}))
+    (d / f"{name}.json").write_text("{}")
+    if png is not None:
+        write_png(d / f"{name}.png", png)
+
+def test_batched_metrics():
+    a = np.stack([pattern(0)[..., 0], pattern(1)[..., 0]])
+    assert np.allclose(ssim(a, a), 1.0)
+    assert ssim(a, a[::-1])[0] < 0.5
+    bits = phash_bits(np.stack([np.asarray(Image.fromarray(pattern(i).astype(np.uint8)).convert("L").resize((32, 32)), dtype=np.float32) for i in (0, 1)]))
+    assert bits.shape == (2, 64) and (bits[0] != bits[1]).sum() > 10
+
+def test_evaluate_writes_scores_per_partition(tmp_path):
+    gt = tmp_path / "gt"
+    write_png(gt / "g1.png", pattern(0))
+    write_png(gt / "g2.png", pattern(1))
+    root = tmp_path / "results"
+    result(root / "gemini", "g1-gemini-image_only", pattern(0))
+    result(root / "gemini", "g2-gemini-image_only", pattern(2))
+    result(root / "gemini", "g2-gemini-text_level_1")                       # no render: not scored
+    result(root / "gpt-4o", "g3-gpt-4o-image_only", pattern(1))             # no ground truth
+
+    summary = evaluate(root, gt, workers=1)
+    rows = {r["result_name"]: r for r in map(json.loads, (root / "evaluation/gemini/image_only.jsonl").read_text().splitlines())}
+    assert rows["g1-gemini-image_only"]["mse"] == 0 and rows["g1-gemini-image_only"]["phash"] == 0
+    assert rows["g1-gemini-image_only"]["ssim"] > 0.999
+    assert rows["g2-gemini-image_only"]["mse"] > 0.01 and rows["g2-gemini-image_only"]["ssim"] < 0.5
+    assert "error" in json.loads((root / "evaluation/gpt-4o/image_only.jsonl").read_text())
+    assert [(s["model"], s["scored"], s["results"]) for s in summary] == [("gemini", 2, 2), ("gpt-4o", 0, 1)]
+    assert sorted(p.name for p in (gt / ".eval_cache/256x256").iterdir()) == ["g1.npz", "g2.npz"]
+
+    # second run reuses the cached ground truth, in a process pool
+    assert evaluate(root, gt, workers=2, batch_size=1) == summary
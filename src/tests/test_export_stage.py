@@ -0,0 +1,41 @@
+import asyncio
+
+from experiments.export_stage import ExportStage
+
+def test_submit_returns_before_save_and_bounds_in_flight():
+    in_flight, peak = 0, 0
+
+    async def save(ok):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        if not ok:
+            raise RuntimeError("download failed")
+        return True
+
+    async def main():
+        stage = ExportStage(max_pending=2, log=lambda m: None)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await stage.submit("a", save(True))
+        assert loop.time() - start < 0.01  # the channel is free immediately
+        for name in "bcd":
+            await stage.submit(name, save(name != "c"))
+        return await stage.drain()
+
+    summary = asyncio.run(main())
+    assert summary == {"saved": 3, "failed": ["c"]}
+    assert peak == 2
+
+def test_submit_returns_task_with_save_outcome():
+    async def fail():
+        raise RuntimeError("download failed")
+
+    async def main():
+        stage = ExportStage(log=lambda m: None)
+        task = await stage.submit("a", fail())
+        return await task
+
+    assert asyncio.run(main()) is False
@@ -0,0 +1,61 @@
+import json
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from fastapi_server.figma_client import FigmaAPIError, FigmaClient, chunk_ids, retry_delay
+from tests.figma_stub import FigmaStub
+
+def with_stub(stub, fn):
+    async def main():
+        await stub.start()
+        try:
+            async with FigmaClient("token", base_url=f"{stub.base_url}/v1", max_retries=2, backoff=0) as figma:
+                return await fn(figma)
+        finally:
+            await stub.stop()
+    return asyncio.run(main())
+
+def test_retry_delay_honors_retry_after():
+    assert retry_delay({"Retry-After": "3"}, attempt=0) == 3.0
+    assert retry_delay({"Retry-After": "999"}, attempt=0, max_backoff=60) == 60
+    assert 0.5 <= retry_delay({}, attempt=0, backoff=1.0) <= 1.0
+
+def test_exports_all_nodes_after_throttling():
+    stub = FigmaStub(throttle=1)
+
+    async def export(figma):
+        urls = await figma.get_image_urls("key", ["1:2", "1:3", "1:4"])
+        return await figma.download_all(urls), figma.stats
+
+    images, stats = with_stub(stub, export)
+    assert {k: json.loads(v)["node"] for k, v in images.items()} == {"1:2": "1:2", "1:3": "1:3", "1:4": "1:4"}
+    assert stats["throttled"] == 1
+    # one images call (plus the throttled try) and one request per image
+    assert len(stub.calls) == 5
+
+def test_gives_up_after_max_retries():
+    stub = FigmaStub(throttle=10)
+    with pytest.raises(FigmaAPIError):
+        with_stub(stub, lambda figma: figma.get_file("key"))
+
+def test_chunk_ids_bounds_count_and_length():
+    ids = [f"{i}:{i}" for i in range(120)]
+    chunks = chunk_ids(ids, max_ids=50, max_chars=100)
+    assert sum(chunks, []) == ids
+    assert all(len(c) <= 50 and len(",".join(c)) <= 100 for c in chunks)
+
+def test_image_urls_chunked_and_failed_chunk_retried():
+    stub = FigmaStub(max_ids=2, flaky_ids={"1:5"})
+    ids = ["1:1", "1:2", "1:3", "1:4", "1:5"]
+
+    async def urls(figma):
+        figma.image_chunk_size = 2
+        return await figma.get_image_urls("key", ids)
+
+    images = with_stub(stub, urls)
+    assert sorted(images) == ids
+    # three chunks, then only the failed one again
+    assert stub.calls.count("/v1/images/key") == 4
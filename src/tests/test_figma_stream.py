@@ -0,0 +1,74 @@
+import json
+import asyncio
+
+import pytest
+
+from fastapi_server import figma_stream
+from fastapi_server.figma_stream import FileSnapshot, find_targets, load_file_json
+
+def box(x):
+    return {"x": x, "y": 0.5, "width": 10, "height": 10}
+
+# Figma puts absoluteRenderBounds after children; one node has null bounds, one none at all
+FILE = {
+    "name": "file",
+    "document": {"id": "0:0", "name": "Document", "children": [
+        {"id": "0:1", "name": "Other", "children": [{"id": "9:1", "name": "X", "absoluteRenderBounds": box(9)}]},
+        {"id": "0:2", "name": "Page 1", "children": [
+            {"id": "1:1", "name": "Frame", "children": [
+                {"id": "1:2", "name": "Group", "children": [
+                    {"id": "1:3", "name": "Text", "absoluteRenderBounds": box(3)},
+                ], "absoluteRenderBounds": box(2)},
+                {"id": "1:4", "name": "Hidden", "absoluteRenderBounds": None},
+                {"id": "1:5", "name": "Bare"},
+            ], "absoluteRenderBounds": box(1)},
+            {"id": "2:1", "name": "Second", "absoluteRenderBounds": box(4)},
+        ]},
+    ]},
+    "components": {"c": {"name": "Page 1"}},
+}
+
+def stream(snapshot, payload: bytes, chunk=7):
+    snapshot.reset()
+    for i in range(0, len(payload), chunk):
+        snapshot.write(payload[i:i + chunk])
+    return snapshot.close()
+
+@pytest.mark.parametrize("frame", [None, "Frame"])
+def test_streamed_targets_match_tree_walk(tmp_path, frame):
+    pytest.importorskip("ijson")
+    payload = json.dumps(FILE, separators=(",", ":")).encode()
+    path = tmp_path / "r.json.gz"
+    targets = stream(FileSnapshot(path, "Page 1", frame), payload)
+
+    assert targets == find_targets(FILE, "Page 1", frame)
+    assert [t["id"] for t in targets][:3] == (["1:1", "1:2", "1:3"] if frame is None else ["1:2", "1:3", "1:4"])
+    assert load_file_json(path) == FILE
+
+def test_fallback_without_ijson(tmp_path, monkeypatch):
+    monkeypatch.setattr(figma_stream, "ijson", None)
+    payload = json.dumps(FILE).encode()
+    assert stream(FileSnapshot(tmp_path / "r.json", "Page 1", "Frame"), payload) == find_targets(FILE, "Page 1", "Frame")
+    with pytest.warns(RuntimeWarning, match="buffered in memory"):
+        assert stream(FileSnapshot(None, "Page 1"), payload) == find_targets(FILE, "Page 1")
+    with pytest.raises(ValueError), pytest.warns(RuntimeWarning):
+        stream(FileSnapshot(None, "Missing"), payload)
+
+def test_stream_file_from_api(tmp_path):
+    pytest.importorskip("aiohttp")
+    from fastapi_server.figma_client import FigmaClient
+    from tests.figma_stub import FigmaStub
+
+    stub = FigmaStub(document=FILE, throttle=1)
+
+    async def main():
+        await stub.start()
+        try:
+            async with FigmaClient("token", base_url=f"{stub.base_url}/v1", backoff=0) as figma:
+                snapshot = await figma.stream_file("key", FileSnapshot(tmp_path / "r.json", "Page 1"))
+                return snapshot.close()
+        finally:
+            await stub.stop()
+
+    assert asyncio.run(main()) == find_targets(FILE, "Page 1")
+    assert json.loads((tmp_path / "r.json").read_text()) == FILE
@@ -0,0 +1,57 @@
+import itertools
+
+import numpy as np
+
+from fastapi_server import geometry
+from fastapi_server.geometry import Boxes, GridIndex, collect_elements, hungarian, match, occluders, pairwise_iou, sparse_iou, structural_scores
+
+def random_boxes(rng, n, spread=500):
+    xy = rng.random((n, 2)) * spread
+    return Boxes(np.hstack([xy, xy + rng.random((n, 2)) * 40 + 1]))
+
+def test_collect_elements_in_paint_order():
+    doc = {"id": "0:0", "children": [{"id": "0:1", "children": [
+        {"id": "1:1", "absoluteRenderBounds": {"x": 0, "y": 0, "width": 10, "height": 10},
+         "children": [{"id": "1:2", "absoluteRenderBounds": {"x": 1, "y": 1, "width": 2, "height": 2}}]},
+        {"id": "1:3", "absoluteRenderBounds": {"x": 5, "y": 5, "width": 10, "height": 10}},
+    ]}]}
+    assert [e["id"] for e in collect_elements(doc)] == ["1:1", "1:2", "1:3"]
+    assert Boxes.from_file_json({"document": doc}).xyxy.tolist()[2] == [5, 5, 15, 15]
+
+def test_grid_index_matches_brute_force():
+    rng = np.random.default_rng(0)
+    a, b = random_boxes(rng, 300), random_boxes(rng, 200)
+    i, j, iou = sparse_iou(a, b)
+    dense = pairwise_iou(a, b)
+    assert set(zip(i.tolist(), j.tolist())) == set(zip(*map(np.ndarray.tolist, np.nonzero(dense > 0))))
+    assert np.allclose(dense[i, j], iou)
+
+    index = GridIndex(a)
+    rect = [100, 100, 180, 150]
+    inter = geometry.intersection(a.xyxy, np.array(rect, dtype=float))
+    assert index.query(rect).tolist() == np.flatnonzero(inter > 0).tolist()
+
+def test_occluders_are_later_containing_boxes():
+    boxes = Boxes([[10, 10, 20, 20], [0, 0, 100, 100], [15, 15, 30, 30], [5, 5, 25, 25]])
+    assert occluders(boxes, 0).tolist() == [1, 3]
+    assert occluders(boxes, 1).tolist() == []
+
+def test_hungarian_fallback_is_optimal(monkeypatch):
+    monkeypatch.setattr(geometry, "linear_sum_assignment", None)
+    rng = np.random.default_rng(1)
+    for _ in range(50):
+        n, m = map(int, rng.integers(1, 6, 2))
+        cost = rng.random((n, m))
+        rows, cols = hungarian(cost)
+        k = min(n, m)
+        best = min(sum(cost[r, c] for r, c in zip(rs, cs))
+                   for rs in itertools.combinations(range(n), k) for cs in itertools.permutations(range(m), k))
+        assert len(rows) == k and np.isclose(cost[rows, cols].sum(), best)
+
+def test_structural_scores():
+    gt = Boxes([[0, 0, 100, 50], [0, 60, 100, 110], [0, 120, 40, 140]])
+    # same layout drawn 300px to the right, one node missing, one extra
+    gen = Boxes([[300, 0, 400, 52], [300, 61, 400, 110], [500, 500, 510, 510]])
+    assert [(i, j) for i, j, _ in match(gt.normalized(), gen.normalized())] == [(0, 0), (1, 1)]
+    scores = structural_scores(gt, gen)
+    assert (scores["matched"], scores["precision"], scores["recall"]) == (2, round(2 / 3, 6), round(2 / 3, 6))
@@ -0,0 +1,32 @@
+from experiments.job_ledger import JobLedger
+from experiments.scheduler import Job
+
+def jobs():
+    return [Job("a", "image_only", "gemini"), Job("b", "image_only", "gemini"), Job("c", "text_level_1", "gemini")]
+
+def test_pending_excludes_done_and_migrated(tmp_path):
+    ledger = JobLedger(tmp_path / "jobs.sqlite")
+    ledger.register(jobs(), is_done=lambda job: job.base_id == "a")
+    ledger.start("b-gemini-image_only", "channel_1")
+    ledger.finish("b-gemini-image_only", ok=True)
+
+    assert ledger.pending("gemini") == {"c-gemini-text_level_1"}
+    assert ledger.pending("gemini", ["image_only"]) == set()
+
+def test_resume_after_crash(tmp_path):
+    path = tmp_path / "jobs.sqlite"
+    ledger = JobLedger(path)
+    ledger.register(jobs())
+    ledger.start("a-gemini-image_only", "channel_1")
+    ledger.finish("a-gemini-image_only", ok=False, error="timeout")
+    ledger.start("a-gemini-image_only", "channel_2")
+    ledger.close()  # crashed mid-job
+
+    ledger = JobLedger(path)
+    assert ledger.recover() == ["a-gemini-image_only"]
+    row = ledger.get("a-gemini-image_only")
+    assert row["state"] == "pending"
+    assert row["attempts"] == 2
+    assert "a-gemini-image_only" in ledger.pending("gemini")
+    # re-registering does not reset known jobs
+    assert ledger.register(jobs()) == 0
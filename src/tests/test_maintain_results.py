@@ -0,0 +1,83 @@
+import importlib.util
+from pathlib import Path
+
+from experiments.results_store import ResultsStore
+from tests.test_results_index import response, write_files
+
+spec = importlib.util.spec_from_file_location("maintain_results", Path(__file__).resolve().parents[2] / "scripts" / "maintain_results.py")
+maintain = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(maintain)
+
+def test_plan_and_apply(tmp_path):
+    root = tmp_path / "task-3"
+    write_files(root / "gpt-4o", "g1-gpt-4o-without_oracle", "gpt-4o-2024-08-06")
+    write_files(root / "gpt-4o", "g2-gpt-4o-without_oracle", "gpt-4.1-2025-04-14")
+    write_files(root / "gpt-4o", "g3-gpt-4o-without_oracle", "gpt-4o", step_count=-1)
+    write_files(root / "gemini", "g1-gemini-without_oracle", "gemini-2.0-flash")
+    failed = tmp_path / "postprocess" / "gemini"
+    failed.mkdir(parents=True)
+    (failed / "retry_step_minus_1.txt").write_text("g1-gemini-without_oracle\n")
+    dest = tmp_path / "final"
+
+    manifest = maintain.annotate(root, maintain.scan(root))
+    assert len(manifest) == 4
+    actions = maintain.plan(root, manifest, renames=[("gpt-4.1-2025-04-14", "gpt-4.1")], fix_model="gpt-4o", dest=dest,
+                            drop_status={"retry"}, drop_paths=maintain.listed_failures(tmp_path / "postprocess"), quarantine=True)
+    assert sorted((a["op"], Path(a["src"]).name) for a in actions) == [
+        ("move", "g2-gpt-4o-without_oracle"),
+        ("quarantine", "g1-gemini-without_oracle"),
+        ("quarantine", "g3-gpt-4o-without_oracle"),
+    ]
+    assert not (dest).exists()  # planning touches nothing
+
+    done = maintain.run(actions, workers=4)
+    assert all(a["done"] for a in done)
+    moved = dest / "g2-gpt-4.1-without_oracle"
+    assert sorted(p.name for p in moved.iterdir()) == ["assets", "g2-gpt-4.1-without_oracle-json-response.json",
+                                                        "g2-gpt-4.1-without_oracle-step-count.json", "g2-gpt-4.1-without_oracle.json"]
+    assert [e["name"] for e in maintain.scan(root)] == ["g1-gpt-4o-without_oracle"]
+    assert len(list((root / maintain.QUARANTINE_DIR).glob("*/*/*"))) == 2
+
+def test_conflicts_are_not_executed(tmp_path):
+    write_files(tmp_path / "m", "a-m-v1", "m")
+    write_files(tmp_path / "m", "a-m-v2", "m")
+    actions = maintain.plan(tmp_path, maintain.scan(tmp_path), renames=[("v1", "v2")])
+    assert [a["op"] for a in actions] == ["conflict"]
+    maintain.run(actions)
+    assert (tmp_path / "m" / "a-m-v1").exists()
+
+def store_result(model_dir, name, model_used, step_count=7):
+    d = model_dir / name
+    (d / "assets").mkdir(parents=True)
+    (d / f"{name}.json").write_text("{}")
+    base_id, variant = name.split(f"-{model_dir.name}-")
+    ResultsStore(model_dir).append({"result_name": name, "base_id": base_id, "model": model_dir.name, "variant": variant,
+                                    "ok": step_count != -1, "step_count": step_count}, response(model_used))
+
+def test_store_backed_results(tmp_path):
+    root = tmp_path / "modification_gen"
+    model_dir = root / "task-1" / "image_only" / "gpt-4o"
+    store_result(model_dir, "b1-gpt-4o-image_only", "gpt-4o")
+    store_result(model_dir, "b2-gpt-4o-image_only", "gpt-4.1-2025-04-14")
+    store_result(model_dir, "b3-gpt-4o-image_only", "gpt-4o", step_count=-1)
+    (model_dir / "b4-gpt-4o-image_only").mkdir()                           # dir the store does not know
+    (model_dir / "b4-gpt-4o-image_only" / "b4-gpt-4o-image_only.json").write_text("{}")
+
+    manifest = maintain.annotate(root, maintain.scan(root))
+    actions = maintain.plan(root, manifest, renames=[("gpt-4.1-2025-04-14", "gpt-4.1")], fix_model="gpt-4o",
+                            drop_status={"retry", "missing"})
+    assert sorted((a["op"], Path(a["src"]).name) for a in actions) == [
+        ("delete", "b3-gpt-4o-image_only"),
+        ("refused", "b4-gpt-4o-image_only"),
+        ("rename", "b2-gpt-4o-image_only"),
+    ]
+    maintain.run(actions)
+
+    latest = ResultsStore(model_dir).latest()
+    assert sorted(latest) == ["b1-gpt-4o-image_only", "b2-gpt-4.1-image_only"]
+    assert latest["b2-gpt-4.1-image_only"]["step_count"] == 7 and latest["b2-gpt-4.1-image_only"]["model"] == "gpt-4.1"
+    assert ResultsStore(model_dir).response("b2-gpt-4.1-image_only") == response("gpt-4.1-2025-04-14")
+
+    # the renamed result is still a good store-backed result: a second cleanup pass keeps it
+    manifest = maintain.annotate(root, maintain.scan(root))
+    assert [a["op"] for a in maintain.plan(root, manifest, drop_status={"retry", "missing"})] == ["refused"]
@@ -0,0 +1,62 @@
+import json
+import asyncio
+
+import pytest
+
+pytest.importorskip("mcp")
+pytest.importorskip("langgraph")
+
+from langchain_core.messages import HumanMessage
+from langgraph.prebuilt import create_react_agent
+
+from fastapi_server.scripted_model import ScriptedChatModel
+from fastapi_server.session_pool import MCPSessionPool, mcp_server_params
+
+def test_scripted_agent_builds_screen_on_fake_server():
+    async def main():
+        pool = MCPSessionPool(
+            mcp_server_params({"mcp_server": "fake"}, None),
+            agent_factory=lambda tools: create_react_agent(ScriptedChatModel(), tools),
+        )
+        await pool.startup()
+        try:
+            async with pool.checkout() as entry:
+                result = await entry.agent.ainvoke({"messages": [HumanMessage(content="Make a login screen")]})
+                document = json.loads((await entry.call_tool("get_document_info"))["message"])
+                root_id = document["children"][0]["id"]
+                root = json.loads((await entry.call_tool("get_node_info", {"nodeId": root_id}))["message"])
+                return result, document, root
+        finally:
+            await pool.shutdown()
+
+    result, document, root = asyncio.run(main())
+    assert result["messages"][-1].content.startswith("Done")
+    assert len(document["children"]) == 1
+    assert [c["name"] for c in root["children"]] == ["Header", "Title", "Card", "Button", "Button Label"]
+    card = root["children"][2]
+    assert card["children"][0]["characters"] == "Card body"
+    assert root["children"][3]["cornerRadius"] == 8
+
+def test_scripted_supervisor_terminates():
+    model = ScriptedChatModel(script=[{"tool": "create_frame", "args": {"x": 0, "y": 0, "width": 10, "height": 10}}])
+    first = model.invoke([HumanMessage(content="go")])
+    assert json.loads(first.content)["tool_name"] == "create_frame"
+    assert model.invoke([HumanMessage(content="go"), first]).content == "TERMINATE"
+
+def test_fresh_read_bypasses_canvas_mirror():
+    async def main():
+        pool = MCPSessionPool(mcp_server_params({"mcp_server": "fake"}, None), mirror_max_age=60)
+        await pool.startup()
+        try:
+            async with pool.checkout() as entry:
+                await entry.call_tool("get_document_info")
+                await entry.call_tool("get_document_info")
+                cached = entry.mirror.status()
+                await entry.call_tool("get_document_info", fresh=True)
+                return cached, entry.mirror.status()
+        finally:
+            await pool.shutdown()
+
+    cached, fresh = asyncio.run(main())
+    assert cached["hits"] == 1 and cached["misses"] == 1
+    assert fresh["misses"] == 2 and fresh["hits"] == 1
@@ -0,0 +1,34 @@
+import asyncio
+
+import pytest
+
+pipeline = pytest.importorskip("fastapi_server.pipeline")
+StageTimer = pipeline.StageTimer
+
+def test_concurrent_spans_count_once():
+    timer = StageTimer()
+
+    async def tool(delay):
+        with timer.stage("tools"):
+            await asyncio.sleep(delay)
+
+    async def main():
+        with timer.stage("agent"):
+            await asyncio.gather(tool(0.05), tool(0.05), tool(0.03))
+            await tool(0.02)
+
+    asyncio.run(main())
+    stages = timer.as_dict()
+    assert 0.07 <= stages["tools"] < 0.1  # 0.05 + 0.02, not 0.15
+    assert stages["tools"] <= stages["agent"]
+
+def test_multi_agent_state_is_compacted_like_single_agent_responses():
+    from langchain_core.messages import HumanMessage
+    from fastapi_server.serialization import ResponseOptions, render
+
+    image = "data:image/png;base64," + "A" * 64
+    state = {"messages": [HumanMessage(content=[{"type": "image_url", "image_url": {"url": image}}])], "step_count": 2}
+    result = pipeline.serialize_multi_agent_state(state, include_raw=False)
+    body = render(result, ResponseOptions(compact=True, fields=None, raw=None, gzip=False)).body.decode()
+    assert "response" not in result and image not in body
+    assert '"step_count":2' in body
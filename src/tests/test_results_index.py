@@ -0,0 +1,70 @@
+import json
+import shutil
+
+from experiments.results_index import ResultsIndex, response_stats
+from experiments.results_store import ResultsStore
+
+def ai(model, tools=(), tokens=10):
+    return {"role": "assistant", "content": {"type": "ai", "data": {
+        "response_metadata": {"model_name": model},
+        "usage_metadata": {"input_tokens": tokens, "output_tokens": 1, "total_tokens": tokens + 1},
+        "tool_calls": [{"name": t, "args": {}} for t in tools],
+    }}}
+
+def response(model):
+    return {"messages": [{"role": "user", "content": {"type": "human", "data": {}}},
+                         ai(model, ["create_frame", "create_text"]), ai(model, ["create_text"])]}
+
+def write_files(model_dir, name, model_used, step_count=3, assets=True):
+    d = model_dir / name
+    (d / "assets").mkdir(parents=True) if assets else d.mkdir(parents=True)
+    (d / f"{name}-step-count.json").write_text(json.dumps({"step_count": step_count}))
+    (d / f"{name}-json-response.json").write_text(json.dumps(response(model_used)))
+    (d / f"{name}.json").write_text("{}")
+    return d
+
+def test_response_stats():
+    stats = response_stats(response("gpt-4o-2024-08-06"))
+    assert stats["used_model"] == "gpt-4o-2024-08-06"
+    assert (stats["tool_calls"], stats["total_tokens"]) == (3, 22)
+    assert json.loads(stats["tool_counts"]) == {"create_frame": 1, "create_text": 2}
+
+def test_incremental_update_and_queries(tmp_path):
+    model_dir = tmp_path / "gpt-4o"
+    write_files(model_dir, "g1-gpt-4o-image_only", "gpt-4o-2024-08-06")
+    wrong = write_files(model_dir, "g2-gpt-4o-image_only", "gpt-4.1-2025-04-14", assets=False)
+    ResultsStore(tmp_path).append({"result_name": "g3-gpt-4o-text_level_1", "base_id": "g3", "model": "gpt-4o",
+                                   "variant": "text_level_1", "ok": False, "step_count": -1}, response("gpt-4o"))
+
+    index = ResultsIndex.for_root(tmp_path)
+    assert index.update(tmp_path)["indexed"] == 3
+    assert index.update(tmp_path) == {"unchanged": 3, "removed": 0}
+
+    rows = {r["result_name"]: r for r in index.query()}
+    assert rows["g2-gpt-4o-image_only"]["status"] == "node_only"
+    assert rows["g3-gpt-4o-text_level_1"]["status"] == "retry"
+    assert rows["g3-gpt-4o-text_level_1"]["source"] == "store"
+    assert rows["g1-gpt-4o-image_only"]["variant"] == "image_only"
+
+    invalid = index.query("IFNULL(used_model, '') NOT LIKE ?", ["gpt-4o%"], ["path"])
+    assert invalid == [{"path": "gpt-4o/g2-gpt-4o-image_only"}]
+
+    (model_dir / "g1-gpt-4o-image_only" / "g1-gpt-4o-image_only-step-count.json").write_text(json.dumps({"step_count": 9}))
+    shutil.rmtree(wrong)
+    assert index.update(tmp_path) == {"indexed": 1, "unchanged": 1, "removed": 1}
+    assert index.query("step_count = 9", columns=["result_name"]) == [{"result_name": "g1-gpt-4o-image_only"}]
+
+def test_store_found_below_a_deep_sweep_root(tmp_path):
+    # modification layout: results_dir/<task>/<variant>/<model>/_results
+    model_dir = tmp_path / "task-1" / "without_oracle" / "gpt-4o"
+    result_dir = model_dir / "b1-gpt-4o-without_oracle"
+    (result_dir / "assets").mkdir(parents=True)
+    (result_dir / "b1-gpt-4o-without_oracle.json").write_text("{}")
+    ResultsStore(model_dir).append({"result_name": "b1-gpt-4o-without_oracle", "base_id": "b1", "model": "gpt-4o",
+                                    "variant": "without_oracle", "ok": True, "step_count": 7}, response("gpt-4o"))
+
+    index = ResultsIndex.for_root(tmp_path)
+    assert index.update(tmp_path)["indexed"] == 1
+    [row] = index.query()
+    assert (row["path"], row["source"], row["status"], row["step_count"], row["used_model"]) == \
+        ("task-1/without_oracle/gpt-4o/b1-gpt-4o-without_oracle", "store", "ok", 7, "gpt-4o")
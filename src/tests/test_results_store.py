@@ -0,0 +1,37 @@
+import gzip
+import json
+
+from experiments.results_store import ResultsStore, import_legacy
+
+def meta(name, variant="image_only", **extra):
+    return {"result_name": name, "base_id": name.split("-")[0], "model": "gemini", "variant": variant, **extra}
+
+def test_latest_record_wins_and_responses_load_lazily(tmp_path):
+    writer_a, writer_b = ResultsStore(tmp_path), ResultsStore(tmp_path)
+    writer_b.writer = "other-host-1"
+    writer_a.append(meta("a-gemini-image_only", ok=False, step_count=-1))
+    writer_b.append(meta("a-gemini-image_only", ok=True, step_count=7), {"messages": ["retry"]})
+    writer_a.append(meta("b-gemini-text_level_1", "text_level_1", ok=True, step_count=3), {"messages": ["b"]})
+
+    # a crash mid-append leaves a truncated member at the end of a segment
+    segment = next((tmp_path / "gemini" / "_results" / "image_only").glob("meta-other-host-1*"))
+    segment.write_bytes(segment.read_bytes() + gzip.compress(b'{"result_name": "c"}\n')[:-12])
+
+    store = ResultsStore(tmp_path)
+    assert [(r["result_name"], r["step_count"]) for r in store.records()] == [("a-gemini-image_only", 7), ("b-gemini-text_level_1", 3)]
+    assert store.partitions() == [("gemini", "image_only"), ("gemini", "text_level_1")]
+    assert store.response("a-gemini-image_only") == {"messages": ["retry"]}
+    assert ResultsStore(tmp_path / "gemini").records(variant="text_level_1", ok=True)[0]["result_name"] == "b-gemini-text_level_1"
+
+def test_import_legacy_files(tmp_path):
+    model_dir = tmp_path / "gemini"
+    result = model_dir / "gid1-gemini-image_only"
+    result.mkdir(parents=True)
+    (result / "gid1-gemini-image_only-step-count.json").write_text(json.dumps({"step_count": 5}))
+    (result / "gid1-gemini-image_only-json-response.json").write_text(json.dumps({"messages": []}))
+    (result / "gid1-gemini-image_only.json").write_text("{}")
+
+    assert import_legacy(model_dir)["imported"] == 1
+    assert import_legacy(model_dir)["skipped"] == 1
+    [record] = ResultsStore(tmp_path).records()
+    assert (record["base_id"], record["variant"], record["ok"], record["step_count"]) == ("gid1", "image_only", True, 5)
@@ -0,0 +1,59 @@
+import asyncio
+
+from experiments.scheduler import ChannelScheduler, Job
+
+def run(scheduler, jobs):
+    return asyncio.run(scheduler.run(jobs))
+
+def test_jobs_spread_over_channels():
+    async def run_job(channel, job):
+        await asyncio.sleep(0.01)
+        return True
+
+    scheduler = ChannelScheduler(["c1", "c2"], run_job, log=lambda m: None)
+    summary = run(scheduler, [Job(str(i), "image_only", "gemini") for i in range(6)])
+    assert summary["completed"] == 6
+    assert summary["channels"]["c1"]["completed"] > 0
+    assert summary["channels"]["c2"]["completed"] > 0
+
+def test_failed_job_retried_on_other_channel():
+    seen = []
+
+    async def run_job(channel, job):
+        seen.append(channel)
+        return channel == "c2"
+
+    scheduler = ChannelScheduler(["c1", "c2"], run_job, log=lambda m: None)
+    # c1 grabs the only job first and fails it
+    summary = run(scheduler, [Job("a", "image_only", "gemini")])
+    assert seen == ["c1", "c2"]
+    assert summary["completed"] == 1
+    assert summary["failed"] == []
+
+def test_gives_up_after_max_attempts():
+    async def run_job(channel, job):
+        raise RuntimeError("figma down")
+
+    scheduler = ChannelScheduler(["c1"], run_job, max_attempts=2, log=lambda m: None)
+    summary = run(scheduler, [Job("a", "image_only", "gemini")])
+    assert summary["failed"] == ["a-gemini-image_only"]
+
+def test_failed_background_save_is_requeued():
+    seen = []
+
+    async def save(channel):
+        await asyncio.sleep(0.01)
+        if channel == "c1":
+            raise RuntimeError("download failed")
+        return True
+
+    async def run_job(channel, job):
+        seen.append(channel)
+        # pipeline mode: the channel is released before the save finishes
+        return asyncio.ensure_future(save(channel))
+
+    scheduler = ChannelScheduler(["c1", "c2"], run_job, log=lambda m: None)
+    summary = run(scheduler, [Job("a", "image_only", "gemini")])
+    assert seen == ["c1", "c2"]
+    assert summary["completed"] == 1
+    assert summary["channels"]["c1"]["failed"] == 1
@@ -0,0 +1,40 @@
+import json
+import gzip
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from fastapi_server.serialization import ResponseOptions, render, select_fields, strip_images
+
+PNG_URL = "data:image/png;base64," + "A" * 64
+
+def options(**kwargs):
+    return ResponseOptions(**{"compact": False, "fields": None, "raw": None, "gzip": False, **kwargs})
+
+def test_strip_images_replaces_data_urls():
+    payload = {"messages": [{"content": [{"type": "text", "text": "hi"}, {"image_url": {"url": PNG_URL}}]}], "url": "https://x/y.png"}
+    stripped = strip_images(payload)
+    image = stripped["messages"][0]["content"][1]["image_url"]["url"]
+    assert set(image) == {"image_sha256", "size"} and image["size"] == len(PNG_URL)
+    assert stripped["messages"][0]["content"][0] == {"type": "text", "text": "hi"}
+    assert stripped["url"] == "https://x/y.png"
+    assert PNG_URL not in json.dumps(stripped)
+
+def test_select_fields_keeps_only_requested_keys():
+    result = {"response": "blob", "step_count": 3, "json_response": {"messages": [1, 2], "images": []}}
+    assert select_fields(result, ["step_count", "json_response.messages", "missing.key"]) == {
+        "step_count": 3,
+        "json_response": {"messages": [1, 2]},
+    }
+
+def test_gzip_body_decodes_to_the_same_payload():
+    result = {"step_count": 3, "json_response": {"messages": [{"content": "héllo"}]}, "timings": {"agent": 1.5}}
+    response = render(result, options(gzip=True))
+    assert response.headers["content-encoding"] == "gzip"
+    assert json.loads(gzip.decompress(response.body)) == result
+
+def test_compact_and_fields_combined():
+    result = {"response": "blob", "json_response": {"image": PNG_URL}, "step_count": 1}
+    body = json.loads(render(result, options(compact=True, fields="json_response")).body)
+    assert body == {"json_response": {"image": strip_images(PNG_URL)}}
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("mcp")
+
+from fastapi_server.session_pool import ChannelNotJoinedError, MCPSessionPool, mcp_server_params
+
+def with_pool(body, size=2, channels=None):
+    async def main():
+        pool = MCPSessionPool(mcp_server_params({"mcp_server": "fake"}, None), size=size, channels=channels)
+        await pool.startup()
+        try:
+            return await body(pool)
+        finally:
+            await pool.shutdown()
+
+    return asyncio.run(main())
+
+def test_checkout_reuses_sessions_and_prefers_unbound_ones():
+    async def body(pool):
+        async with pool.checkout() as first:
+            pass
+        async with pool.checkout() as again:
+            pass
+        async with pool.checkout() as anonymous:
+            return first.index, again.index, anonymous.channel, [e.channel for e in pool.entries]
+
+    first, again, channel, channels = with_pool(body, channels=["channel_1"])
+    assert first == again
+    assert channel is None  # the session pinned to channel_1 is left alone
+    assert channels == ["channel_1", None]
+
+def test_unknown_channel_is_a_clear_error():
+    async def body(pool):
+        with pytest.raises(ChannelNotJoinedError, match="'channel_9'.*joined: channel_1"):
+            async with pool.checkout("channel_9"):
+                pass
+
+    with_pool(body, channels=["channel_1"])
+
+def test_rebind_joins_a_free_session():
+    async def body(pool):
+        result = await pool.join("channel_2")
+        async with pool.checkout("channel_2") as entry:
+            return result, entry.channel, pool.status()
+
+    result, channel, status = with_pool(body, channels=["channel_1"])
+    assert result["status"] == "success"
+    assert channel == "channel_2"
+    assert sorted(s["channel"] for s in status) == ["channel_1", "channel_2"]
+
+def test_concurrent_checkouts_of_one_channel_take_turns():
+    async def body(pool):
+        active, peak, order = 0, 0, []
+
+        async def use(name):
+            nonlocal active, peak
+            async with pool.checkout("channel_1") as entry:
+                active += 1
+                peak = max(peak, active)
+                order.append((name, entry.index))
+                await asyncio.sleep(0.02)
+                active -= 1
+
+        await asyncio.gather(use("a"), use("b"), use("c"))
+        return peak, order
+
+    peak, order = with_pool(body, channels=["channel_1"])
+    assert peak == 1
+    assert len({index for _, index in order}) == 1
@@ -0,0 +1,69 @@
+import io
+import json
+
+import pytest
+
+pytest.importorskip("mcp")
+pytest.importorskip("jinja2")
+app_module = pytest.importorskip("fastapi_server.app")
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from fastapi_server import agent_multi, agent_single
+from fastapi_server.session_pool import mcp_server_params
+
+FAKE_CONFIG = {"models": ["scripted"], "mcp_server": "fake"}
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(agent_single, "load_server_config", lambda agent_type: FAKE_CONFIG)
+    monkeypatch.setattr(agent_multi, "server_params", mcp_server_params(FAKE_CONFIG, None))
+    monkeypatch.setattr(agent_multi, "SUPERVISOR_MODEL", "scripted")
+    monkeypatch.setattr(agent_multi, "runtimes", agent_multi.WorkerRuntimeCache())
+    with TestClient(app_module.app) as client:
+        yield client
+
+def png_upload():
+    buf = io.BytesIO()
+    Image.new("RGB", (8, 8), "white").save(buf, format="PNG")
+    return {"image": ("screen.png", buf.getvalue(), "image/png")}
+
+def read_sse(client, url):
+    with client.stream("POST", url, files=png_upload()) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    assert body.endswith("\n\n")
+    events = []
+    for frame in body.split("\n\n")[:-1]:
+        lines = frame.split("\n")
+        assert len(lines) == 2, frame
+        assert lines[0].startswith("event: ") and lines[1].startswith("data: ")
+        data = json.loads(lines[1][len("data: "):])
+        assert data["event"] == lines[0][len("event: "):]
+        events.append(data)
+    return events
+
+def test_single_agent_stream(client):
+    events = read_sse(client, "/generate/image?stream=true")
+
+    assert [e["event"] for e in events[:-1]] == ["step"] * (len(events) - 1)
+    assert events[-1] == {"event": "done", "step_count": events[-2]["step_count"]}
+    nodes = [e["node"] for e in events[:-1]]
+    final = events[-2]
+    assert final["node"] == "agent" and final["messages"][-1]["content"]["data"]["content"].startswith("Done")
+    assert "tools" in nodes and nodes.index("tools") < len(nodes) - 1  # tool results before the answer
+    assert events[-1]["step_count"] == sum(len(e["messages"]) for e in events[:-1])
+
+def test_multi_agent_stream(client):
+    events = read_sse(client, "/generate/image/multi?stream=true&worker_model=scripted")
+
+    assert events[-1]["event"] == "done" and "state" not in events[-1]
+    rounds = [(e["event"], e.get("node")) for e in events[:-1]]
+    # every round: supervisor decides, worker runs the tool, then the canvas delta
+    assert rounds[:3] == [("step", "supervisor"), ("step", "worker"), ("canvas", None)]
+    assert events[1]["tool_name"] == "create_frame" and events[2]["added"]
+    assert rounds[-1] in {("step", "supervisor"), ("canvas", None)}
+    assert {"error"}.isdisjoint(e["event"] for e in events)
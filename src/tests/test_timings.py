@@ -0,0 +1,23 @@
+from experiments.timings import JobTimer, load_timings, percentile, summarize
+
+def test_spans_written_and_summarized(tmp_path):
+    for i, variant in enumerate(["image_only", "image_only", "text_level_1"]):
+        timer = JobTimer(f"a{i}-gemini-{variant}", "gemini", variant, "channel_1")
+        with timer.span("reset"):
+            pass
+        timer.phases["agent"] = 10.0 * (i + 1)
+        timer.add_server_timings({"agent": 9.0 * (i + 1), "tools": 4.0})
+        timer.write(tmp_path / "gemini", ok=i != 2)
+
+    records = load_timings([tmp_path])
+    assert len(records) == 3
+    assert records[0]["phases"]["inference"] == 5.0
+    assert {"reset", "agent", "tools", "inference"} <= set(records[0]["phases"])
+
+    summary = summarize(records, by=("model", "variant"))
+    assert summary[("gemini", "image_only")]["agent"] == {"n": 2, "p50": 15.0, "p95": 19.5}
+    assert summarize(records, by=("model",), ok_only=True)[("gemini",)]["agent"]["n"] == 2
+
+def test_percentile():
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile([1, 2, 3, 4, 5], 95) == 4.8